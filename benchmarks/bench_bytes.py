@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+
+#
+# Copyright 2023 Micah Cochran
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Compare the peak memory of loading a large page as a str and as bytes.
+
+A page from test_data with both JSON-LD and microdata (so that the whole page
+is parsed by lxml) is padded with inline assets and written to a file, which
+is loaded by reading it into a str, with load() which reads bytes, and from
+a memory map.
+
+Run from the project directory (Linux only):
+    $ python3 benchmarks/bench_bytes.py
+"""
+
+import argparse
+import gc
+import mmap
+import multiprocessing
+from pathlib import Path
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from scrape_schema_recipe import load, loads, loads_bytes  # noqa: E402
+
+DATA_PATH = Path(__file__).resolve().parent.parent / "scrape_schema_recipe" / "test_data"
+
+
+def load_str(path: str):
+    with open(path, encoding="utf-8") as f:
+        return loads(f.read())
+
+
+def load_bytes(path: str):
+    return load(path)
+
+
+def load_mmap(path: str):
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        return loads_bytes(m)
+
+
+FUNCTIONS = {"str": load_str, "bytes": load_bytes, "mmap": load_mmap}
+
+
+def write_page(path: str, size: int) -> None:
+    """write a page padded with inline assets of about size bytes"""
+    html = (DATA_PATH / "sweetestkitchen-truffles.html").read_text(encoding="utf-8")
+    # the curly quote makes the str 2 bytes per character, like most pages
+    asset = ("<script>var ad = '" + "x" * 1000 + "’';</script>\n"
+             '<img src="data:image/png;base64,' + "A" * 1000 + '">\n')
+    filler = asset * (size // len(asset))
+    Path(path).write_text(html.replace("</body>", filler + "</body>"), encoding="utf-8")
+
+
+def _vm_hwm() -> int:
+    """the peak resident set size in bytes, from /proc/self/status"""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) * 1024
+    raise RuntimeError("VmHWM is not in /proc/self/status")
+
+
+def _peak_rss(name: str, path: str) -> int:
+    """run in a child process, returns by how much loading the page raises
+    the peak resident set size, in bytes."""
+    gc.collect()
+    # reset the peak resident set size, Linux only
+    with open("/proc/self/clear_refs", "w") as f:
+        f.write("5")
+    before = _vm_hwm()
+    FUNCTIONS[name](path)
+    return _vm_hwm() - before
+
+
+def peak_rss(name: str, path: str) -> int:
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        return pool.apply(_peak_rss, (name, path))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=50_000_000,
+                        help="bytes of inline assets added to the page")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = str(Path(tmp_dir) / "page.html")
+        write_page(path, args.size)
+        print(f"page: {Path(path).stat().st_size:,} bytes")
+
+        for name, func in FUNCTIONS.items():
+            start = time.perf_counter()
+            func(path)
+            elapsed = time.perf_counter() - start
+            growth = peak_rss(name, path)
+            print(f"  {name:6s} {growth / 1024 ** 2:8.1f} MiB peak  {elapsed:6.2f} sec")
+
+
+if __name__ == "__main__":
+    main()
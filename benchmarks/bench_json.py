@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+
+#
+# Copyright 2023 Micah Cochran
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Compare the JSON backends of loads(), json_backend='orjson', 'simdjson'
+and 'json', on the test_data pages and on a page with a large '@graph' of
+WebPage, BreadcrumbList and SiteNavigationElement nodes around one recipe.
+Backends that aren't installed are skipped.
+
+The pages/second of loads() are reported, and of decoding the JSON-LD blocks
+on their own (_fast_json_ld()), which is the part that the backend changes.
+
+Run from the project directory:
+    $ python3 benchmarks/bench_json.py
+"""
+
+import argparse
+import json
+from pathlib import Path
+import random
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from scrape_schema_recipe import loads  # noqa: E402
+from scrape_schema_recipe.jsonld import json_loader, JSON_BACKENDS  # noqa: E402
+from scrape_schema_recipe.scrape import _fast_json_ld  # noqa: E402
+from synthetic import make_recipe  # noqa: E402
+
+DATA_PATH = Path(__file__).resolve().parent.parent / "scrape_schema_recipe" / "test_data"
+
+
+def graph_page(nodes: int) -> str:
+    """A page with one recipe in an '@graph' with that many other nodes."""
+    rng = random.Random(0)
+    graph = [make_recipe(rng, 0, 12, 8)]
+    for i in range(nodes):
+        url = f"https://example.com/section-{i // 20}/page-{i}/"
+        kind = i % 3
+        if kind == 0:
+            graph.append({"@type": "WebPage", "@id": url, "url": url, "name": f"Page {i}",
+                          "isPartOf": {"@id": "https://example.com/#website"},
+                          "datePublished": "2021-03-04T05:06:07+00:00", "inLanguage": "en-US"})
+        elif kind == 1:
+            graph.append({"@type": "BreadcrumbList", "@id": url + "#breadcrumb", "itemListElement": [
+                {"@type": "ListItem", "position": p + 1, "name": f"Level {p}", "item": url}
+                for p in range(4)]})
+        else:
+            graph.append({"@type": "SiteNavigationElement", "@id": url + "#nav", "name": f"Menu {i}",
+                          "url": url})
+    data = {"@context": "https://schema.org", "@graph": graph}
+    return (f'<html><head><script type="application/ld+json">{json.dumps(data)}</script>'
+            f'</head><body></body></html>')
+
+
+def pages_per_sec(pages: list, json_backend: str, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for html in pages:
+            loads(html, json_backend=json_backend)
+    return rounds * len(pages) / (time.perf_counter() - start)
+
+
+def decoded_per_sec(pages: list, json_backend: str, rounds: int) -> float:
+    json_loads = json_loader(json_backend)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for html in pages:
+            _fast_json_ld(html, loads=json_loads)
+    return rounds * len(pages) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--nodes", type=int, default=2000, help="the number of nodes in the '@graph'")
+    args = parser.parse_args()
+
+    backends = []
+    for backend in JSON_BACKENDS:
+        try:
+            json_loader(backend)
+        except ImportError:
+            print(f"{backend} is not installed")
+            continue
+        backends.append(backend)
+
+    corpora = {
+        "test_data": [path.read_text(encoding="utf-8") for path in sorted(DATA_PATH.glob("*.html"))],
+        f"@graph of {args.nodes} nodes": [graph_page(args.nodes)],
+    }
+    for name, pages in corpora.items():
+        size = sum(len(html) for html in pages)
+        print(f"{name}: {len(pages)} pages, {size / 1024:.0f} KiB")
+        print(f"  {'':10s} {'loads()':>22s}        {'decoding the JSON-LD':>22s}")
+        baseline = None
+        for backend in reversed(backends):
+            rate = pages_per_sec(pages, backend, args.rounds)
+            decoded = decoded_per_sec(pages, backend, args.rounds)
+            baseline = baseline or (rate, decoded)
+            print(f"  {backend:10s} {rate:10.1f} pages/sec ({rate / baseline[0]:.2f}x) "
+                  f"{decoded:10.1f} pages/sec ({decoded / baseline[1]:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
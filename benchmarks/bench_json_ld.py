@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+
+#
+# Copyright 2023 Micah Cochran
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Compare the JSON-LD fast path with extracting JSON-LD through extruct.
+
+The pages in test_data are measured as they are and padded with large inline
+assets (scripts and base64 images), which is common on recipe sites.
+
+Run from the project directory:
+    $ python3 benchmarks/bench_json_ld.py
+"""
+
+import argparse
+import gc
+import multiprocessing
+from pathlib import Path
+import sys
+import time
+
+import extruct
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from scrape_schema_recipe.scrape import _fast_json_ld, _plan_syntaxes  # noqa: E402
+
+DATA_PATH = Path(__file__).resolve().parent.parent / "scrape_schema_recipe" / "test_data"
+
+
+def extruct_json_ld(html: str):
+    return extruct.extract(html, syntaxes=["json-ld"])["json-ld"]
+
+
+def pad(html: str, size: int) -> str:
+    """add inline assets of about size characters to the end of the <body>"""
+    asset = ("<script>var ad = '" + "x" * 1000 + "';</script>\n"
+             '<img src="data:image/png;base64,' + "A" * 1000 + '">\n')
+    filler = asset * (size // len(asset))
+    return html.replace("</body>", filler + "</body>")
+
+
+FUNCTIONS = {"extruct": extruct_json_ld, "fast path": _fast_json_ld}
+
+
+def load_corpus(pad_size: int = 0):
+    pages = [p.read_text() for p in sorted(DATA_PATH.glob("*.html"))]
+    pages = [html for html in pages if _plan_syntaxes(html) == ["json-ld"]]
+    if pad_size:
+        pages = [pad(html, pad_size) for html in pages]
+    return pages
+
+
+def _vm_hwm() -> int:
+    """the peak resident set size in bytes, from /proc/self/status"""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) * 1024
+    raise RuntimeError("VmHWM is not in /proc/self/status")
+
+
+def _peak_rss(name: str, pad_size: int) -> int:
+    """run in a child process, returns by how much extracting one large page
+    raises the peak resident set size, in bytes.  (tracemalloc does not see
+    the memory that lxml allocates, so RSS is used instead.)"""
+    html = pad((DATA_PATH / "sally-coconut-cake.html").read_text(), pad_size)
+    gc.collect()
+    # reset the peak resident set size, Linux only
+    with open("/proc/self/clear_refs", "w") as f:
+        f.write("5")
+    before = _vm_hwm()
+    FUNCTIONS[name](html)
+    return _vm_hwm() - before
+
+
+def peak_rss(name: str, pad_size: int) -> int:
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        return pool.apply(_peak_rss, (name, pad_size))
+
+
+def pages_per_sec(name: str, pages, rounds: int) -> float:
+    func = FUNCTIONS[name]
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for html in pages:
+            func(html)
+    elapsed = time.perf_counter() - start
+    return (rounds * len(pages)) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--pad", type=int, default=2_000_000,
+                        help="characters of inline assets added to padded pages")
+    args = parser.parse_args()
+
+    for label, pad_size in (("as is", 0), ("padded", args.pad)):
+        corpus = load_corpus(pad_size)
+        print(f"{label}: {len(corpus)} pages, rounds: {args.rounds}")
+        for name in FUNCTIONS:
+            rate = pages_per_sec(name, corpus, args.rounds)
+            print(f"  {name:10s} {rate:8.1f} pages/sec")
+
+    size = args.pad * 10
+    print(f"peak memory for one page padded with {size:,} characters (Linux only):")
+    for name in FUNCTIONS:
+        growth = peak_rss(name, size)
+        print(f"  {name:10s} {growth / 1024 ** 2:8.1f} MiB")
+
+if __name__ == "__main__":
+    main()
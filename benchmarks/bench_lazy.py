@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+
+#
+# Copyright 2023 Micah Cochran
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Compare converting to python objects with python_objects=True and 'lazy'.
+
+The recipes from test_data are converted, then a job that only reads 'name'
+and 'recipeIngredient' is run over them, and one that reads every property.
+
+Run from the project directory:
+    $ python3 benchmarks/bench_lazy.py
+"""
+
+import argparse
+from pathlib import Path
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from scrape_schema_recipe import load  # noqa: E402
+from scrape_schema_recipe.scrape import _normalize_recipes  # noqa: E402
+
+DATA_PATH = Path(__file__).resolve().parent.parent / "scrape_schema_recipe" / "test_data"
+
+
+def read_some(recipe):
+    return recipe["name"], recipe.get("recipeIngredient")
+
+
+def read_all(recipe):
+    return dict(recipe)
+
+
+def recipes_per_sec(recipes, python_objects, read, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for recipe in _normalize_recipes(recipes, python_objects):
+            read(recipe)
+    elapsed = time.perf_counter() - start
+    return rounds * len(recipes) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+
+    recipes = [r for path in sorted(DATA_PATH.glob("*.html")) for r in load(path)]
+    print(f"recipes: {len(recipes)}, rounds: {args.rounds}")
+    for label, read in (("name and recipeIngredient", read_some), ("every property", read_all)):
+        print(f"reading {label}:")
+        for python_objects in (True, "lazy"):
+            rate = recipes_per_sec(recipes, python_objects, read, args.rounds)
+            print(f"  python_objects={python_objects!r:7s} {rate:10.0f} recipes/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+
+#
+# Copyright 2023 Micah Cochran
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Measure how load_many() scales with the number of worker processes.
+
+A directory is filled with copies of the pages in test_data, which is
+loaded serially with load() and then with load_many().
+
+Run from the project directory:
+    $ python3 benchmarks/bench_load_many.py
+"""
+
+import argparse
+import os
+from pathlib import Path
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from scrape_schema_recipe import load, load_many  # noqa: E402
+
+DATA_PATH = Path(__file__).resolve().parent.parent / "scrape_schema_recipe" / "test_data"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--copies", type=int, default=40,
+                        help="copies of each test_data page")
+    parser.add_argument("--max-processes", type=int, default=os.cpu_count())
+    parser.add_argument("--chunksize", type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for page in sorted(DATA_PATH.glob("*.html")):
+            for i in range(args.copies):
+                shutil.copy(page, Path(tmp_dir) / f"{page.stem}-{i}.html")
+        paths = sorted(Path(tmp_dir).glob("*.html"))
+        print(f"pages: {len(paths)}")
+
+        start = time.perf_counter()
+        for path in paths:
+            load(path)
+        serial = len(paths) / (time.perf_counter() - start)
+        print(f"load()           {serial:8.1f} pages/sec")
+
+        processes = 1
+        while processes <= args.max_processes:
+            start = time.perf_counter()
+            for _ in load_many(tmp_dir, processes=processes, chunksize=args.chunksize):
+                pass
+            rate = len(paths) / (time.perf_counter() - start)
+            print(f"load_many({processes:2d})    {rate:8.1f} pages/sec  "
+                  f"{rate / serial:5.2f}x load()")
+            processes *= 2
+
+
+if __name__ == "__main__":
+    main()
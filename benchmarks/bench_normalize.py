@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+
+#
+# Copyright 2023 Micah Cochran
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Compare the single pass _normalize_recipes() with the three passes it
+replaced (_migrate_old_schema(), _unescape_content() and _pythonize_objects(),
+copied below), over the recipes extracted from test_data.
+
+The old passes only unescaped strings and dropped empty values one level deep
+into the properties, _normalize_recipes() does it at any depth.  So the three
+passes are also timed with a recursive unescape, which gives the same recipes
+as _normalize_recipes().
+
+Run from the project directory:
+    $ python3 benchmarks/bench_normalize.py
+"""
+
+import argparse
+import copy
+import datetime
+import html
+from pathlib import Path
+import sys
+import time
+
+import isodate
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from scrape_schema_recipe.scrape import (  # noqa: E402
+    _convert_to_scrapings, _extract, _normalize_recipes, DATETIME_PROPERTIES,
+    DURATION_PROPERTIES)
+
+DATA_PATH = Path(__file__).resolve().parent.parent / "scrape_schema_recipe" / "test_data"
+
+
+# ---- the three passes, as they were ----
+
+def _migrate_old_schema(recipes):
+    for i in range(len(recipes)):
+        if 'ingredients' in recipes[i]:
+            recipes[i]['recipeIngredient'] = recipes[i].pop('ingredients')
+    return recipes
+
+
+def _unescape_content(recipe):
+    new_rec = {}
+
+    def html_unescape_string(v):
+        if isinstance(v, str):
+            return html.unescape(v)
+        return v
+
+    for key, value in recipe.items():
+        if isinstance(value, str):
+            new_rec[key] = html.unescape(value)
+        elif isinstance(value, dict):
+            new_rec[key] = {k: html_unescape_string(v) for k, v in value.items() if v}
+        elif isinstance(value, list):
+            if value == [] or value is None or value == "":
+                pass
+            elif len(value) > 0 and isinstance(value[0], dict):
+                new_rec[key] = [{k: html.unescape(v) for k, v in d_row.items() if v}
+                                for d_row in value]
+            elif len(value) > 0 and isinstance(value[0], str):
+                new_rec[key] = [html.unescape(item) for item in value]
+            else:
+                raise TypeError(f"on value {value}")
+    return new_rec
+
+
+def _parse_determine_date_datetime(s):
+    if 'T' in s:
+        return datetime.datetime.fromisoformat(s)
+    else:
+        return datetime.date.fromisoformat(s)
+
+
+def _convert_properties_scrape(recipes, properties, function):
+    for i in range(len(recipes)):
+        key_set = set(recipes[i].keys())
+        for p in key_set.intersection(properties):
+            try:
+                recipes[i][p] = function(recipes[i][p])
+            except (isodate.ISO8601Error, ValueError, TypeError):
+                if recipes[i][p] is None:
+                    recipes[i].pop(p)
+    return recipes
+
+
+def _pythonize_objects(scrapings, python_objects):
+    if python_objects is True or datetime.timedelta in python_objects:
+        scrapings = _convert_properties_scrape(scrapings, DURATION_PROPERTIES,
+                                               isodate.parse_duration)
+    if python_objects is True or datetime.date in python_objects:
+        scrapings = _convert_properties_scrape(scrapings, DATETIME_PROPERTIES,
+                                               _parse_determine_date_datetime)
+    return scrapings
+
+
+def three_passes(scrapings, python_objects):
+    scrapings = _migrate_old_schema(scrapings)
+    scrapings = [_unescape_content(s) for s in scrapings]
+    if python_objects is not False:
+        scrapings = _pythonize_objects(scrapings, python_objects)
+    return scrapings
+
+
+def _unescape_recursive(value):
+    if isinstance(value, str):
+        return html.unescape(value)
+    if isinstance(value, dict):
+        return {k: _unescape_recursive(v) for k, v in value.items() if v}
+    if isinstance(value, list):
+        return [_unescape_recursive(v) for v in value]
+    return value
+
+
+def three_passes_recursive(scrapings, python_objects):
+    """The three passes, with the output of _normalize_recipes()."""
+    scrapings = _migrate_old_schema(scrapings)
+    scrapings = [{k: _unescape_recursive(v) for k, v in s.items()
+                  if isinstance(v, (str, dict)) or (isinstance(v, list) and v)}
+                 for s in scrapings]
+    if python_objects is not False:
+        scrapings = _pythonize_objects(scrapings, python_objects)
+    return scrapings
+
+
+def one_pass(scrapings, python_objects):
+    return _normalize_recipes(scrapings, python_objects)
+
+
+def recipes_per_sec(pages, function, python_objects, rounds: int) -> float:
+    # the three passes change the recipes, so each round gets copies
+    batches = [copy.deepcopy(pages) for _ in range(rounds)]
+    count = 0
+    start = time.perf_counter()
+    for batch in batches:
+        for scrapings in batch:
+            count += len(function(scrapings, python_objects))
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+
+    pages = [_convert_to_scrapings(_extract(path.read_text(encoding="utf-8")))
+             for path in sorted(DATA_PATH.glob("*.html"))]
+    print(f"pages: {len(pages)}, rounds: {args.rounds}")
+    for python_objects in (False, True):
+        print(f"python_objects={python_objects}:")
+        before = recipes_per_sec(pages, three_passes, python_objects, args.rounds)
+        same = recipes_per_sec(pages, three_passes_recursive, python_objects, args.rounds)
+        after = recipes_per_sec(pages, one_pass, python_objects, args.rounds)
+        print(f"  three passes, one level deep  {before:10.0f} recipes/sec")
+        print(f"  three passes, any depth       {same:10.0f} recipes/sec")
+        print(f"  one pass, any depth           {after:10.0f} recipes/sec  "
+              f"({after / before:.2f}x, {after / same:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
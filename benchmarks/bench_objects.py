@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+
+#
+# Copyright 2023 Micah Cochran
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Compare the memory used by recipes as dictionaries and with as_objects=True.
+
+A corpus is built from copies of the recipes from test_data, each copy is
+unpickled so that it has its own strings, as recipes scraped from separate
+pages would.  The memory held by the corpus is measured with tracemalloc.
+
+Run from the project directory:
+    $ python3 benchmarks/bench_objects.py
+"""
+
+import argparse
+import gc
+from pathlib import Path
+import pickle
+import sys
+import tracemalloc
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from scrape_schema_recipe import load  # noqa: E402
+from scrape_schema_recipe.objects import to_objects  # noqa: E402
+
+DATA_PATH = Path(__file__).resolve().parent.parent / "scrape_schema_recipe" / "test_data"
+
+
+def corpus_bytes(blob: bytes, copies: int, as_objects: bool) -> int:
+    """The bytes held by a corpus of copies of the pickled recipes."""
+    gc.collect()
+    tracemalloc.start()
+    corpus = []
+    for _ in range(copies):
+        recipes = pickle.loads(blob)
+        corpus.extend(to_objects(recipes) if as_objects else recipes)
+        del recipes
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--copies", type=int, default=500)
+    args = parser.parse_args()
+
+    for python_objects in (False, True):
+        recipes = [r for path in sorted(DATA_PATH.glob("*.html"))
+                   for r in load(path, python_objects=python_objects)]
+        blob = pickle.dumps(recipes)
+        count = len(recipes) * args.copies
+        print(f"python_objects={python_objects}, recipes: {count}")
+        dict_size = corpus_bytes(blob, args.copies, as_objects=False)
+        object_size = corpus_bytes(blob, args.copies, as_objects=True)
+        print(f"  dictionaries      {dict_size / count:8.0f} bytes/recipe")
+        print(f"  as_objects=True   {object_size / count:8.0f} bytes/recipe"
+              f"  ({1 - object_size / dict_size:.0%} less)")
+
+
+if __name__ == "__main__":
+    main()
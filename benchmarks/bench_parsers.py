@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+
+#
+# Copyright 2023 Micah Cochran
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Compare the HTML parsers of loads(), html_parser='extruct', 'lxml' and
+'selectolax', on the test_data pages.  Parsers that aren't installed are
+skipped.
+
+The pages/second of loads() are reported for the pages with microdata, which
+have to be parsed, and for all of the pages with the HTML parsed (given
+syntaxes, which skips the JSON-LD fast path), along with the time taken to
+parse the HTML and to extract the items.
+
+Run from the project directory:
+    $ python3 benchmarks/bench_parsers.py
+"""
+
+import argparse
+from pathlib import Path
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from scrape_schema_recipe import loads, Stats  # noqa: E402
+from scrape_schema_recipe.parsers import html_parser_backend, HTML_PARSERS  # noqa: E402
+from scrape_schema_recipe.scrape import _plan_syntaxes  # noqa: E402
+
+DATA_PATH = Path(__file__).resolve().parent.parent / "scrape_schema_recipe" / "test_data"
+
+
+def bench(pages: list, html_parser: str, syntaxes, rounds: int):
+    """returns the pages per second, and the seconds per page of parsing and
+    of extracting the items"""
+    # the libraries are imported by the first call
+    loads(pages[0], syntaxes=syntaxes, html_parser=html_parser)
+    with Stats() as stats:
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for html in pages:
+                loads(html, syntaxes=syntaxes, html_parser=html_parser)
+        elapsed = time.perf_counter() - start
+
+    seconds = {name: histogram.sum for name, histogram in stats.extract_seconds.items()}
+    parse = seconds.pop("parse", 0.0)
+    extract = sum(seconds.values())
+    count = rounds * len(pages)
+    return count / elapsed, parse / count, extract / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+
+    html_parsers = []
+    for html_parser in HTML_PARSERS:
+        try:
+            html_parser_backend(html_parser)
+        except ImportError:
+            print(f"{html_parser} is not installed")
+            continue
+        html_parsers.append(html_parser)
+
+    pages = [path.read_text(encoding="utf-8") for path in sorted(DATA_PATH.glob("*.html"))]
+    corpora = {
+        "pages with microdata": ([html for html in pages if "microdata" in _plan_syntaxes(html)], None),
+        "all pages, parsed": (pages, ["json-ld", "microdata"]),
+    }
+    for name, (corpus, syntaxes) in corpora.items():
+        print(f"{name}: {len(corpus)} pages, {sum(len(html) for html in corpus) / 1024:.0f} KiB")
+        print(f"  {'':10s} {'loads()':>26s} {'parse':>10s} {'extract':>10s}")
+        baseline = None
+        for html_parser in html_parsers:
+            rate, parse, extract = bench(corpus, html_parser, syntaxes, args.rounds)
+            baseline = baseline or rate
+            print(f"  {html_parser:10s} {rate:10.1f} pages/sec ({rate / baseline:.2f}x) "
+                  f"{parse * 1000:7.2f} ms {extract * 1000:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
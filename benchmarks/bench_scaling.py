@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+
+#
+# Copyright 2023 Micah Cochran
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Measure how the time and memory of loads() scale with the size of the page,
+using synthetic pages from synthetic.py.
+
+Three things are grown in turn: the number of recipes on the page (for each
+layout), the number of ingredients and steps in a recipe, and the size of the
+page around a single recipe.  For each size the wall time and the tracemalloc
+peak are recorded, along with the scaling exponent from the previous size
+(1.0 is linear).  Exponents over --superlinear are flagged.
+
+tracemalloc only sees memory allocated by Python, not lxml's trees.  The time
+is measured in separate runs, without tracemalloc.
+
+Run from the project directory:
+    $ python3 benchmarks/bench_scaling.py
+    $ python3 benchmarks/bench_scaling.py --json scaling.json
+"""
+
+import argparse
+import gc
+import json
+import math
+from pathlib import Path
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from scrape_schema_recipe import loads  # noqa: E402
+from synthetic import LAYOUTS, make_page  # noqa: E402
+
+
+def measure(html: str, repeat: int) -> dict:
+    """The best wall time of loads() on the page and its tracemalloc peak."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        recipes = loads(html, python_objects=True)
+        times.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    loads(html, python_objects=True)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"time": min(times), "peak": peak, "recipes": len(recipes)}
+
+
+def exponent(x0: float, y0: float, x1: float, y1: float) -> float:
+    """The slope between two points on a log-log plot."""
+    return math.log(y1 / y0) / math.log(x1 / x0)
+
+
+def sweep(name: str, sizes: list, make, repeat: int, superlinear: float) -> list:
+    print(f"{name}:")
+    print(f"  {'size':>10s} {'chars':>10s} {'recipes':>8s} {'time':>10s} {'exp':>6s} "
+          f"{'peak':>10s} {'exp':>6s}")
+    rows = []
+    for size in sizes:
+        html = make(size)
+        row = dict(measure(html, repeat), size=size, chars=len(html))
+        flags = ""
+        if rows:
+            prev = rows[-1]
+            row["time_exp"] = exponent(prev["chars"], prev["time"], row["chars"], row["time"])
+            row["peak_exp"] = exponent(prev["chars"], prev["peak"], row["chars"], row["peak"])
+            if row["time_exp"] > superlinear or row["peak_exp"] > superlinear:
+                flags = "  superlinear"
+        print(f"  {size:10d} {row['chars']:10d} {row['recipes']:8d} {row['time'] * 1e3:8.2f}ms "
+              f"{row.get('time_exp', float('nan')):6.2f} {row['peak'] / 1024:8.0f}KiB "
+              f"{row.get('peak_exp', float('nan')):6.2f}{flags}")
+        rows.append(row)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs for each size, the best is kept")
+    parser.add_argument("--max-recipes", type=int, default=1024)
+    parser.add_argument("--max-ingredients", type=int, default=16384)
+    parser.add_argument("--max-size", type=int, default=16 * 1024 * 1024, help="the largest page, in characters")
+    parser.add_argument("--superlinear", type=float, default=1.25,
+                        help="flag a scaling exponent over this (default: 1.25)")
+    parser.add_argument("--json", metavar="FILE", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    def powers(start: int, stop: int) -> list:
+        return [4 ** i * start for i in range(int(math.log(stop / start, 4)) + 1)]
+
+    results = {}
+    for layout in LAYOUTS:
+        # one 'mixed' recipe is only JSON-LD, which takes the fast path
+        results[f"recipes, {layout}"] = sweep(
+            f"number of recipes, {layout}", powers(2 if layout == "mixed" else 1, args.max_recipes),
+            lambda n: make_page(recipes=n, layout=layout), args.repeat, args.superlinear)
+    for layout in ("json-ld", "microdata"):
+        results[f"ingredients, {layout}"] = sweep(
+            f"number of ingredients and steps in one recipe, {layout}",
+            powers(16, args.max_ingredients),
+            lambda n: make_page(layout=layout, ingredients=n, steps=n), args.repeat, args.superlinear)
+    results["page size"] = sweep(
+        "size of the page around one json-ld recipe, in characters",
+        powers(64 * 1024, args.max_size),
+        lambda n: make_page(size=n), args.repeat, args.superlinear)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+
+#
+# Copyright 2023 Micah Cochran
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Time each stage of the extraction over the test_data pages and a scaled up
+corpus, to notice when a change makes a stage slower.
+
+The stages are the ones _scrape_html() runs: extract (extruct's extractors,
+or the JSON-LD fast path), _convert_to_scrapings() and _normalize_recipes().
+The latency percentiles of each stage for a page and the pages/second of the
+whole pipeline are reported.  The scaled corpus repeats the <body> of each test page --scale
+times.
+
+Save a baseline, then compare against it after a change, which exits with
+status 1 when the median of a stage is more than --threshold slower:
+    $ python3 benchmarks/bench_stages.py --save-baseline baseline.json
+    $ python3 benchmarks/bench_stages.py --baseline baseline.json
+
+Run from the project directory:
+    $ python3 benchmarks/bench_stages.py
+"""
+
+import argparse
+import json
+from pathlib import Path
+import re
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from scrape_schema_recipe.scrape import (  # noqa: E402
+    _convert_to_scrapings, _extract, _normalize_recipes)
+
+DATA_PATH = Path(__file__).resolve().parent.parent / "scrape_schema_recipe" / "test_data"
+
+STAGES = ("extract", "convert", "normalize")
+PERCENTILES = (50, 90, 99)
+# slowdowns smaller than this are timing noise, the fast stages take microseconds
+NOISE_FLOOR = 10e-6
+
+_BODY = re.compile(r"(<body[^>]*>)(.*)(</body>)", re.DOTALL | re.IGNORECASE)
+
+
+def scale_page(html: str, scale: int) -> str:
+    """The page with the contents of its <body> repeated scale times."""
+    return _BODY.sub(lambda m: m.group(1) + m.group(2) * scale + m.group(3), html, count=1)
+
+
+def run_pipeline(html: str, timings: dict) -> None:
+    """Run the stages on the page, adding the time of each to timings."""
+    t0 = time.perf_counter()
+    data = _extract(html)
+    t1 = time.perf_counter()
+    scrapings = _convert_to_scrapings(data)
+    t2 = time.perf_counter()
+    _normalize_recipes(scrapings, True)
+    t3 = time.perf_counter()
+    for stage, start, end in zip(STAGES, (t0, t1, t2), (t1, t2, t3)):
+        timings[stage].append(end - start)
+
+
+def percentile(values: list, p: float) -> float:
+    """The nearest-rank percentile."""
+    ordered = sorted(values)
+    return ordered[max(0, int(round(p / 100 * len(ordered))) - 1)]
+
+
+def bench_corpus(pages: list, rounds: int) -> dict:
+    timings: dict = {stage: [] for stage in STAGES}
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for html in pages:
+            run_pipeline(html, timings)
+    elapsed = time.perf_counter() - start
+
+    result: dict = {"pages_per_sec": rounds * len(pages) / elapsed, "stages": {}}
+    for stage in STAGES:
+        result["stages"][stage] = {f"p{p}": percentile(timings[stage], p) for p in PERCENTILES}
+    return result
+
+
+def print_result(name: str, result: dict) -> None:
+    print(f"{name}: {result['pages_per_sec']:.1f} pages/sec")
+    print("  stage      " + "".join(f"{'p' + str(p):>12s}" for p in PERCENTILES))
+    for stage, stats in result["stages"].items():
+        print(f"  {stage:10s} " + "".join(f"{stats['p' + str(p)] * 1e3:10.3f}ms" for p in PERCENTILES))
+
+
+def regressions(results: dict, baseline: dict, threshold: float) -> list:
+    """The stages whose median is more than threshold slower than the baseline."""
+    slower = []
+    for name, result in results.items():
+        for stage, stats in result["stages"].items():
+            try:
+                before = baseline[name]["stages"][stage]["p50"]
+            except KeyError:
+                continue
+            if stats["p50"] > before * (1 + threshold) and stats["p50"] - before > NOISE_FLOOR:
+                slower.append(f"{name} {stage}: p50 {before * 1e3:.3f}ms -> {stats['p50'] * 1e3:.3f}ms "
+                              f"(+{stats['p50'] / before - 1:.0%})")
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--scale", type=int, default=20,
+                        help="times the <body> of the pages is repeated for the scaled corpus")
+    parser.add_argument("--save-baseline", metavar="FILE", help="write the results to this JSON file")
+    parser.add_argument("--baseline", metavar="FILE", help="compare with the results in this JSON file")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="the allowed slowdown of a stage's median, 0.25 is 25%% (default: 0.25)")
+    args = parser.parse_args()
+
+    pages = [path.read_text(encoding="utf-8") for path in sorted(DATA_PATH.glob("*.html"))]
+    corpora = {
+        "test_data": (pages, args.rounds),
+        f"scaled x{args.scale}": ([scale_page(html, args.scale) for html in pages],
+                                  max(5, args.rounds // args.scale)),
+    }
+
+    results = {}
+    for name, (corpus, rounds) in corpora.items():
+        results[name] = bench_corpus(corpus, rounds)
+        print_result(name, results[name])
+
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(json.dumps(results, indent=2))
+        print(f"saved the baseline to {args.save_baseline}")
+
+    if args.baseline:
+        slower = regressions(results, json.loads(Path(args.baseline).read_text()), args.threshold)
+        if slower:
+            print(f"stages more than {args.threshold:.0%} slower than the baseline:")
+            for line in slower:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"no stage is more than {args.threshold:.0%} slower than the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+
+#
+# Copyright 2023 Micah Cochran
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Compare the throughput of running every extruct syntax against only
+running the syntaxes that can yield schema.org/Recipe data.
+
+Run from the project directory:
+    $ python3 benchmarks/bench_syntaxes.py
+"""
+
+import argparse
+from pathlib import Path
+import sys
+import time
+
+import extruct
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from scrape_schema_recipe import loads  # noqa: E402
+from scrape_schema_recipe.scrape import _convert_to_scrapings  # noqa: E402
+
+DATA_PATH = Path(__file__).resolve().parent.parent / "scrape_schema_recipe" / "test_data"
+
+
+def all_syntaxes(html: str):
+    """The extraction as it was done before the syntax planner."""
+    return _convert_to_scrapings(extruct.extract(html))
+
+
+def planned_syntaxes(html: str):
+    return loads(html)
+
+
+def bench(func, pages, rounds: int) -> float:
+    """returns pages per second"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for html in pages:
+            func(html)
+    elapsed = time.perf_counter() - start
+    return (rounds * len(pages)) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    pages = [p.read_text() for p in sorted(DATA_PATH.glob("*.html"))]
+
+    old = bench(all_syntaxes, pages, args.rounds)
+    new = bench(planned_syntaxes, pages, args.rounds)
+
+    print(f"pages: {len(pages)}  rounds: {args.rounds}")
+    print(f"all syntaxes:     {old:8.1f} pages/sec")
+    print(f"planned syntaxes: {new:8.1f} pages/sec")
+    print(f"speedup:          {new / old:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
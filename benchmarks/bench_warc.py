@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+
+#
+# Copyright 2023 Micah Cochran
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Time iter_warc() on WARC files of growing size, made of the test_data pages
+and of the records that a crawl also has, requests, metadata, and responses
+that aren't HTML or have no recipe.
+
+The records/second are reported, along with the tracemalloc peak (of a
+second run, tracemalloc slows it down), which shouldn't grow with the size of
+the file.  For comparison, the same file is read by decoding every HTML
+response to a string and calling loads() on it, the way to do it without
+iter_warc().
+
+Run from the project directory:
+    $ python3 benchmarks/bench_warc.py
+"""
+
+import argparse
+import gzip
+from pathlib import Path
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from scrape_schema_recipe import iter_warc, loads, loads_bytes  # noqa: E402
+from scrape_schema_recipe.warc import _Block, _open_records, _read_headers, _read_warc_headers  # noqa: E402
+
+DATA_PATH = Path(__file__).resolve().parent.parent / "scrape_schema_recipe" / "test_data"
+
+
+def record(uri: str, record_type: str, content_type: str, block: bytes) -> bytes:
+    headers = (f"WARC/1.0\r\nWARC-Type: {record_type}\r\nWARC-Target-URI: {uri}\r\n"
+               f"Content-Type: {content_type}\r\nContent-Length: {len(block)}\r\n\r\n")
+    return gzip.compress(headers.encode() + block + b"\r\n\r\n", compresslevel=1)
+
+
+def response(content_type: str, body: bytes) -> bytes:
+    return f"HTTP/1.1 200 OK\r\nContent-Type: {content_type}\r\n\r\n".encode() + body
+
+
+def write_warc(path: Path, pages: int) -> int:
+    """Writes the test_data pages, each with the records around it, until
+    there are that many pages.  Returns the number of records."""
+    html = [p.read_bytes() for p in sorted(DATA_PATH.glob("*.html"))]
+    no_recipe = b"<html><head><title>About</title></head><body>" + b"<p>Text</p>" * 2000 + b"</body></html>"
+    records = 0
+    with open(path, "wb") as f:
+        for i in range(pages):
+            uri = f"https://example.com/{i}.html"
+            f.write(record(uri, "request", "application/http; msgtype=request", b"GET / HTTP/1.1\r\n\r\n"))
+            f.write(record(uri, "response", "application/http; msgtype=response",
+                           response("text/html", html[i % len(html)])))
+            f.write(record(uri, "metadata", "application/warc-fields", b"fetchTimeMs: 100\r\n"))
+            f.write(record(uri + ".css", "response", "application/http; msgtype=response",
+                           response("text/css", b"body { color: black; }" * 500)))
+            f.write(record(uri + "/about", "response", "application/http; msgtype=response",
+                           response("text/html", no_recipe)))
+            records += 5
+    return records
+
+
+def read_all(path: Path) -> int:
+    """Every HTML response decoded and given to loads()."""
+    recipes = 0
+    with open(path, "rb") as stream:
+        f = _open_records(stream)
+        while True:
+            headers = _read_warc_headers(f)
+            if headers is None:
+                break
+            block = _Block(f, int(headers["content-length"]))
+            if headers.get("warc-type") == "response":
+                block.readline()
+                http_headers = _read_headers(block, 65536) or {}
+                if http_headers.get("content-type") == "text/html":
+                    recipes += len(loads(block.read().decode("utf-8", "replace")))
+            block.skip()
+    return recipes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[100, 400, 1600])
+    args = parser.parse_args()
+
+    # the libraries are imported by the first call
+    loads_bytes((DATA_PATH / "foodista-british-treacle-tart.html").read_bytes())
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for pages in args.pages:
+            path = Path(tmpdir) / f"{pages}.warc.gz"
+            records = write_warc(path, pages)
+
+            start = time.perf_counter()
+            recipes = sum(len(result) for _, result in iter_warc(path))
+            elapsed = time.perf_counter() - start
+
+            tracemalloc.start()
+            for _ in iter_warc(path):
+                pass
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            start = time.perf_counter()
+            assert read_all(path) == recipes
+            loads_elapsed = time.perf_counter() - start
+
+            print(f"{records:6d} records, {path.stat().st_size / 1024 / 1024:6.1f} MiB: "
+                  f"{records / elapsed:8.1f} records/sec, peak {peak / 1024 / 1024:5.1f} MiB, "
+                  f"{recipes} recipes; loads() {records / loads_elapsed:8.1f} records/sec "
+                  f"(iter_warc() {loads_elapsed / elapsed:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
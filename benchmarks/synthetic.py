@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+
+#
+# Copyright 2023 Micah Cochran
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Generate synthetic HTML pages with schema.org/Recipe data, of a controlled
+size and shape, for the benchmarks.
+
+make_page() builds a page with n recipes in one of these layouts:
+    'json-ld'    a <script type="application/ld+json"> for each recipe
+    'graph'      one JSON-LD script with the recipes in '@graph'
+    'microdata'  an itemscope element for each recipe
+    'mixed'      alternating JSON-LD scripts and microdata
+
+The pages are the same for the same arguments.  To write a page to a file:
+    $ python3 benchmarks/synthetic.py --recipes 100 --layout graph > page.html
+"""
+
+import argparse
+import html
+import json
+import random
+
+LAYOUTS = ("json-ld", "graph", "microdata", "mixed")
+
+_WORDS = ("flour sugar butter salt pepper garlic onion lemon cream milk egg "
+          "chicken rice beans tomato basil oregano cumin ginger honey vinegar "
+          "stir whisk fold bake simmer chop slice mince roast boil until golden").split()
+
+
+def _words(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(n))
+
+
+def make_recipe(rng: random.Random, index: int, ingredients: int, steps: int) -> dict:
+    """A recipe in the JSON-LD shape, with that many ingredients and steps."""
+    return {
+        "@type": "Recipe",
+        "name": f"Synthetic Recipe {index}",
+        "description": _words(rng, 30),
+        "author": {"@type": "Person", "name": f"Cook {rng.randrange(1000)}"},
+        "datePublished": f"2020-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "prepTime": f"PT{rng.randint(5, 55)}M",
+        "cookTime": f"PT{rng.randint(1, 3)}H{rng.randint(0, 59)}M",
+        "totalTime": f"PT{rng.randint(4, 5)}H",
+        "recipeYield": f"{rng.randint(2, 12)} servings",
+        "recipeCategory": rng.choice(["Dessert", "Main Course", "Side Dish"]),
+        "recipeIngredient": [f"{rng.randint(1, 4)} cups {_words(rng, 3)}" for _ in range(ingredients)],
+        "recipeInstructions": [{"@type": "HowToStep", "text": _words(rng, 20) + " &amp; serve."}
+                               for _ in range(steps)],
+        "nutrition": {"@type": "NutritionInformation", "calories": f"{rng.randint(100, 900)} calories"},
+    }
+
+
+def _json_ld(data: dict) -> str:
+    return f'<script type="application/ld+json">{json.dumps(data)}</script>\n'
+
+
+def _microdata(recipe: dict) -> str:
+    e = html.escape
+    parts = ['<div itemscope itemtype="http://schema.org/Recipe">',
+             f'<h2 itemprop="name">{e(recipe["name"])}</h2>',
+             f'<p itemprop="description">{e(recipe["description"])}</p>',
+             f'<span itemprop="author">{e(recipe["author"]["name"])}</span>',
+             f'<meta itemprop="datePublished" content="{recipe["datePublished"]}">']
+    for prop in ("prepTime", "cookTime", "totalTime"):
+        parts.append(f'<meta itemprop="{prop}" content="{recipe[prop]}">')
+    parts.append(f'<span itemprop="recipeYield">{e(recipe["recipeYield"])}</span>')
+    parts.append(f'<span itemprop="recipeCategory">{e(recipe["recipeCategory"])}</span>')
+    parts.append("<ul>")
+    parts.extend(f'<li itemprop="recipeIngredient">{e(i)}</li>' for i in recipe["recipeIngredient"])
+    parts.append("</ul><ol>")
+    parts.extend(f'<li itemprop="recipeInstructions">{step["text"]}</li>'
+                 for step in recipe["recipeInstructions"])
+    parts.append("</ol></div>\n")
+    return "\n".join(parts)
+
+
+def make_page(
+    recipes: int = 1,
+    layout: str = "json-ld",
+    ingredients: int = 10,
+    steps: int = 8,
+    size: int = 0,
+    seed: int = 0,
+) -> str:
+    """A page with the recipes in the layout, padded with paragraphs of text
+    to at least size characters."""
+    if layout not in LAYOUTS:
+        raise ValueError(f"layout must be one of {LAYOUTS}")
+    rng = random.Random(seed)
+    data = [make_recipe(rng, i, ingredients, steps) for i in range(recipes)]
+
+    body = []
+    if layout == "graph":
+        body.append(_json_ld({"@context": "https://schema.org", "@graph": data}))
+    else:
+        for i, recipe in enumerate(data):
+            if layout == "microdata" or (layout == "mixed" and i % 2):
+                body.append(_microdata(recipe))
+            else:
+                body.append(_json_ld(dict(recipe, **{"@context": "https://schema.org"})))
+
+    head = ('<!DOCTYPE html>\n<html lang="en">\n<head>\n<meta charset="utf-8">\n'
+            f'<title>Synthetic page, {recipes} {layout} recipes</title>\n</head>\n<body>\n')
+    tail = "</body>\n</html>\n"
+    length = len(head) + sum(len(b) for b in body) + len(tail)
+    while length < size:
+        paragraph = f"<p>{_words(rng, 60)}</p>\n"
+        body.append(paragraph)
+        length += len(paragraph)
+    return head + "".join(body) + tail
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--recipes", type=int, default=1)
+    parser.add_argument("--layout", choices=LAYOUTS, default="json-ld")
+    parser.add_argument("--ingredients", type=int, default=10)
+    parser.add_argument("--steps", type=int, default=8)
+    parser.add_argument("--size", type=int, default=0, help="pad the page to this many characters")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(make_page(args.recipes, args.layout, args.ingredients, args.steps, args.size, args.seed), end="")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,58 @@
-#
-# Copyright 2018 Micah Cochran
-#
-# Licensed under the Apache License, Version 2.0 (the "License");
-# you may not use this file except in compliance with the License.
-# You may obtain a copy of the License at
-#
-#    http://www.apache.org/licenses/LICENSE-2.0
-#
-# Unless required by applicable law or agreed to in writing, software
-# distributed under the License is distributed on an "AS IS" BASIS,
-# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
-# See the License for the specific language governing permissions and
-# limitations under the License.
-#
-
-from .scrape import __version__, load, loads, scrape, scrape_url, SSRTypeError
-from .example_output import example_names, example_output
+#
+# Copyright 2018 Micah Cochran
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import importlib
+from typing import Any, List, TYPE_CHECKING
+
+from .scrape import __version__, LazyRecipe, load, loads, loads_bytes, scrape, scrape_url, SSRTypeError
+from .cache import HTTPCache, MemoryResultCache, ResultCache, SQLiteResultCache
+from .objects import HowToStep, NutritionInformation, Recipe
+from .stats import CallStats, Stats
+from .example_output import example_names, example_output
+
+# These are imported when they are first used, the modules import requests
+# and aiohttp, which are slow to import and not needed to scrape files.
+_LAZY = {
+    'ScrapeClient': 'client',
+    'load_many': 'batch',
+    'scrape_many': 'batch',
+    'scrape_many_async': 'aio',
+    'scrape_url_async': 'aio',
+    'crawl_site': 'crawl',
+    'CrawlState': 'crawl',
+    'iter_warc': 'warc',
+    'iter_warc_files': 'warc',
+}
+
+if TYPE_CHECKING:
+    from .client import ScrapeClient
+    from .batch import load_many, scrape_many
+    from .aio import scrape_many_async, scrape_url_async
+    from .crawl import crawl_site, CrawlState
+    from .warc import iter_warc, iter_warc_files
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = importlib.import_module(f'.{_LAZY[name]}', __name__)
+    value = getattr(module, name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(list(globals()) + list(_LAZY))
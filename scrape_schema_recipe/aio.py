@@ -0,0 +1,338 @@
+#
+# Copyright 2023 Micah Cochran
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# internal libraries
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor
+import functools
+import time
+# for mypy
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+# external libraries
+try:
+    import aiohttp
+except ImportError:
+    # aiohttp is an optional dependency, install with: pip install scrape-schema-recipe[async]
+    aiohttp = None  # type: ignore
+
+from .batch import ScrapeResult
+from .cache import _options_key, CacheEntry, HTTPCache, ResultCache
+from .client import _BodyReader, _can_stop_early, STREAM_CHUNK_SIZE, USER_AGENT_STR
+from .encoding import sniff_encoding
+from .objects import to_objects
+from .scrape import _scrape_html, SSRTypeError
+from .stats import _finish_call, _start_call, CallStats
+
+
+def _check_aiohttp() -> None:
+    if aiohttp is None:
+        raise ImportError("the asyncio functions require aiohttp, install it with: "
+                          "pip install scrape-schema-recipe[async]")
+
+
+def _check_result_cache(result_cache: Optional[ResultCache], executor: Optional[Executor]) -> None:
+    if result_cache is not None and isinstance(executor, ProcessPoolExecutor):
+        raise ValueError("result_cache can't be used with a ProcessPoolExecutor, "
+                         "its processes don't share the cache")
+
+
+def create_session(
+    user_agent_str: Optional[str] = None,
+    limit: int = 100,
+    limit_per_host: int = 0,
+    timeout: float = 5,
+) -> 'aiohttp.ClientSession':
+    """Create an aiohttp.ClientSession for the asyncio functions, with a
+    connection pool of limit connections (limit_per_host for each host,
+    0 is no limit for each host), and a total timeout in seconds."""
+    _check_aiohttp()
+    connector = aiohttp.TCPConnector(limit=limit, limit_per_host=limit_per_host)
+    return aiohttp.ClientSession(
+        connector=connector,
+        headers={'User-Agent': user_agent_str or USER_AGENT_STR},
+        timeout=aiohttp.ClientTimeout(total=timeout),
+    )
+
+
+async def scrape_url_async(
+    url: str,
+    python_objects: Union[bool, str, List, Tuple] = False,
+    nonstandard_attrs: bool = False,
+    migrate_old_schema: bool = True,
+    user_agent_str: Optional[str] = None,
+    syntaxes: Optional[List[str]] = None,
+    session: Optional['aiohttp.ClientSession'] = None,
+    executor: Optional[Executor] = None,
+    cache: Optional[HTTPCache] = None,
+    stream: bool = False,
+    max_bytes: Optional[int] = None,
+    as_objects: bool = False,
+    json_backend: Optional[str] = None,
+    html_parser: Optional[str] = None,
+    result_cache: Optional[ResultCache] = None,
+) -> List[Dict[str, Any]]:
+    """scrape from a URL with asyncio, requires aiohttp.
+
+    The parameters are the same as scrape_url(), with these additions:
+
+    session : aiohttp.ClientSession, optional
+        the session to fetch with, create_session() makes one that is set up
+        for this library.  When None a session is created for this request,
+        use a session to reuse its connection pool across requests.
+        (defaults to None)
+
+    executor : concurrent.futures.Executor, optional
+        the executor that the HTML is parsed in, so that parsing does not
+        stall the event loop.  A ProcessPoolExecutor parses on other cores.
+        (defaults to None, which is the event loop's default executor)
+
+    cache : HTTPCache, optional
+        cache the response on disk and make a conditional request when the
+        url is in the cache, see HTTPCache.
+        (defaults to None)
+
+    stream, max_bytes, as_objects, json_backend, html_parser
+        see scrape_url()
+
+    result_cache : ResultCache, optional
+        see scrape_url().  It can't be used with a ProcessPoolExecutor, its
+        processes don't share the cache.
+        (defaults to None)
+    """
+    _check_aiohttp()
+    if not isinstance(url, str):
+        raise SSRTypeError(var_name="url", object_type=type(url), expected_types="string")
+    _check_result_cache(result_cache, executor)
+
+    if session is None:
+        async with create_session(user_agent_str) as own_session:
+            return await scrape_url_async(url, python_objects, nonstandard_attrs,
+                                          migrate_old_schema, syntaxes=syntaxes,
+                                          session=own_session, executor=executor,
+                                          cache=cache, stream=stream, max_bytes=max_bytes,
+                                          as_objects=as_objects, json_backend=json_backend,
+                                          html_parser=html_parser, result_cache=result_cache)
+
+    call = _start_call(url)
+    try:
+        recipes = await _scrape_url_async(url, python_objects, nonstandard_attrs,
+                                          migrate_old_schema, user_agent_str, syntaxes,
+                                          session, executor, cache, stream, max_bytes,
+                                          json_backend, html_parser, result_cache, call)
+    except Exception as e:
+        if call is not None:
+            call.error = type(e).__name__
+        raise
+    finally:
+        if call is not None:
+            _finish_call(call)
+
+    # converted here, so that the cache keeps dictionaries
+    if as_objects:
+        return to_objects(recipes)  # type: ignore
+    return recipes
+
+
+async def _scrape_url_async(
+    url: str,
+    python_objects: Union[bool, str, List, Tuple],
+    nonstandard_attrs: bool,
+    migrate_old_schema: bool,
+    user_agent_str: Optional[str],
+    syntaxes: Optional[List[str]],
+    session: 'aiohttp.ClientSession',
+    executor: Optional[Executor],
+    cache: Optional[HTTPCache],
+    stream: bool,
+    max_bytes: Optional[int],
+    json_backend: Optional[str],
+    html_parser: Optional[str],
+    result_cache: Optional[ResultCache],
+    call: Optional[CallStats],
+) -> List[Dict[str, Any]]:
+    headers = {'User-Agent': user_agent_str} if user_agent_str else {}
+    entry = None
+    key = _options_key(python_objects, nonstandard_attrs, migrate_old_schema, syntaxes,
+                       json_backend, html_parser)
+    loop = asyncio.get_running_loop()
+    # the cache reads and writes files, it's used in the default executor's
+    # threads, which share this process's cache unlike a ProcessPoolExecutor
+    if cache is not None:
+        entry = await loop.run_in_executor(None, cache.get, url)
+        if entry is not None:
+            headers.update(entry.conditional_headers())
+
+    start = time.perf_counter()
+    async with session.get(url, headers=headers or None) as r:
+        if entry is not None and r.status == 304:
+            recipes = entry.get_result(key)
+            if recipes is not None:
+                await loop.run_in_executor(None, cache.revalidated, entry)  # type: ignore
+                if call is not None:
+                    call.fetch_seconds = time.perf_counter() - start
+                    call.cached = True
+                    call.recipes = len(recipes)
+                return recipes
+            body = entry.body
+            encoding = entry.encoding
+            final_url = entry.final_url
+        else:
+            r.raise_for_status()
+            final_url = str(r.url)
+            if stream or max_bytes is not None:
+                reader = _BodyReader(stream and _can_stop_early(syntaxes), max_bytes)
+                async for chunk in r.content.iter_chunked(STREAM_CHUNK_SIZE):
+                    if reader.feed(chunk):
+                        break
+                body = bytes(reader.body)
+                # a partial body can't be used to answer later requests
+                complete = reader.complete
+            else:
+                body = await r.read()
+                complete = True
+            encoding = sniff_encoding(body, r.headers.get('Content-Type'))
+            if cache is not None and complete:
+                entry = CacheEntry(url, final_url, r.headers.get('ETag'),
+                                   r.headers.get('Last-Modified'), body, encoding)
+            else:
+                entry = None
+            if call is not None:
+                call.bytes_downloaded = len(body)
+    if call is not None:
+        call.fetch_seconds = time.perf_counter() - start
+
+    # the call is given to the executor, which may run in a thread that
+    # doesn't have this task's context, another process can't record to it
+    if isinstance(executor, ProcessPoolExecutor):
+        call = None
+    recipes = await loop.run_in_executor(
+        executor, functools.partial(_scrape_html, body, python_objects,
+                                    nonstandard_attrs, migrate_old_schema,
+                                    syntaxes, url=final_url, encoding=encoding,
+                                    result_cache=result_cache, json_backend=json_backend,
+                                    html_parser=html_parser, call=call))
+
+    if cache is not None and entry is not None:
+        entry.result_key = key
+        await loop.run_in_executor(None, cache.put, entry, recipes)
+    return recipes
+
+
+async def scrape_many_async(
+    urls: Iterable[str],
+    python_objects: Union[bool, str, List, Tuple] = False,
+    nonstandard_attrs: bool = False,
+    migrate_old_schema: bool = True,
+    user_agent_str: Optional[str] = None,
+    syntaxes: Optional[List[str]] = None,
+    concurrency: int = 100,
+    per_host_limit: int = 0,
+    ordered: bool = False,
+    session: Optional['aiohttp.ClientSession'] = None,
+    executor: Optional[Executor] = None,
+    cache: Optional[HTTPCache] = None,
+    stream: bool = False,
+    max_bytes: Optional[int] = None,
+    as_objects: bool = False,
+    json_backend: Optional[str] = None,
+    html_parser: Optional[str] = None,
+    result_cache: Optional[ResultCache] = None,
+) -> AsyncIterator[Tuple[str, ScrapeResult]]:
+    """Scrape many URLs with asyncio, requires aiohttp.
+
+    The parameters are the same as scrape_many(), with these additions
+    and differences:
+
+    concurrency : int, optional
+        the maximum number of urls being fetched and scraped at once.
+        (defaults to 100)
+
+    per_host_limit : int, optional
+        the maximum number of connections to one host, 0 is no limit.
+        Not used when session is given, it is set on the session's connector.
+        (defaults to 0)
+
+    session, executor, cache, stream, max_bytes, as_objects, json_backend,
+    html_parser, result_cache
+        see scrape_url_async()
+
+    Yields
+    -------
+    tuple
+        (url, result) where the result is the list of recipes for the url, or
+        the exception that was raised scraping it.
+    """
+    _check_aiohttp()
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+    _check_result_cache(result_cache, executor)
+
+    own_session = session is None
+    if session is None:
+        session = create_session(user_agent_str, limit=concurrency,
+                                  limit_per_host=per_host_limit)
+        user_agent_str = None  # already in the session's headers
+
+    async def work(index: int, url: str) -> Tuple[int, str, ScrapeResult]:
+        try:
+            recipes = await scrape_url_async(url, python_objects, nonstandard_attrs,
+                                             migrate_old_schema, user_agent_str,
+                                             syntaxes, session, executor, cache,
+                                             stream, max_bytes, as_objects, json_backend,
+                                             html_parser, result_cache)
+            return index, url, recipes
+        except Exception as e:
+            return index, url, e
+
+    url_iter = enumerate(urls)
+    pending: Set['asyncio.Future[Tuple[int, str, ScrapeResult]]'] = set()
+    # for ordered results
+    next_index = 0
+    finished: Dict[int, Tuple[str, ScrapeResult]] = {}
+
+    try:
+        while True:
+            # keep no more than concurrency urls in flight, counting the
+            # results that wait for an earlier one when ordered
+            while len(pending) + len(finished) < concurrency:
+                item = next(url_iter, None)
+                if item is None:
+                    break
+                index, url = item
+                pending.add(asyncio.ensure_future(work(index, url)))
+
+            if not pending:
+                return
+
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                index, url, result = task.result()
+                if ordered:
+                    finished[index] = (url, result)
+                else:
+                    yield url, result
+
+            while next_index in finished:
+                yield finished.pop(next_index)
+                next_index += 1
+    finally:
+        for task in pending:
+            task.cancel()
+        # the cancelled tasks finish with the session before it is closed
+        await asyncio.gather(*pending, return_exceptions=True)
+        if own_session:
+            await session.close()
@@ -0,0 +1,350 @@
+#
+# Copyright 2023 Micah Cochran
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# internal libraries
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+import itertools
+import os
+from pathlib import Path
+import pickle
+from urllib.parse import urlsplit
+# for mypy
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Tuple, TYPE_CHECKING, Union
+
+from .cache import HTTPCache
+from .scrape import load
+from .stats import _bind
+
+if TYPE_CHECKING:
+    # imported in scrape_many(), so that load_many() doesn't import requests
+    from .client import ScrapeClient
+
+
+# the result for each url, either the list of recipes or the exception raised
+ScrapeResult = Union[List[Dict[str, Any]], Exception]
+
+
+def scrape_many(
+    urls: Iterable[str],
+    python_objects: Union[bool, str, List, Tuple] = False,
+    nonstandard_attrs: bool = False,
+    migrate_old_schema: bool = True,
+    syntaxes: Optional[List[str]] = None,
+    max_workers: int = 8,
+    per_host_limit: int = 2,
+    ordered: bool = False,
+    client: Optional['ScrapeClient'] = None,
+    cache: Optional[HTTPCache] = None,
+    stream: bool = False,
+    max_bytes: Optional[int] = None,
+    as_objects: bool = False,
+    json_backend: Optional[str] = None,
+    html_parser: Optional[str] = None,
+) -> Iterator[Tuple[str, ScrapeResult]]:
+    """Scrape many URLs in a thread pool, over a shared connection pool.
+
+    Parameters
+    ----------
+    urls : iterable of strings
+        The urls to scrape, these are read as they are needed.
+
+    python_objects, nonstandard_attrs, migrate_old_schema, syntaxes
+        see scrape_url()
+
+    max_workers : int, optional
+        the number of threads fetching and scraping.
+        (defaults to 8)
+
+    per_host_limit : int, optional
+        the maximum number of requests to one host at the same time, so that
+        one site can not take up all of the workers.
+        (defaults to 2)
+
+    ordered : bool, optional
+        when True the results are yielded in the same order as urls,
+        otherwise they are yielded as they finish.
+        (defaults to False)
+
+    client : ScrapeClient, optional
+        the client to fetch the urls with, when None a client is created with
+        a pool that fits max_workers and per_host_limit and closed afterwards.
+        (defaults to None)
+
+    cache : HTTPCache, optional
+        cache responses on disk and make conditional requests, see HTTPCache.
+        Not used when client is given, give the cache to the client instead.
+        (defaults to None)
+
+    stream, max_bytes, as_objects
+        see scrape_url()
+
+    json_backend, html_parser : string, optional
+        see scrape_url().  Not used when client is given, give them to the
+        client instead.
+        (defaults to None)
+
+    Yields
+    -------
+    tuple
+        (url, result) where the result is the list of recipes for the url, or
+        the exception that was raised scraping it.
+    """
+    if max_workers < 1 or per_host_limit < 1:
+        raise ValueError("max_workers and per_host_limit must be at least 1")
+
+    own_client = client is None
+    if client is None:
+        from .client import ScrapeClient
+        client = ScrapeClient(pool_connections=max_workers,
+                              pool_maxsize=min(max_workers, per_host_limit),
+                              cache=cache, json_backend=json_backend,
+                              html_parser=html_parser)
+
+    def work(url: str) -> ScrapeResult:
+        try:
+            return client.scrape_url(url, python_objects=python_objects,  # type: ignore
+                                     nonstandard_attrs=nonstandard_attrs,
+                                     migrate_old_schema=migrate_old_schema,
+                                     syntaxes=syntaxes, stream=stream,
+                                     max_bytes=max_bytes, as_objects=as_objects)
+        except Exception as e:
+            return e
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # the worker threads record to the caller's Stats
+            yield from _dispatch(urls, _bind(work), executor, max_workers,
+                                 per_host_limit, ordered)
+    finally:
+        if own_client:
+            client.close()
+
+
+def _host(url: str) -> str:
+    try:
+        return urlsplit(url).netloc.lower()
+    except (TypeError, ValueError, AttributeError):
+        # let the worker raise the error for the url
+        return ''
+
+
+def _dispatch(
+    urls: Iterable[str],
+    work: Any,
+    executor: ThreadPoolExecutor,
+    max_workers: int,
+    per_host_limit: int,
+    ordered: bool,
+) -> Iterator[Tuple[str, ScrapeResult]]:
+    """Submit the work for the urls to the executor, keeping no more than
+    per_host_limit running for each host.  The urls are read as they are
+    needed, only a bounded number of them is kept waiting, and when ordered
+    only a bounded number of results wait for an earlier one."""
+    url_iter = iter(urls)
+    urls_exhausted = False
+    max_waiting = max_workers * 16
+
+    waiting: Dict[str, Deque[Tuple[int, str]]] = {}  # by host
+    num_waiting = 0
+    running: Dict[str, int] = {}  # by host
+    futures: Dict[Future, Tuple[int, str, str]] = {}
+
+    # for ordered results
+    next_index = 0
+    finished: Dict[int, Tuple[str, ScrapeResult]] = {}
+
+    index = 0
+    while True:
+        # read more urls
+        while not urls_exhausted and num_waiting < max_waiting:
+            try:
+                url = next(url_iter)
+            except StopIteration:
+                urls_exhausted = True
+                break
+            waiting.setdefault(_host(url), deque()).append((index, url))
+            num_waiting += 1
+            index += 1
+
+        # start work for hosts that are under their limit, while the results
+        # that wait for an earlier one (when ordered) leave room for more.
+        # The hosts are tried from the earliest waiting url, which is started
+        # even when there is no room, otherwise the later results could fill
+        # the room and nothing more would be yielded.
+        hosts = sorted(waiting, key=lambda host: waiting[host][0][0])
+        for host in hosts:
+            queue = waiting[host]
+            while (queue and len(futures) < max_workers and running.get(host, 0) < per_host_limit
+                   and (len(futures) + len(finished) < max_waiting or queue[0][0] == next_index)):
+                i, url = queue.popleft()
+                num_waiting -= 1
+                running[host] = running.get(host, 0) + 1
+                futures[executor.submit(work, url)] = (i, url, host)
+            if not queue:
+                del waiting[host]
+
+        if not futures:
+            # nothing is running, and the earliest url would have been
+            # started, so nothing is waiting and the urls are done
+            return
+
+        done, _ = wait(futures, return_when=FIRST_COMPLETED)
+        for future in done:
+            i, url, host = futures.pop(future)
+            running[host] -= 1
+            if running[host] == 0:
+                del running[host]
+            if ordered:
+                finished[i] = (url, future.result())
+            else:
+                yield url, future.result()
+
+        while next_index in finished:
+            yield finished.pop(next_index)
+            next_index += 1
+
+
+def load_many(
+    paths: Union[str, Path, Iterable[Union[str, Path]]],
+    python_objects: Union[bool, str, List, Tuple] = False,
+    nonstandard_attrs: bool = False,
+    migrate_old_schema: bool = True,
+    syntaxes: Optional[List[str]] = None,
+    processes: Optional[int] = None,
+    chunksize: int = 8,
+    ordered: bool = False,
+    pattern: str = '*.html',
+    as_objects: bool = False,
+    json_backend: Optional[str] = None,
+    html_parser: Optional[str] = None,
+) -> Iterator[Tuple[Union[str, Path], ScrapeResult]]:
+    """load many files with load(), spread across worker processes.
+
+    Parameters
+    ----------
+    paths : directory name, or iterable of file names or pathlib.Path objects
+        The files to load, these are read as they are needed.  When this is
+        a directory, the files in it that match pattern are loaded.
+
+    python_objects, nonstandard_attrs, migrate_old_schema, syntaxes
+        see load()
+
+    processes : int, optional
+        the number of worker processes.
+        (defaults to None, which is the number of CPUs)
+
+    chunksize : int, optional
+        the number of files sent to a worker process at a time.  No more than
+        2 chunks for each process are in flight, counting the finished chunks
+        that wait for an earlier one when ordered, which bounds the memory used.
+        (defaults to 8)
+
+    ordered : bool, optional
+        when True the results are yielded in the same order as paths,
+        otherwise they are yielded as they finish.
+        (defaults to False)
+
+    pattern : str, optional
+        the glob pattern for files, when paths is a directory.
+        (defaults to '*.html')
+
+    as_objects, json_backend, html_parser
+        see load()
+
+    Yields
+    -------
+    tuple
+        (path, result) where the result is the list of recipes for the path,
+        or the exception that was raised loading it.
+    """
+    if isinstance(paths, (str, Path)):
+        if not Path(paths).is_dir():
+            raise NotADirectoryError(f'{paths} is not a directory, give an iterable of files')
+        paths = sorted(Path(paths).glob(pattern))
+
+    if processes is None:
+        processes = os.cpu_count() or 1
+    if processes < 1 or chunksize < 1:
+        raise ValueError("processes and chunksize must be at least 1")
+
+    options = {'python_objects': python_objects,
+               'nonstandard_attrs': nonstandard_attrs,
+               'migrate_old_schema': migrate_old_schema,
+               'syntaxes': syntaxes,
+               'as_objects': as_objects,
+               'json_backend': json_backend,
+               'html_parser': html_parser}
+
+    path_iter = iter(paths)
+    paths_exhausted = False
+    max_in_flight = processes * 2
+    futures: Dict[Future, int] = {}
+    # for ordered results
+    next_index = 0
+    finished: Dict[int, List[Tuple[Any, ScrapeResult]]] = {}
+
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        index = 0
+        while True:
+            # the chunks that are done but wait for an earlier one are in
+            # flight too, so a slow chunk can't make the results pile up
+            while not paths_exhausted and len(futures) + len(finished) < max_in_flight:
+                chunk = list(itertools.islice(path_iter, chunksize))
+                if not chunk:
+                    paths_exhausted = True
+                    break
+                futures[executor.submit(_load_chunk, chunk, options)] = index
+                index += 1
+
+            if not futures:
+                # (the earliest chunk is running whenever any are waiting)
+                return
+
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                i = futures.pop(future)
+                if ordered:
+                    finished[i] = future.result()
+                else:
+                    yield from future.result()
+
+            while next_index in finished:
+                yield from finished.pop(next_index)
+                next_index += 1
+
+
+def _load_chunk(
+    paths: List[Union[str, Path]], options: Dict[str, Any]
+) -> List[Tuple[Union[str, Path], ScrapeResult]]:
+    """Runs in a worker process for load_many()"""
+    results: List[Tuple[Union[str, Path], ScrapeResult]] = []
+    for path in paths:
+        try:
+            results.append((path, load(path, **options)))
+        except Exception as e:
+            results.append((path, _picklable(e)))
+    return results
+
+
+def _picklable(e: Exception) -> Exception:
+    """Exceptions are sent back from the worker processes, some of them can
+    not be pickled (such as those with required keyword arguments)."""
+    try:
+        pickle.loads(pickle.dumps(e))
+        return e
+    except Exception:
+        return RuntimeError(f'{type(e).__name__}: {e}')
@@ -0,0 +1,476 @@
+#
+# Copyright 2023 Micah Cochran
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# internal libraries
+from abc import ABC, abstractmethod
+from collections import namedtuple, OrderedDict
+from dataclasses import dataclass
+import datetime
+from decimal import Decimal
+import hashlib
+import json
+import mmap
+from pathlib import Path
+import sqlite3
+import threading
+import time
+# for mypy
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+
+@dataclass
+class CacheEntry:
+    """A response stored in the HTTPCache."""
+    url: str
+    final_url: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    body: bytes
+    encoding: Optional[str]
+    # the extraction result for the options in result_key, see _dump_recipes()
+    result_key: Optional[str] = None
+    result: Optional[bytes] = None
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """The headers to revalidate this entry with the server."""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+    def get_result(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        """The cached extraction result, if it was made with the same options."""
+        if self.result is None or self.result_key != key:
+            return None
+        try:
+            return _load_recipes(self.result)
+        except ValueError:
+            # such as a result of an older version, which was pickled
+            return None
+
+
+class HTTPCache:
+    """An on-disk cache of HTTP responses for conditional requests.
+
+    The body, ETag and Last-Modified of responses are stored, so that later
+    requests for the url send If-None-Match/If-Modified-Since.  When the server
+    responds 304 Not Modified, the cached body (or better, the cached
+    extraction result) is used.  Responses without an ETag or Last-Modified
+    are not stored, they can't be revalidated.
+
+    The results are stored as JSON, which is read without running any code,
+    so a cache that others can write to can give wrong recipes, but can't
+    run code in the scraper.
+
+    Parameters
+    ----------
+    directory : string or pathlib.Path
+        the directory to keep the cache in, it is created if needed.
+
+    max_size : int, optional
+        the maximum size in bytes of the stored bodies and results, the least
+        recently used entries are evicted to keep under it.
+        (defaults to 1 GiB)
+
+    max_age : float, optional
+        entries that have not been validated by the server for this many
+        seconds are evicted.
+        (defaults to 30 days)
+
+    The cache can be shared between threads.
+    """
+
+    FILENAME = 'http-cache.sqlite3'
+
+    def __init__(
+        self,
+        directory: Union[str, Path],
+        max_size: int = 1024 ** 3,
+        max_age: float = 30 * 24 * 60 * 60,
+    ):
+        self.max_size = max_size
+        self.max_age = max_age
+        Path(directory).mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(Path(directory) / self.FILENAME),
+                                   check_same_thread=False)
+        with self._db:
+            self._db.execute('''CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                final_url TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                body BLOB NOT NULL,
+                encoding TEXT,
+                result_key TEXT,
+                result BLOB,
+                size INTEGER NOT NULL,
+                validated_at REAL NOT NULL,
+                accessed_at REAL NOT NULL)''')
+            self._db.execute('CREATE INDEX IF NOT EXISTS responses_accessed_at '
+                             'ON responses (accessed_at)')
+
+    def __enter__(self) -> 'HTTPCache':
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def clear(self) -> None:
+        with self._lock, self._db:
+            self._db.execute('DELETE FROM responses')
+
+    def get(self, url: str) -> Optional[CacheEntry]:
+        """Returns the entry for the url, None if there isn't one."""
+        now = time.time()
+        with self._lock, self._db:
+            row = self._db.execute(
+                'SELECT url, final_url, etag, last_modified, body, encoding, '
+                'result_key, result, validated_at FROM responses WHERE url = ?',
+                (url,)).fetchone()
+            if row is None:
+                return None
+            if now - row[-1] > self.max_age:
+                self._db.execute('DELETE FROM responses WHERE url = ?', (url,))
+                return None
+            self._db.execute('UPDATE responses SET accessed_at = ? WHERE url = ?',
+                             (now, url))
+        return CacheEntry(*row[:-1])
+
+    def put(self, entry: CacheEntry, recipes: Optional[List[Dict[str, Any]]] = None) -> None:
+        """Store a response, along with its extraction result when given."""
+        if not entry.etag and not entry.last_modified:
+            return
+        if recipes is not None:
+            try:
+                entry.result = _dump_recipes(recipes)
+            except (TypeError, ValueError):
+                # a property that isn't JSON, only the body is stored
+                entry.result = entry.result_key = None
+        size = len(entry.body) + len(entry.result or b'')
+        if size > self.max_size:
+            return
+
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (entry.url, entry.final_url, entry.etag, entry.last_modified,
+                 entry.body, entry.encoding, entry.result_key, entry.result,
+                 size, now, now))
+            self._evict(now)
+
+    def revalidated(self, entry: CacheEntry, recipes: Optional[List[Dict[str, Any]]] = None) -> None:
+        """The server responded 304 Not Modified for the entry, this also
+        stores the extraction result when given."""
+        if recipes is not None:
+            self.put(entry, recipes)
+            return
+        with self._lock, self._db:
+            self._db.execute('UPDATE responses SET validated_at = ? WHERE url = ?',
+                             (time.time(), entry.url))
+
+    def _evict(self, now: float) -> None:
+        """Remove expired entries, then the least recently used entries until
+        the cache is under max_size."""
+        self._db.execute('DELETE FROM responses WHERE validated_at < ?',
+                         (now - self.max_age,))
+        total = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self.max_size:
+            return
+        rows = self._db.execute('SELECT url, size FROM responses ORDER BY accessed_at')
+        evict = []
+        for url, size in rows:
+            if total <= self.max_size:
+                break
+            evict.append((url,))
+            total -= size
+        self._db.executemany('DELETE FROM responses WHERE url = ?', evict)
+
+
+def _dump_recipes(recipes: List[Dict[str, Any]]) -> bytes:
+    """The recipes as JSON, with the types of the dates and durations that
+    python_objects converted, and whether they are LazyRecipes.  This is
+    stored instead of a pickle, which runs the code that it's given when
+    it's loaded.
+
+    Raises
+    ------
+    TypeError
+        a property isn't JSON, or a date or duration.
+    """
+    from .scrape import LazyRecipe
+
+    out = []
+    for recipe in recipes:
+        lazy = isinstance(recipe, LazyRecipe)
+        # (a LazyRecipe's properties, without converting them)
+        data = recipe._data if lazy else recipe  # type: ignore
+        values = {}
+        types = {}
+        for key, value in data.items():
+            t = type(value)
+            if t is datetime.datetime or t is datetime.date:
+                types[key] = t.__name__
+                value = value.isoformat()
+            elif t is datetime.timedelta:
+                types[key] = 'timedelta'
+                value = [value.days, value.seconds, value.microseconds]
+            elif t is not str and t is not dict and t is not list:
+                # imported here, isodate is only needed for durations
+                import isodate
+                if isinstance(value, isodate.Duration):
+                    types[key] = 'duration'
+                    td = value.tdelta
+                    value = [str(value.years), str(value.months), td.days, td.seconds, td.microseconds]
+            values[key] = value
+        item: Dict[str, Any] = {'recipe': values}
+        if types:
+            item['types'] = types
+        if lazy:
+            item['lazy'] = True
+        out.append(item)
+    # (escaping the non-ASCII characters is faster, and keeps lone surrogates)
+    return json.dumps(out, separators=(',', ':')).encode('ascii')
+
+
+def _load_duration(value: List[Any]) -> Any:
+    import isodate
+
+    years, months, days, seconds, microseconds = value
+    return isodate.Duration(days=days, seconds=seconds, microseconds=microseconds,
+                            months=Decimal(months), years=Decimal(years))
+
+
+_LOADERS: Dict[str, Any] = {
+    'datetime': datetime.datetime.fromisoformat,
+    'date': datetime.date.fromisoformat,
+    'timedelta': lambda value: datetime.timedelta(*value),
+    'duration': _load_duration,
+}
+
+
+def _load_recipes(data: bytes) -> List[Dict[str, Any]]:
+    """The recipes that _dump_recipes() stored.
+
+    Raises
+    ------
+    ValueError
+        data isn't recipes stored by _dump_recipes().
+    """
+    from .scrape import LazyRecipe
+
+    out: List[Any] = []
+    try:
+        for item in json.loads(data):
+            recipe = item['recipe']
+            for key, kind in item.get('types', {}).items():
+                recipe[key] = _LOADERS[kind](recipe[key])
+            out.append(LazyRecipe(recipe) if item.get('lazy') else recipe)
+    except (KeyError, TypeError, AttributeError) as e:
+        raise ValueError(f'not stored recipes: {e!r}') from e
+    return out
+
+
+def _options_key(
+    python_objects: Union[bool, str, List, Tuple],
+    nonstandard_attrs: bool,
+    migrate_old_schema: bool,
+    syntaxes: Optional[List[str]],
+    json_backend: Optional[str],
+    html_parser: Optional[str],
+) -> str:
+    """A key for the options that change the extraction result.  (the JSON
+    backends and HTML parsers can differ on malformed pages)"""
+    if isinstance(python_objects, (list, tuple)):
+        python_objects = sorted(f'{t.__module__}.{t.__qualname__}' for t in python_objects)
+    return repr((python_objects, nonstandard_attrs, migrate_old_schema,
+                 sorted(syntaxes) if syntaxes is not None else None,
+                 json_backend, html_parser or 'extruct'))
+
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+
+class ResultCache(ABC):
+    """Base class for caches of extraction results, keyed by a hash of the
+    HTML and the options that change the result.
+
+    The results are stored as JSON, so each hit returns a new copy that can
+    be changed by the caller.  JSON is read without running any code, so a
+    cache that others can write to can give wrong recipes, but can't run
+    code in the scraper.  Results with a property that isn't JSON, a date or
+    a duration aren't stored.  Subclass and implement get_raw(), set_raw()
+    and __len__() for another backend, the methods must be thread safe.
+    """
+
+    maxsize: Optional[int] = None
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self._info_lock = threading.Lock()
+
+    @abstractmethod
+    def get_raw(self, key: str) -> Optional[bytes]:
+        """Returns the stored recipes for the key, None on a miss."""
+
+    @abstractmethod
+    def set_raw(self, key: str, value: bytes) -> None:
+        """Stores the recipes for the key, as bytes of JSON."""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """The number of results in the cache."""
+
+    def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        """Returns the recipes for the key, None on a miss."""
+        value = self.get_raw(key)
+        recipes = None
+        if value is not None:
+            try:
+                recipes = _load_recipes(value)
+            except ValueError:
+                # such as a result of an older version, which was pickled
+                pass
+        with self._info_lock:
+            if recipes is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return recipes
+
+    def set(self, key: str, recipes: List[Dict[str, Any]]) -> None:
+        try:
+            value = _dump_recipes(recipes)
+        except (TypeError, ValueError):
+            return
+        self.set_raw(key, value)
+
+    def cache_info(self) -> CacheInfo:
+        """The hit and miss statistics, like functools.lru_cache's."""
+        with self._info_lock:
+            return CacheInfo(self.hits, self.misses, self.maxsize, len(self))
+
+    @staticmethod
+    def make_key(
+        html: Union[str, bytes, bytearray, memoryview, mmap.mmap],
+        options_key: str,
+        url: Optional[str] = None,
+    ) -> str:
+        """A hash of the HTML, the options and the url (which the results
+        include, and is the base for relative urls)."""
+        if isinstance(html, str):
+            html = html.encode('utf-8', 'surrogatepass')
+        h = hashlib.blake2b(html, digest_size=20)
+        h.update(b'\0' + options_key.encode('utf-8') + b'\0' + (url or '').encode('utf-8'))
+        return h.hexdigest()
+
+
+class MemoryResultCache(ResultCache):
+    """An in-memory least recently used cache of extraction results, of up
+    to maxsize results."""
+
+    def __init__(self, maxsize: int = 1024):
+        super().__init__()
+        self.maxsize = maxsize
+        self._data: 'OrderedDict[str, bytes]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get_raw(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set_raw(self, key: str, value: bytes) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:  # type: ignore
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class SQLiteResultCache(ResultCache):
+    """A cache of extraction results in a SQLite database file, which can be
+    shared between processes.  When maxsize is given, the least recently used
+    results are evicted to keep no more than maxsize."""
+
+    def __init__(self, filename: Union[str, Path], maxsize: Optional[int] = None):
+        super().__init__()
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(filename), check_same_thread=False, timeout=30)
+        with self._db:
+            self._db.execute('CREATE TABLE IF NOT EXISTS results ('
+                             'key TEXT PRIMARY KEY, value BLOB NOT NULL, '
+                             'accessed_at REAL NOT NULL)')
+
+    def __enter__(self) -> 'SQLiteResultCache':
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def get_raw(self, key: str) -> Optional[bytes]:
+        with self._lock, self._db:
+            row = self._db.execute('SELECT value FROM results WHERE key = ?',
+                                   (key,)).fetchone()
+            if row is None:
+                return None
+            if self.maxsize is not None:
+                self._db.execute('UPDATE results SET accessed_at = ? WHERE key = ?',
+                                 (time.time(), key))
+            return row[0]
+
+    def set_raw(self, key: str, value: bytes) -> None:
+        with self._lock, self._db:
+            self._db.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?)',
+                             (key, value, time.time()))
+            if self.maxsize is not None:
+                self._db.execute('DELETE FROM results WHERE key IN (SELECT key FROM results '
+                                 'ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)',
+                                 (self.maxsize,))
+
+    def clear(self) -> None:
+        with self._lock, self._db:
+            self._db.execute('DELETE FROM results')
@@ -0,0 +1,270 @@
+#
+# Copyright 2023 Micah Cochran
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Extract recipes from urls, files and directories, and write them to
+standard output as newline-delimited JSON, one recipe on each line.
+
+The urls, files and directories are given as arguments, or read from standard
+input one on each line when there are no arguments (or the argument is '-').
+URLs are scraped in a thread pool, files are loaded in worker processes.
+Recipes are written as soon as their page is done, in the order the pages
+finish.  Errors are reported on standard error, along with a summary at the
+end.
+
+The warc subcommand extracts the recipes from the pages in WARC files, such as
+Common Crawl's:  scrape-schema-recipe warc FILE...
+
+The crawl subcommand extracts the recipes from the pages in the sitemaps of a
+site:  scrape-schema-recipe crawl SITE
+"""
+
+# internal libraries
+import argparse
+from collections import Counter
+import datetime
+import itertools
+import json
+import os
+from pathlib import Path
+import sys
+import time
+# for mypy
+from typing import Any, Iterable, Iterator, List, Optional, TextIO, Tuple, Union
+
+from .batch import load_many, scrape_many, ScrapeResult
+from .cache import HTTPCache
+from .warc import DEFAULT_MAX_BYTES, iter_warc, iter_warc_files
+
+
+def _is_url(location: str) -> bool:
+    return location.startswith(("http://", "https://"))
+
+
+def _iter_locations(args: List[str], stdin: TextIO) -> Iterator[str]:
+    """The urls and files to scrape, directories are expanded to their
+    .html files."""
+    if not args or args == ['-']:
+        lines: Iterable[str] = (line.strip() for line in stdin)
+    else:
+        lines = args
+    for location in lines:
+        if not location:
+            continue
+        if not _is_url(location) and os.path.isdir(location):
+            for path in sorted(Path(location).glob('*.html')):
+                yield str(path)
+        else:
+            yield location
+
+
+def _json_default(value: Any) -> Any:
+    """Serialize the python objects from python_objects=True."""
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    # imported here, isodate is only needed for durations
+    import isodate
+    if isinstance(value, (datetime.timedelta, isodate.Duration)):
+        # (isodate.Duration is a duration with months or years)
+        return isodate.duration_isoformat(value)
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def _scrape_all(
+    locations: Iterable[str], args: argparse.Namespace, cache: Optional[HTTPCache]
+) -> Iterator[Tuple[Union[str, Path], ScrapeResult]]:
+    """Runs of urls are scraped with scrape_many(), runs of files are loaded
+    with load_many(), both read the locations as they are needed."""
+    options = {'python_objects': args.python_objects,
+               'nonstandard_attrs': args.nonstandard_attrs}
+    for is_url, run in itertools.groupby(locations, key=_is_url):
+        if is_url:
+            yield from scrape_many(run, max_workers=args.workers, cache=cache, **options)
+        else:
+            yield from load_many(run, processes=args.processes, **options)
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog='scrape-schema-recipe',
+        description=__doc__.split('\n\n')[0].replace('\n', ' '),
+        epilog="see 'scrape-schema-recipe warc --help' to extract recipes from WARC files, "
+               "and 'scrape-schema-recipe crawl --help' to crawl a site's sitemaps")
+    parser.add_argument('locations', nargs='*', metavar='location',
+                        help="urls, files or directories, read from standard input when none are given")
+    parser.add_argument('--workers', type=int, default=8,
+                        help="the number of threads scraping urls (default: 8)")
+    parser.add_argument('--processes', type=int, default=None,
+                        help="the number of processes loading files (default: the number of CPUs)")
+    parser.add_argument('--cache-dir', default=None,
+                        help="cache responses in this directory and make conditional requests")
+    parser.add_argument('--nonstandard-attrs', action='store_true',
+                        help="add the nonstandard attributes '_format' and '_source_url'")
+    parser.add_argument('--python-objects', action='store_true',
+                        help="convert dates and durations, they are written in ISO 8601 format")
+    return parser
+
+
+def _warc_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog='scrape-schema-recipe warc',
+        description="Extract recipes from the pages in WARC files, such as Common Crawl's, and write them "
+                    "to standard output as newline-delimited JSON.")
+    parser.add_argument('files', nargs='+', metavar='file',
+                        help="WARC files, gzip compressed or not, '-' reads standard input")
+    parser.add_argument('--processes', type=int, default=None,
+                        help="the number of processes reading files (default: the number of CPUs)")
+    parser.add_argument('--max-bytes', type=int, default=DEFAULT_MAX_BYTES,
+                        help=f"the most bytes of a page that are read (default: {DEFAULT_MAX_BYTES})")
+    parser.add_argument('--nonstandard-attrs', action='store_true',
+                        help="add the nonstandard attributes '_format' and '_source_url'")
+    parser.add_argument('--python-objects', action='store_true',
+                        help="convert dates and durations, they are written in ISO 8601 format")
+    return parser
+
+
+def _crawl_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog='scrape-schema-recipe crawl',
+        description="Extract recipes from the pages in the sitemaps of a site, and write them to standard "
+                    "output as newline-delimited JSON.  robots.txt is followed.")
+    parser.add_argument('site', help="the url of the site, its robots.txt lists the sitemaps")
+    parser.add_argument('--sitemap', action='append', default=None, dest='sitemaps',
+                        help="the url of a sitemap, instead of the ones in robots.txt (can be repeated)")
+    parser.add_argument('--state', default=None,
+                        help="keep the lastmod of the pages in this file, and skip the unchanged pages")
+    parser.add_argument('--delay', type=float, default=1.0,
+                        help="the seconds between requests, or the site's Crawl-delay (default: 1.0)")
+    parser.add_argument('--workers', type=int, default=2,
+                        help="the number of threads scraping pages (default: 2)")
+    parser.add_argument('--cache-dir', default=None,
+                        help="cache responses in this directory and make conditional requests")
+    parser.add_argument('--nonstandard-attrs', action='store_true',
+                        help="add the nonstandard attributes '_format' and '_source_url'")
+    parser.add_argument('--python-objects', action='store_true',
+                        help="convert dates and durations, they are written in ISO 8601 format")
+    return parser
+
+
+def _crawl(args: argparse.Namespace, stdout: TextIO, stderr: TextIO) -> int:
+    # imported here, the crawler imports requests
+    import requests
+    from .crawl import crawl_site, CrawlState
+
+    if args.workers < 1 or args.delay < 0:
+        print('error: --workers must be at least 1, and --delay not negative', file=stderr)
+        return 2
+    cache = HTTPCache(args.cache_dir) if args.cache_dir else None
+    state = CrawlState(args.state) if args.state else None
+    try:
+        results = crawl_site(args.site, python_objects=args.python_objects,
+                             nonstandard_attrs=args.nonstandard_attrs, sitemaps=args.sitemaps,
+                             state=state, delay=args.delay, max_workers=args.workers, cache=cache)
+        return _write_results(results, stdout, stderr)
+    except requests.RequestException as e:
+        # robots.txt couldn't be fetched
+        print(f'error: {args.site}: {type(e).__name__}: {e}', file=stderr)
+        return 1
+    finally:
+        if state is not None:
+            state.close()
+        if cache is not None:
+            cache.close()
+
+
+def _read_warcs(args: argparse.Namespace, stdin: TextIO) -> Iterator[Tuple[str, ScrapeResult]]:
+    """The files are read in worker processes, unless there is only one of
+    them or one process."""
+    options = {'python_objects': args.python_objects,
+               'nonstandard_attrs': args.nonstandard_attrs,
+               'max_bytes': args.max_bytes}
+    if args.files == ['-']:
+        yield from iter_warc(stdin.buffer, **options)  # type: ignore
+    elif len(args.files) == 1 or args.processes == 1:
+        for path in args.files:
+            yield from iter_warc(path, **options)
+    else:
+        yield from iter_warc_files(args.files, processes=args.processes, **options)
+
+
+def main(
+    argv: Optional[List[str]] = None,
+    stdin: TextIO = sys.stdin,
+    stdout: TextIO = sys.stdout,
+    stderr: TextIO = sys.stderr,
+) -> int:
+    """Run the command line, returns the exit status: 0 when every location
+    was scraped, 1 when there were errors."""
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv[:1] == ['warc']:
+        warc_args = _warc_parser().parse_args(argv[1:])
+        if warc_args.processes is not None and warc_args.processes < 1:
+            print('error: --processes must be at least 1', file=stderr)
+            return 2
+        return _write_results(_read_warcs(warc_args, stdin), stdout, stderr)
+    if argv[:1] == ['crawl']:
+        return _crawl(_crawl_parser().parse_args(argv[1:]), stdout, stderr)
+
+    args = _parser().parse_args(argv)
+    if args.workers < 1 or (args.processes is not None and args.processes < 1):
+        print('error: --workers and --processes must be at least 1', file=stderr)
+        return 2
+
+    cache = HTTPCache(args.cache_dir) if args.cache_dir else None
+    try:
+        return _write_results(_scrape_all(_iter_locations(args.locations, stdin), args, cache), stdout, stderr)
+    finally:
+        if cache is not None:
+            cache.close()
+
+
+def _write_results(
+    results: Iterable[Tuple[Union[str, Path], ScrapeResult]], stdout: TextIO, stderr: TextIO
+) -> int:
+    """Write the recipes as they are done, and the errors and the summary."""
+    pages = recipes = 0
+    errors: Counter = Counter()
+    start = time.perf_counter()
+    try:
+        for location, result in results:
+            pages += 1
+            if isinstance(result, Exception):
+                errors[type(result).__name__] += 1
+                print(f'error: {location}: {type(result).__name__}: {result}', file=stderr)
+                continue
+            for recipe in result:
+                try:
+                    line = json.dumps(recipe, default=_json_default, ensure_ascii=False)
+                except (TypeError, ValueError) as e:
+                    # one recipe that can't be written doesn't stop the rest
+                    errors[type(e).__name__] += 1
+                    print(f'error: {location}: {type(e).__name__}: {e}', file=stderr)
+                    continue
+                stdout.write(line)
+                stdout.write('\n')
+                recipes += 1
+            stdout.flush()
+    except BrokenPipeError:
+        # the reader went away, such as | head
+        return 1
+
+    elapsed = time.perf_counter() - start
+    print(f'{pages} pages, {recipes} recipes, {sum(errors.values())} errors '
+          f'in {elapsed:.1f}s ({pages / elapsed if elapsed else 0:.1f} pages/sec, '
+          f'{recipes / elapsed if elapsed else 0:.1f} recipes/sec)', file=stderr)
+    for name, count in errors.most_common():
+        print(f'  {name}: {count}', file=stderr)
+    return 1 if errors else 0
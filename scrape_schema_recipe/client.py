@@ -0,0 +1,336 @@
+#
+# Copyright 2023 Micah Cochran
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# internal libraries
+import time
+# for mypy
+from typing import Any, Dict, IO, List, Optional, Tuple, Union
+
+# external libraries
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .cache import _options_key, CacheEntry, HTTPCache, ResultCache
+from .encoding import sniff_encoding
+from .objects import to_objects
+from .scrape import __version__, _JsonLdRecipeScanner, _scrape_html, scrape, SSRTypeError
+from .stats import _record, _start_call, CallStats
+
+# Follow RFC 7231 sec. 5.5.3
+USER_AGENT_STR = f'scrape-schema-recipe/{__version__} requests/{requests.__version__}'
+
+# HTTP status codes that are worth retrying
+RETRY_STATUS_CODES = frozenset([429, 500, 502, 503, 504])
+
+# the size of the chunks that streamed responses are read in
+STREAM_CHUNK_SIZE = 16 * 1024
+
+
+class ScrapeClient:
+    """Scrapes recipes from URLs using a requests.Session, so that connections
+    are kept alive and reused between requests to the same host.
+
+    Parameters
+    ----------
+    user_agent_str : string, optional
+        overide the user_agent_string with this value.
+        (defaults to None)
+
+    headers : dict, optional
+        additional HTTP headers sent with every request.
+        (defaults to None)
+
+    timeout : float or tuple, optional
+        the timeout in seconds passed to requests, either a single value or
+        a (connect timeout, read timeout) tuple.
+        (defaults to 5)
+
+    retries : int, optional
+        how many times a request is retried on connection errors and on the
+        status codes in RETRY_STATUS_CODES.
+        (defaults to 3)
+
+    backoff_factor : float, optional
+        the backoff factor between retries, see urllib3's Retry.
+        (defaults to 0.3)
+
+    pool_connections : int, optional
+        the number of hosts to keep connection pools for.
+        (defaults to 10)
+
+    pool_maxsize : int, optional
+        the maximum number of connections kept in the pool for each host.
+        (defaults to 10)
+
+    session : requests.Session, optional
+        use this session instead of creating one, the other connection
+        settings are still mounted onto it.
+        (defaults to None)
+
+    cache : HTTPCache, optional
+        cache responses on disk and make conditional requests for them.
+        When the server responds 304 Not Modified the cached extraction
+        result is used, skipping the download and parsing.
+        (defaults to None)
+
+    result_cache : ResultCache, optional
+        a cache of extraction results keyed by a hash of the HTML, see
+        scrape_schema_recipe.load()
+        (defaults to None)
+
+    json_backend : string, optional
+        the library that decodes the JSON-LD, see scrape_schema_recipe.loads()
+        (defaults to None, the fastest one that is installed)
+
+    html_parser : string, optional
+        the parser of HTML that has to be parsed, see scrape_schema_recipe.loads()
+        (defaults to None, 'extruct')
+
+    Use it as a context manager, or call close(), to close the connections.
+    """
+
+    def __init__(
+        self,
+        user_agent_str: Optional[str] = None,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Union[float, Tuple[float, float]] = 5,
+        retries: int = 3,
+        backoff_factor: float = 0.3,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        session: Optional[requests.Session] = None,
+        cache: Optional[HTTPCache] = None,
+        result_cache: Optional[ResultCache] = None,
+        json_backend: Optional[str] = None,
+        html_parser: Optional[str] = None,
+    ):
+        self.timeout = timeout
+        self.cache = cache
+        self.result_cache = result_cache
+        self.json_backend = json_backend
+        self.html_parser = html_parser
+        self.session = session if session is not None else requests.Session()
+
+        retry = Retry(total=retries, backoff_factor=backoff_factor,
+                      status_forcelist=RETRY_STATUS_CODES,
+                      # return the last response, so that raise_for_status()
+                      # raises an HTTPError like scrape_url() does
+                      raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=pool_connections,
+                              pool_maxsize=pool_maxsize, max_retries=retry)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self.session.headers['User-Agent'] = user_agent_str or USER_AGENT_STR
+        if headers:
+            self.session.headers.update(headers)
+
+    def __enter__(self) -> 'ScrapeClient':
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the connections in the pool."""
+        self.session.close()
+
+    def fetch(
+        self, url: str, headers: Optional[Dict[str, str]] = None, stream: bool = False
+    ) -> requests.Response:
+        """GET the url, raising requests.HTTPError for error status codes."""
+        if not isinstance(url, str):
+            raise SSRTypeError(var_name="url", object_type=type(url), expected_types="string")
+
+        r = self.session.get(url, headers=headers, timeout=self.timeout, stream=stream)
+        try:
+            r.raise_for_status()
+        except requests.HTTPError:
+            r.close()
+            raise
+        return r
+
+    def _get(
+        self,
+        url: str,
+        headers: Optional[Dict[str, str]],
+        stream: bool,
+        max_bytes: Optional[int],
+        syntaxes: Optional[List[str]],
+        call: Optional[CallStats] = None,
+    ) -> Tuple[requests.Response, bytes, bool]:
+        """GET the url, returns the response, its body, and whether all of
+        the body was read.  The time and size are recorded in call."""
+        start = time.perf_counter()
+        if not stream and max_bytes is None:
+            r = self.fetch(url, headers)
+            body = r.content
+            complete = True
+        else:
+            reader = _BodyReader(stream and _can_stop_early(syntaxes), max_bytes)
+            with self.fetch(url, headers, stream=True) as r:
+                for chunk in r.iter_content(STREAM_CHUNK_SIZE):
+                    if reader.feed(chunk):
+                        break
+            body = bytes(reader.body)
+            complete = reader.complete
+        if call is not None:
+            call.fetch_seconds = time.perf_counter() - start
+            call.bytes_downloaded = len(body)
+        return r, body, complete
+
+    def scrape_url(
+        self,
+        url: str,
+        python_objects: Union[bool, str, List, Tuple] = False,
+        nonstandard_attrs: bool = False,
+        migrate_old_schema: bool = True,
+        syntaxes: Optional[List[str]] = None,
+        stream: bool = False,
+        max_bytes: Optional[int] = None,
+        as_objects: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """scrape from a URL, see scrape_schema_recipe.scrape_url() for the
+        parameters"""
+        call = _start_call(url)
+        if call is None:
+            recipes = self._scrape_url(url, python_objects, nonstandard_attrs,
+                                       migrate_old_schema, syntaxes, stream, max_bytes)
+        else:
+            recipes = _record(call, self._scrape_url, url, python_objects, nonstandard_attrs,
+                              migrate_old_schema, syntaxes, stream, max_bytes, call)
+        # converted here, so that the caches keep dictionaries
+        if as_objects:
+            return to_objects(recipes)  # type: ignore
+        return recipes
+
+    def _scrape_url(
+        self,
+        url: str,
+        python_objects: Union[bool, str, List, Tuple],
+        nonstandard_attrs: bool,
+        migrate_old_schema: bool,
+        syntaxes: Optional[List[str]],
+        stream: bool,
+        max_bytes: Optional[int],
+        call: Optional[CallStats] = None,
+    ) -> List[Dict[str, Any]]:
+        if self.cache is None:
+            r, body, _ = self._get(url, None, stream, max_bytes, syntaxes, call)
+            return _scrape_html(body, python_objects, nonstandard_attrs,
+                                migrate_old_schema, syntaxes, url=r.url,
+                                result_cache=self.result_cache,
+                                encoding=sniff_encoding(body, r.headers.get('Content-Type')),
+                                json_backend=self.json_backend,
+                                html_parser=self.html_parser, call=call)
+
+        key = _options_key(python_objects, nonstandard_attrs, migrate_old_schema, syntaxes,
+                           self.json_backend, self.html_parser)
+        entry = self.cache.get(url)
+        r, body, complete = self._get(
+            url, entry.conditional_headers() if entry else None, stream, max_bytes, syntaxes, call)
+
+        if entry is not None and r.status_code == 304:
+            recipes = entry.get_result(key)
+            if recipes is not None:
+                self.cache.revalidated(entry)
+                if call is not None:
+                    call.cached = True
+                    call.recipes = len(recipes)
+                return recipes
+
+            recipes = _scrape_html(entry.body, python_objects, nonstandard_attrs,
+                                   migrate_old_schema, syntaxes, url=entry.final_url,
+                                   result_cache=self.result_cache, encoding=entry.encoding,
+                                   json_backend=self.json_backend,
+                                   html_parser=self.html_parser, call=call)
+            entry.result_key = key
+            self.cache.revalidated(entry, recipes)
+            return recipes
+
+        encoding = sniff_encoding(body, r.headers.get('Content-Type'))
+        recipes = _scrape_html(body, python_objects, nonstandard_attrs,
+                               migrate_old_schema, syntaxes, url=r.url,
+                               result_cache=self.result_cache, encoding=encoding,
+                               json_backend=self.json_backend,
+                               html_parser=self.html_parser, call=call)
+        # a partial body can't be used to answer later requests
+        if complete:
+            self.cache.put(CacheEntry(url, r.url, r.headers.get('ETag'),
+                                      r.headers.get('Last-Modified'), body,
+                                      encoding, key), recipes)
+        return recipes
+
+    def scrape(
+        self,
+        location: Union[str, IO[str]],
+        python_objects: Union[bool, str, List, Tuple] = False,
+        nonstandard_attrs: bool = False,
+        migrate_old_schema: bool = True,
+        syntaxes: Optional[List[str]] = None,
+        as_objects: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """scrape a url, filename, text_string of HTML, or a file-like object,
+        see scrape_schema_recipe.scrape() for the parameters.  URLs are
+        fetched with this client's session."""
+        if isinstance(location, str) and location.startswith(("http://", "https://")):
+            return self.scrape_url(location, python_objects=python_objects,
+                                   nonstandard_attrs=nonstandard_attrs,
+                                   migrate_old_schema=migrate_old_schema,
+                                   syntaxes=syntaxes, as_objects=as_objects)
+
+        return scrape(location, python_objects=python_objects,
+                      nonstandard_attrs=nonstandard_attrs,
+                      migrate_old_schema=migrate_old_schema,
+                      syntaxes=syntaxes,
+                      result_cache=self.result_cache,
+                      as_objects=as_objects,
+                      json_backend=self.json_backend,
+                      html_parser=self.html_parser)
+
+
+def _can_stop_early(syntaxes: Optional[List[str]]) -> bool:
+    """Only JSON-LD can be found before the rest of the page has been read,
+    the microdata of a recipe is spread across the page."""
+    return syntaxes is None or list(syntaxes) == ['json-ld']
+
+
+class _BodyReader:
+    """Collects the body of a response as it is read in chunks, for streaming.
+
+    feed() returns True when reading should stop, either because a complete
+    JSON-LD recipe has been read (when stop_early is True) or max_bytes has
+    been read.  complete is False when the rest of the body wasn't read.
+    """
+
+    def __init__(self, stop_early: bool, max_bytes: Optional[int]):
+        self.body = bytearray()
+        self.complete = True
+        self.max_bytes = max_bytes
+        self._scanner = _JsonLdRecipeScanner() if stop_early else None
+
+    def feed(self, chunk: bytes) -> bool:
+        if self.max_bytes is not None and len(self.body) + len(chunk) > self.max_bytes:
+            self.body += chunk[:self.max_bytes - len(self.body)]
+            self.complete = False
+            return True
+
+        self.body += chunk
+        if self._scanner is not None and self._scanner.scan(self.body):
+            self.complete = False
+            return True
+        return False
@@ -0,0 +1,345 @@
+#
+# Copyright 2023 Micah Cochran
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Crawl the recipes of a site from its sitemaps.
+
+The sitemaps are found in robots.txt, and the pages they list are scraped as
+the sitemaps are read, in a thread pool over a shared connection pool.  Pages
+that robots.txt disallows are skipped, requests to the site are spaced out by
+a delay, and pages whose lastmod hasn't changed since the last crawl are
+skipped.
+"""
+
+# internal libraries
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import sqlite3
+import threading
+import time
+from urllib.parse import urljoin
+from urllib.robotparser import RobotFileParser
+from xml.etree.ElementTree import XMLPullParser
+import zlib
+# for mypy
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+import requests
+
+from .batch import _dispatch, _host, ScrapeResult
+from .cache import HTTPCache
+from .client import ScrapeClient, STREAM_CHUNK_SIZE
+from .stats import _bind
+
+# the most bytes of a sitemap that are read, the limit of the sitemaps protocol
+MAX_SITEMAP_BYTES = 50 * 1024 * 1024
+
+# how deep sitemap indexes are followed, the protocol doesn't nest them
+_MAX_SITEMAP_DEPTH = 3
+
+
+class CrawlState:
+    """The lastmod of the pages that were scraped, kept in a SQLite database
+    file between crawls, so that pages that haven't changed are skipped.
+
+    Parameters
+    ----------
+    filename : string or pathlib.Path
+        the database file, it is created if needed.
+
+    The state can be shared between threads.
+    """
+
+    def __init__(self, filename: Union[str, Path]):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(filename), check_same_thread=False, timeout=30)
+        with self._db:
+            self._db.execute('CREATE TABLE IF NOT EXISTS pages ('
+                             'url TEXT PRIMARY KEY, lastmod TEXT NOT NULL, '
+                             'crawled_at REAL NOT NULL)')
+
+    def __enter__(self) -> 'CrawlState':
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM pages').fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def get(self, url: str) -> Optional[str]:
+        """The lastmod of the url when it was last scraped, or None."""
+        with self._lock:
+            row = self._db.execute('SELECT lastmod FROM pages WHERE url = ?', (url,)).fetchone()
+        return row[0] if row else None
+
+    def set(self, url: str, lastmod: str) -> None:
+        with self._lock, self._db:
+            self._db.execute('INSERT OR REPLACE INTO pages VALUES (?, ?, ?)',
+                             (url, lastmod, time.time()))
+
+    def clear(self) -> None:
+        with self._lock, self._db:
+            self._db.execute('DELETE FROM pages')
+
+
+def crawl_site(
+    site: str,
+    python_objects: Union[bool, str, List, Tuple] = False,
+    nonstandard_attrs: bool = False,
+    migrate_old_schema: bool = True,
+    syntaxes: Optional[List[str]] = None,
+    sitemaps: Optional[Iterable[str]] = None,
+    state: Optional[CrawlState] = None,
+    delay: float = 1.0,
+    max_workers: int = 2,
+    client: Optional[ScrapeClient] = None,
+    cache: Optional[HTTPCache] = None,
+    stream: bool = False,
+    max_bytes: Optional[int] = None,
+    as_objects: bool = False,
+    json_backend: Optional[str] = None,
+    html_parser: Optional[str] = None,
+) -> Iterator[Tuple[str, ScrapeResult]]:
+    """Scrape the pages in the sitemaps of a site.
+
+    Parameters
+    ----------
+    site : string
+        The url of the site, such as 'https://example.com/', its robots.txt
+        is read for the sitemaps, the rules and the Crawl-delay.  Only the
+        pages on the site's host are scraped.
+
+    python_objects, nonstandard_attrs, migrate_old_schema, syntaxes
+        see scrape_url()
+
+    sitemaps : iterable of strings, optional
+        the urls of the sitemaps or sitemap indexes, gzip compressed or not.
+        (defaults to None, the sitemaps in robots.txt, or /sitemap.xml when
+        there are none)
+
+    state : CrawlState, optional
+        the lastmod of the pages that were scraped.  Pages with the same
+        lastmod in the sitemap are skipped, and the lastmod of pages that
+        were scraped is stored.
+        (defaults to None, every page is scraped)
+
+    delay : float, optional
+        the seconds between the starts of requests to the site, the site's
+        Crawl-delay is used when it's longer.
+        (defaults to 1.0)
+
+    max_workers : int, optional
+        the number of threads fetching and scraping, more than one helps
+        when pages take longer to fetch than the delay.
+        (defaults to 2)
+
+    client, cache, stream, max_bytes, as_objects, json_backend, html_parser
+        see scrape_many()
+
+    Yields
+    -------
+    tuple
+        (url, result) as the pages are done, where the result is the list of
+        recipes for the url, or the exception that was raised scraping it.
+        A sitemap that can't be read gives the exception for its url.
+
+    Raises
+    ------
+    requests.RequestException
+        robots.txt couldn't be fetched, other than it not being found.
+    """
+    if max_workers < 1:
+        raise ValueError("max_workers must be at least 1")
+    if delay < 0:
+        raise ValueError("delay can't be negative")
+
+    own_client = client is None
+    if client is None:
+        client = ScrapeClient(pool_connections=1, pool_maxsize=max_workers, cache=cache,
+                              json_backend=json_backend, html_parser=html_parser)
+
+    try:
+        host = _host(site)
+        robots, robots_sitemaps = _read_robots(client, urljoin(site, '/robots.txt'))
+        user_agent = str(client.session.headers['User-Agent'])
+        crawl_delay = robots.crawl_delay(user_agent)
+        spacer = _Spacer(max(delay, float(crawl_delay or 0)))
+
+        if sitemaps is None:
+            sitemaps = robots_sitemaps or [urljoin(site, '/sitemap.xml')]
+        sitemap_errors: List[Tuple[str, ScrapeResult]] = []
+        lastmods: Dict[str, str] = {}
+
+        def urls() -> Iterator[str]:
+            seen: Set[str] = set()
+            for url, lastmod in _iter_sitemaps(client, sitemaps, spacer, sitemap_errors):  # type: ignore
+                if url in seen or _host(url) != host or not robots.can_fetch(user_agent, url):
+                    continue
+                seen.add(url)
+                if state is not None and lastmod is not None:
+                    if state.get(url) == lastmod:
+                        continue
+                    lastmods[url] = lastmod
+                yield url
+
+        def work(url: str) -> ScrapeResult:
+            spacer.wait(_host(url))
+            try:
+                return client.scrape_url(url, python_objects=python_objects,  # type: ignore
+                                         nonstandard_attrs=nonstandard_attrs,
+                                         migrate_old_schema=migrate_old_schema,
+                                         syntaxes=syntaxes, stream=stream,
+                                         max_bytes=max_bytes, as_objects=as_objects)
+            except Exception as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # the worker threads record to the caller's Stats
+            for url, result in _dispatch(urls(), _bind(work), executor, max_workers,
+                                         max_workers, False):
+                lastmod = lastmods.pop(url, None)
+                if lastmod is not None and not isinstance(result, Exception):
+                    state.set(url, lastmod)  # type: ignore
+                yield url, result
+        yield from sitemap_errors
+    finally:
+        if own_client:
+            client.close()
+
+
+class _Spacer:
+    """Spaces out the starts of the requests to each host by delay seconds,
+    the threads reserve their turn and sleep until it comes."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._next: Dict[str, float] = {}
+
+    def wait(self, host: str) -> None:
+        if not self.delay:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next.get(host, now))
+            self._next[host] = start + self.delay
+        if start > now:
+            time.sleep(start - now)
+
+
+def _read_robots(client: ScrapeClient, url: str) -> Tuple[RobotFileParser, List[str]]:
+    """The rules of robots.txt, and the sitemaps that it lists.  A missing
+    robots.txt allows everything, as RobotFileParser.read() does."""
+    robots = RobotFileParser(url)
+    try:
+        r = client.fetch(url)
+    except requests.HTTPError as e:
+        status = e.response.status_code if e.response is not None else 0
+        if status in (401, 403):
+            robots.parse(['User-agent: *', 'Disallow: /'])
+        elif 400 <= status < 500:
+            robots.parse([])
+        else:
+            raise
+        return robots, []
+
+    lines = r.text.splitlines()
+    robots.parse(lines)
+    # (RobotFileParser.site_maps() is Python 3.8+)
+    sitemaps = []
+    for line in lines:
+        name, _, value = line.partition(':')
+        if name.strip().lower() == 'sitemap' and value.strip():
+            sitemaps.append(urljoin(url, value.strip()))
+    return robots, sitemaps
+
+
+def _iter_sitemaps(
+    client: ScrapeClient,
+    sitemaps: Iterable[str],
+    spacer: _Spacer,
+    errors: List[Tuple[str, ScrapeResult]],
+) -> Iterator[Tuple[str, Optional[str]]]:
+    """(url, lastmod) for the pages in the sitemaps, following sitemap
+    indexes.  The sitemaps are read as the pages are needed, and errors are
+    added to errors."""
+    # depth-first, so that the pages of one sitemap are done before the next
+    todo: List[Tuple[str, int]] = [(url, 0) for url in reversed(list(sitemaps))]
+    seen: Set[str] = set()
+    while todo:
+        sitemap, depth = todo.pop()
+        if sitemap in seen:
+            continue
+        seen.add(sitemap)
+        children = []
+        try:
+            spacer.wait(_host(sitemap))
+            for kind, loc, lastmod in _read_sitemap(client, sitemap):
+                if kind == 'sitemap':
+                    if depth < _MAX_SITEMAP_DEPTH:
+                        children.append((urljoin(sitemap, loc), depth + 1))
+                else:
+                    yield urljoin(sitemap, loc), lastmod
+        except Exception as e:
+            errors.append((sitemap, e))
+        todo.extend(reversed(children))
+
+
+def _read_sitemap(client: ScrapeClient, url: str) -> Iterator[Tuple[str, str, Optional[str]]]:
+    """('url' or 'sitemap', loc, lastmod) for the entries of a sitemap, which
+    is parsed as it is downloaded and decompressed, so that a large sitemap
+    isn't held in memory.  The XML namespace isn't checked."""
+    parser: Any = XMLPullParser(events=('start', 'end'))
+    decompressor = None
+    size = 0
+    root = None
+    with client.fetch(url, stream=True) as r:
+        for chunk in r.iter_content(STREAM_CHUNK_SIZE):
+            if size == 0 and chunk[:2] == b'\x1f\x8b':
+                # a .xml.gz file, rather than a gzip Content-Encoding which
+                # requests decodes
+                decompressor = zlib.decompressobj(47)
+            if decompressor is not None:
+                chunk = decompressor.decompress(chunk, MAX_SITEMAP_BYTES - size)
+            size += len(chunk)
+            parser.feed(chunk)
+            for event, element in parser.read_events():
+                tag = element.tag.rsplit('}', 1)[-1]
+                if event == 'start':
+                    if root is None:
+                        root = element
+                    continue
+                if tag in ('url', 'sitemap'):
+                    loc = lastmod = None
+                    for child in element:
+                        name = child.tag.rsplit('}', 1)[-1]
+                        if name == 'loc':
+                            loc = (child.text or '').strip()
+                        elif name == 'lastmod':
+                            lastmod = (child.text or '').strip() or None
+                    if loc:
+                        yield tag, loc, lastmod
+                    # the entries that were read aren't kept
+                    root.clear()  # type: ignore
+            if size >= MAX_SITEMAP_BYTES:
+                # the rest is ignored
+                return
+    parser.close()
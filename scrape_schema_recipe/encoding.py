@@ -0,0 +1,103 @@
+#
+# Copyright 2023 Micah Cochran
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Determine the character encoding of downloaded HTML.
+
+requests falls back to statistical detection over the whole body when the
+server doesn't send a charset, which is slow on large pages and sometimes
+wrong.  Pages nearly always declare their encoding with a byte order mark or
+a <meta> tag near the top, so those are checked first, then the body is
+tried as UTF-8, and detection is only the last resort.
+"""
+
+# internal libraries
+import codecs
+import re
+# for mypy
+from typing import Optional, Tuple
+
+
+# how far into the page to look for a <meta> charset, the HTML standard looks
+# at 1024 bytes, but pages with long comments or <link> tags before it exist
+META_SNIFF_BYTES = 4096
+
+_BOMS = (
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+# <meta charset="..."> and <meta http-equiv="Content-Type" content="text/html; charset=...">
+_META_CHARSET = re.compile(
+    rb'<meta\s[^>]*?charset\s*=\s*["\']?\s*([A-Za-z0-9_:.+-]+)', re.IGNORECASE)
+_HEADER_CHARSET = re.compile(r'charset\s*=\s*["\']?([^\s;"\']+)', re.IGNORECASE)
+
+
+def _codec_name(label: str) -> Optional[str]:
+    """The Python codec for an encoding label, None when it isn't known."""
+    try:
+        return codecs.lookup(label).name
+    except LookupError:
+        return None
+
+
+def sniff_encoding(body: bytes, content_type: Optional[str] = None) -> Optional[str]:
+    """Determine the encoding of the HTML from its byte order mark, the
+    charset of the Content-Type header, or a <meta> tag in the first
+    META_SNIFF_BYTES of the body, in that order.  None when none of them
+    declare a known encoding."""
+    for bom, bom_encoding in _BOMS:
+        if body.startswith(bom):
+            return bom_encoding
+
+    if content_type:
+        header = _HEADER_CHARSET.search(content_type)
+        if header:
+            name = _codec_name(header.group(1))
+            if name:
+                return name
+
+    meta = _META_CHARSET.search(body, 0, META_SNIFF_BYTES)
+    if meta:
+        name = _codec_name(meta.group(1).decode('ascii'))
+        # a <meta> tag that could be read as ASCII can't be in UTF-16, the
+        # page is UTF-8 (browsers do the same)
+        if name is not None and name.startswith('utf-16'):
+            return 'utf-8'
+        return name
+    return None
+
+
+def decode_html(body: bytes, content_type: Optional[str] = None) -> Tuple[str, str]:
+    """Decode the HTML, returns the text and the encoding that was used.
+
+    The encoding is sniffed with sniff_encoding(), otherwise it is UTF-8 if
+    the body is valid UTF-8, then the encoding is detected from the whole body.
+    """
+    encoding = sniff_encoding(body, content_type)
+    if encoding is not None:
+        return str(body, encoding, errors='replace'), encoding
+
+    try:
+        return str(body, 'utf-8'), 'utf-8'
+    except UnicodeDecodeError:
+        pass
+
+    # the last resort, imported here as it is rarely needed
+    from requests.compat import chardet  # type: ignore
+
+    encoding = _codec_name(chardet.detect(body)['encoding'] or '') or 'cp1252'
+    return str(body, encoding, errors='replace'), encoding
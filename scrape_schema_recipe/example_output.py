@@ -26,9 +26,10 @@ example_names = tuple(_ex_name_filename.keys())
 
 
 def example_output(name: str,
-                   python_objects: Union[bool, List, Tuple] = False,
+                   python_objects: Union[bool, str, List, Tuple] = False,
                    nonstandard_attrs: bool = False,
-                   migrate_old_schema: bool = True) -> List[Dict]:
+                   migrate_old_schema: bool = True,
+                   as_objects: bool = False) -> List[Dict]:
     """
     Example data useful for prototyping and debugging.  Calls the load()
     function.
@@ -44,6 +45,7 @@ def example_output(name: str,
     python_objects : bool, list, tuple  (optional) (defaults to False)
     nonstandard_attrs : bool, optional (defaults to False)
     migrate_old_schema : bool, optional (defaults to True)
+    as_objects : bool, optional (defaults to False)
 
          [Note: refer to load() function for documentation about the optional
           boolean variables]
@@ -59,4 +61,5 @@ def example_output(name: str,
     return load(files(__package__) / 'test_data' / _ex_name_filename[name],
                 python_objects=python_objects,
                 nonstandard_attrs=nonstandard_attrs,
-                migrate_old_schema=migrate_old_schema)
+                migrate_old_schema=migrate_old_schema,
+                as_objects=as_objects)
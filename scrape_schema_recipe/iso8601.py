@@ -0,0 +1,108 @@
+#
+# Copyright 2023 Micah Cochran
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Parse the ISO 8601 durations and dates of recipes into python objects.
+
+Recipes use a handful of distinct durations ("PT15M", "PT1H30M", ...), so
+the results are memoized.  The durations with whole weeks, days, hours,
+minutes and seconds are parsed by one regular expression, other forms are
+left to isodate.parse_duration(), which is only imported then.  The results
+are the same as isodate's.
+"""
+
+# internal libraries
+import datetime
+import functools
+import re
+import sys
+# for mypy
+from typing import TYPE_CHECKING, Union
+
+if TYPE_CHECKING:
+    import isodate
+
+# the number of distinct strings that are remembered
+CACHE_SIZE = 4096
+
+# The durations that isodate parses into a timedelta, without fractions or a
+# sign.  The numbers are limited to 9 digits so that isodate's floats are
+# exact.  Other forms, and a trailing newline, which isodate allows, don't
+# match and go to isodate.
+_DURATION = re.compile(
+    r'P(?:([0-9]{1,9})W)?(?:([0-9]{1,9})D)?'
+    r'(?:T(?:([0-9]{1,9})H)?(?:([0-9]{1,9})M)?(?:([0-9]{1,9})S)?)?')
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def _parse_duration(s: str) -> Union[datetime.timedelta, 'isodate.Duration']:
+    match = _DURATION.fullmatch(s)
+    # isodate rejects 'P' on its own
+    if match is None or len(s) == 1:
+        import isodate
+        return isodate.parse_duration(s)
+
+    weeks, days, hours, minutes, seconds = (int(g) if g else 0 for g in match.groups())
+    return datetime.timedelta(weeks=weeks, days=days, hours=hours, minutes=minutes, seconds=seconds)
+
+
+def parse_duration(s: str) -> Union[datetime.timedelta, 'isodate.Duration']:
+    """Parse an ISO 8601 duration, like isodate.parse_duration().
+
+    Raises
+    ------
+    isodate.ISO8601Error
+        the string isn't a duration.
+
+    TypeError
+        s isn't a string.
+    """
+    if not isinstance(s, str):
+        raise TypeError(f"Expecting a string {s!r}")
+    return _parse_duration(s)
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def _parse_date(s: str) -> Union[datetime.datetime, datetime.date]:
+    if sys.version_info >= (3, 7):
+        # Check if the date includes time.
+        if 'T' in s:
+            return datetime.datetime.fromisoformat(s)
+        else:
+            return datetime.date.fromisoformat(s)
+    else:
+        import isodate
+
+        # Check if the date includes time.
+        if 'T' in s:
+            return isodate.parse_datetime(s)
+        else:
+            return isodate.parse_date(s)
+
+
+def parse_date(s: str) -> Union[datetime.datetime, datetime.date]:
+    """Parse a date, if time is included it parses as a datetime.
+
+    Raises
+    ------
+    ValueError
+        the string isn't a date.
+
+    TypeError
+        s isn't a string.
+    """
+    if not isinstance(s, str):
+        raise TypeError(f"Expecting a string {s!r}")
+    return _parse_date(s)
@@ -0,0 +1,141 @@
+#
+# Copyright 2023 Micah Cochran
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Decode the JSON of JSON-LD blocks.
+
+The JSON is decoded with orjson or simdjson when they are installed, which
+are several times faster than the json module on large blocks, such as an
+'@graph' with a site's navigation.  Any JSON that the backend can't decode
+is cleaned up and decoded with the json module, as recipe sites publish
+JSON-LD with trailing commas, comments and raw control characters.  Valid
+JSON decodes to the same objects with every backend.
+"""
+
+# internal libraries
+import functools
+import json
+import re
+# for mypy
+from typing import Any, Callable, Dict, Optional, Union
+
+# the JSON backends, from the fastest, json is always available
+JSON_BACKENDS = ('orjson', 'simdjson', 'json')
+
+JsonLoads = Callable[[Union[str, bytes]], Any]
+
+# The things that the json module rejects, outside of strings: trailing commas,
+# /* */ and // comments, HTML comment and CDATA markers, and control
+# characters.  (strict=False allows control characters in strings.)
+_LENIENT = re.compile(
+    r'("(?:[^"\\]|\\.)*")'
+    r'|,(?=\s*[}\]])'
+    r'|/\*.*?\*/|//[^\n]*'
+    r'|<!--|-->|<!\[CDATA\[|\]\]>'
+    r'|[\x00-\x08\x0b\x0c\x0e-\x1f]',
+    re.DOTALL)
+
+
+# orjson (and simdjson) decode integers beyond 64 bits into floats, which the
+# json module keeps as ints.  Those have at least 19 digits, which are found
+# by turning every digit into a '0'.  (much faster than a regular expression)
+_DIGITS_TO_ZERO = bytes.maketrans(b'0123456789', b'0' * 10)
+_LONG_INTEGER = b'0' * 19
+
+
+def _exact_integers(loads: JsonLoads) -> JsonLoads:
+    """loads, which raises ValueError for JSON with long integers, so that
+    they are decoded by the json module."""
+    def exact_loads(s: Union[str, bytes]) -> Any:
+        # (a str with surrogates raises UnicodeEncodeError, a ValueError)
+        data = s.encode('utf-8') if isinstance(s, str) else s
+        if _LONG_INTEGER in data.translate(_DIGITS_TO_ZERO):
+            raise ValueError('the JSON may have integers beyond 64 bits')
+        return loads(data)
+    return exact_loads
+
+
+def _orjson() -> JsonLoads:
+    import orjson
+    return _exact_integers(orjson.loads)
+
+
+def _simdjson() -> JsonLoads:
+    import simdjson
+    return _exact_integers(simdjson.loads)
+
+
+def _json() -> JsonLoads:
+    return functools.partial(json.loads, strict=False)
+
+
+_IMPORTERS: Dict[str, Callable[[], JsonLoads]] = {
+    'orjson': _orjson,
+    'simdjson': _simdjson,
+    'json': _json,
+}
+
+
+@functools.lru_cache(maxsize=None)
+def json_loader(json_backend: Optional[str] = None) -> JsonLoads:
+    """The loads() function of the JSON backend, or of the fastest one that is
+    installed when json_backend is None.
+
+    Raises
+    ------
+    ValueError
+        json_backend isn't one of JSON_BACKENDS.
+
+    ImportError
+        the library of json_backend isn't installed.
+    """
+    if json_backend is None:
+        for name in JSON_BACKENDS:
+            try:
+                return _IMPORTERS[name]()
+            except ImportError:
+                pass
+
+    if json_backend not in _IMPORTERS:
+        raise ValueError(f"json_backend must be one of {JSON_BACKENDS} or None, not {json_backend!r}")
+    try:
+        return _IMPORTERS[json_backend]()
+    except ImportError:
+        raise ImportError(f"json_backend={json_backend!r} requires {json_backend}, install it with: "
+                          f"pip install {'pysimdjson' if json_backend == 'simdjson' else json_backend}")
+
+
+def _lenient_replace(m: 're.Match[str]') -> str:
+    string = m.group(1)
+    return ' ' if string is None else string
+
+
+def loads_json_ld(script: Union[str, bytes], loads: JsonLoads) -> Any:
+    """Decode the text of a JSON-LD block, bytes are UTF-8.  When loads can't
+    decode it, it is cleaned up and decoded with the json module.
+
+    Raises
+    ------
+    ValueError
+        the text can't be decoded.
+    """
+    try:
+        return loads(script)
+    except ValueError:
+        pass
+
+    if isinstance(script, bytes):
+        script = script.decode('utf-8')
+    return json.loads(_LENIENT.sub(_lenient_replace, script), strict=False)
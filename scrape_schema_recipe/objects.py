@@ -0,0 +1,207 @@
+#
+# Copyright 2023 Micah Cochran
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# internal libraries
+import sys
+# for mypy
+from typing import Any, Dict, FrozenSet, List, Mapping, Optional, Tuple, Type, TypeVar
+
+
+# properties whose string values come from a small vocabulary, or repeat
+# across many recipes, these strings are interned so that they're shared
+INTERNED_PROPERTIES = frozenset([
+    '@context', '@type', '_format', 'cookTime', 'inLanguage', 'performTime',
+    'prepTime', 'recipeCategory', 'recipeCuisine', 'recipeYield',
+    'suitableForDiet', 'timeRequired', 'totalTime',
+])
+
+
+T = TypeVar('T', bound='SchemaObject')
+
+
+def _attr_name(key: str) -> str:
+    """The attribute for a property, '@type' is type."""
+    return key[1:] if key.startswith('@') else key
+
+
+class SchemaObject:
+    """Base class of the compact, __slots__ based result types.
+
+    The common properties of the schema.org type are kept in slots, named the
+    same as the keys of the dictionaries (without the '@' of '@context',
+    '@type' and '@id').  Any other properties are kept in a dictionary.
+    Properties that aren't set read as None.
+
+    from_dict() and to_dict() convert from and to the dictionaries returned
+    by load() and the other functions, without losing anything.
+    """
+
+    __slots__ = ('_extra',)
+
+    # the schema.org type, nested dictionaries with this '@type' are converted
+    SCHEMA_TYPE = ''
+    # the properties kept in slots, in the order of __slots__
+    PROPERTIES: Tuple[str, ...] = ()
+    # the properties whose string values are interned
+    INTERNED: FrozenSet[str] = INTERNED_PROPERTIES
+
+    _extra: Optional[Dict[str, Any]]
+
+    def __getattr__(self, name: str) -> Any:
+        # only called for slots that aren't set
+        if name in type(self).__slots__:
+            return None
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+    @classmethod
+    def from_dict(cls: Type[T], d: Mapping[str, Any]) -> T:
+        obj = cls.__new__(cls)
+        obj._fill(d)
+        return obj
+
+    def _fill(self, d: Mapping[str, Any]) -> None:
+        self._extra = None
+        slots = _SLOTS_BY_KEY[type(self)]
+        for key, value in d.items():
+            value = _to_objects(value, key in self.INTERNED)
+            attr = slots.get(key)
+            if attr is not None:
+                object.__setattr__(self, attr, value)
+            else:
+                if self._extra is None:
+                    self._extra = {}
+                self._extra[sys.intern(key)] = value
+
+    def to_dict(self) -> Dict[str, Any]:
+        d = {}
+        for key, attr in zip(self.PROPERTIES, type(self).__slots__):
+            try:
+                value = object.__getattribute__(self, attr)
+            except AttributeError:
+                continue
+            d[key] = _to_dicts(value)
+        if self._extra:
+            for key, value in self._extra.items():
+                d[key] = _to_dicts(value)
+        return d
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Get a property by its key in the dictionary, such as '@type'."""
+        attr = _SLOTS_BY_KEY[type(self)].get(key)
+        if attr is not None:
+            try:
+                return object.__getattribute__(self, attr)
+            except AttributeError:
+                return default
+        if self._extra is not None:
+            return self._extra.get(key, default)
+        return default
+
+    def __eq__(self, other: Any) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    __hash__ = None  # type: ignore
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}.from_dict({self.to_dict()!r})'
+
+    # pickled as a dictionary, so that the strings are interned when unpickled
+    def __getstate__(self) -> Dict[str, Any]:
+        return self.to_dict()
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self._fill(state)
+
+
+class Recipe(SchemaObject):
+    """A https://schema.org/Recipe"""
+
+    SCHEMA_TYPE = 'Recipe'
+    PROPERTIES = (
+        '@context', '@type', '@id', 'name', 'description', 'image', 'url',
+        'author', 'datePublished', 'dateModified', 'prepTime', 'cookTime',
+        'totalTime', 'recipeYield', 'recipeCategory', 'recipeCuisine',
+        'keywords', 'recipeIngredient', 'recipeInstructions', 'nutrition',
+        'aggregateRating', 'review', 'video', 'suitableForDiet',
+    )
+    __slots__ = tuple(_attr_name(key) for key in PROPERTIES)
+
+
+class HowToStep(SchemaObject):
+    """A https://schema.org/HowToStep, a step of recipeInstructions"""
+
+    SCHEMA_TYPE = 'HowToStep'
+    PROPERTIES = ('@type', 'name', 'text', 'url', 'image')
+    __slots__ = tuple(_attr_name(key) for key in PROPERTIES)
+
+
+class NutritionInformation(SchemaObject):
+    """A https://schema.org/NutritionInformation"""
+
+    SCHEMA_TYPE = 'NutritionInformation'
+    PROPERTIES = (
+        '@type', 'calories', 'carbohydrateContent', 'cholesterolContent',
+        'fatContent', 'fiberContent', 'proteinContent', 'saturatedFatContent',
+        'servingSize', 'sodiumContent', 'sugarContent', 'transFatContent',
+        'unsaturatedFatContent',
+    )
+    __slots__ = tuple(_attr_name(key) for key in PROPERTIES)
+    # the values, such as '200 calories', repeat across recipes
+    INTERNED = INTERNED_PROPERTIES.union(PROPERTIES)
+
+
+_CLASSES: Tuple[Type[SchemaObject], ...] = (Recipe, HowToStep, NutritionInformation)
+_CLASSES_BY_TYPE = {cls.SCHEMA_TYPE: cls for cls in _CLASSES}
+_SLOTS_BY_KEY = {cls: dict(zip(cls.PROPERTIES, cls.__slots__)) for cls in _CLASSES}
+
+
+def _to_objects(value: Any, intern: bool = False) -> Any:
+    """Convert the dictionaries of the types above in value."""
+    if isinstance(value, str):
+        return sys.intern(value) if intern else value
+    if isinstance(value, dict):
+        schema_type = value.get('@type')
+        # '@type' can be a list, those are left as dictionaries
+        cls = _CLASSES_BY_TYPE.get(schema_type) if isinstance(schema_type, str) else None
+        if cls is not None:
+            return cls.from_dict(value)
+        return {sys.intern(k): _to_objects(v, k in INTERNED_PROPERTIES) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_to_objects(v, intern) for v in value]
+    return value
+
+
+def _to_dicts(value: Any) -> Any:
+    """The inverse of _to_objects()"""
+    if isinstance(value, SchemaObject):
+        return value.to_dict()
+    if isinstance(value, dict):
+        return {k: _to_dicts(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_to_dicts(v) for v in value]
+    return value
+
+
+def to_objects(recipes: List[Mapping[str, Any]]) -> List[Recipe]:
+    """Convert recipes from dictionaries into Recipe objects."""
+    return [Recipe.from_dict(r) for r in recipes]
+
+
+def to_dicts(recipes: List[Recipe]) -> List[Dict[str, Any]]:
+    """Convert Recipe objects back into dictionaries."""
+    return [r.to_dict() for r in recipes]
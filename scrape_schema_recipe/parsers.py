@@ -0,0 +1,526 @@
+#
+# Copyright 2023 Micah Cochran
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""The HTML parsers that extract the JSON-LD and microdata items of a page,
+when the page has to be parsed.
+
+'extruct'
+    lxml and extruct's extractors, which extract every microdata item.
+
+'lxml'
+    lxml, with a microdata extractor that only extracts the top level
+    Recipe items, without extruct.
+
+'selectolax'
+    selectolax's lexbor parser, with the same microdata extractor as 'lxml'.
+
+The items are in extruct's form, which _convert_to_scrapings() reads.  The
+recipes are the same with 'lxml' as with 'extruct'.  (The lean extractor
+doesn't follow itemref attributes, which recipe sites don't use.)  lexbor
+builds the tree of broken HTML as browsers do, which libxml2 doesn't, so the
+text of microdata in broken HTML can differ with 'selectolax'.
+"""
+
+# internal libraries
+from abc import ABC, abstractmethod
+from collections import defaultdict
+import functools
+import re
+from urllib.parse import urljoin
+# for mypy
+from typing import Any, Callable, Dict, Iterator, List, Optional, TYPE_CHECKING, Union
+
+from .jsonld import JsonLoads, loads_json_ld
+
+if TYPE_CHECKING:
+    from .scrape import BytesLike
+
+# the HTML parsers, 'extruct' is the default
+HTML_PARSERS = ('extruct', 'lxml', 'selectolax')
+
+# the JSON-LD <script> elements of a parsed document, as extruct finds them
+_JSON_LD_XPATH = 'descendant-or-self::script[@type="application/ld+json"]'
+
+# the itemtypes that _convert_to_scrapings() reads
+_RECIPE_TYPES = frozenset(['http://schema.org/Recipe', 'https://schema.org/Recipe'])
+
+# the HTML5 whitespace that is stripped from URLs, as w3lib does
+_HTML5_WHITESPACE = ' \t\n\r\x0c'
+
+# the elements whose URL is their value, and its attribute
+_URL_ATTRIBUTES = dict.fromkeys(('audio', 'embed', 'iframe', 'img', 'source', 'track', 'video'), 'src')
+_URL_ATTRIBUTES.update(dict.fromkeys(('a', 'area', 'link'), 'href'))
+_URL_ATTRIBUTES['object'] = 'data'
+
+
+class _BufferReader:
+    """A file-like reader of a buffer, lxml parses files a chunk at a time."""
+
+    def __init__(self, view: memoryview):
+        self._view = view
+        self._pos = 0
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = len(self._view) - self._pos
+        chunk = self._view[self._pos:self._pos + size].tobytes()
+        self._pos += len(chunk)
+        return chunk
+
+
+def _parse_html_bytes(html: 'BytesLike', encoding: str) -> Any:
+    """Parse binary HTML with lxml, like extruct's parse_html().  HTML that
+    is not a bytes object is read by the parser a chunk at a time, instead of
+    copying all of it into a bytes object."""
+    import lxml.etree
+    import lxml.html
+
+    parser = lxml.html.HTMLParser(encoding=encoding)
+    if isinstance(html, bytes):
+        return lxml.html.fromstring(html, parser=parser)
+
+    # (lxml's feed() interface is much slower on large pages than parsing a file)
+    with memoryview(html) as view:  # type: ignore
+        return lxml.etree.parse(_BufferReader(view), parser).getroot()
+
+
+def _parse_html_lxml(html: Union[str, 'BytesLike'], encoding: Optional[str]) -> Any:
+    """Parse the HTML with lxml, a str as extruct does, binary HTML in encoding."""
+    if isinstance(html, str):
+        import lxml.html
+        return lxml.html.fromstring(html, parser=lxml.html.HTMLParser(encoding='UTF-8'))
+    return _parse_html_bytes(html, encoding)  # type: ignore
+
+
+def _add_json_ld(items: List[Dict], data: Any) -> None:
+    """Add the decoded JSON of a block to the items, like extruct."""
+    if isinstance(data, list):
+        items.extend(item for item in data if item)
+    elif isinstance(data, dict) and data:
+        items.append(data)
+
+
+# ---- the text content of microdata properties ----
+
+# These are the rules of html_text.etree_to_text(), which extruct uses for
+# the text content of a property: newlines around block elements, and spaces
+# between the text of elements, except before punctuation.
+_NEWLINE_TAGS = frozenset([
+    'article', 'aside', 'br', 'dd', 'details', 'div', 'dt', 'fieldset',
+    'figcaption', 'footer', 'form', 'header', 'hr', 'legend', 'li', 'main',
+    'nav', 'table', 'tr'])
+_DOUBLE_NEWLINE_TAGS = frozenset([
+    'blockquote', 'dl', 'figure', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'ol',
+    'p', 'pre', 'title', 'ul'])
+# the elements that extruct removes, with their content, before getting the text
+_SKIPPED_TAGS = frozenset(['script', 'style', 'link', 'meta'])
+
+_WHITESPACE = re.compile(r'\s+')
+_TRAILING_WHITESPACE = re.compile(r'\s$')
+_PUNCTUATION_AFTER = re.compile(r'^[,:;.!?")]')
+_OPEN_BRACKET_BEFORE = re.compile(r'\($')
+
+# the previous chunk of text content, when it isn't text
+_NEWLINE = object()
+_DOUBLE_NEWLINE = object()
+
+
+class _TextContent:
+    """Builds the text content of an element from the start and end of the
+    elements in it and their text, in document order.
+
+    Text that follows other text directly is joined to it first, as extruct
+    joins the text around the elements that it removes.
+    """
+
+    def __init__(self) -> None:
+        self._chunks: List[str] = []
+        # _NEWLINE, _DOUBLE_NEWLINE or the previous text
+        self._prev: object = _DOUBLE_NEWLINE
+        self._pending: List[str] = []
+
+    def text(self, text: Optional[str]) -> None:
+        if text:
+            self._pending.append(text)
+
+    def tag(self, tag: str) -> None:
+        """The start or the end of an element."""
+        if self._pending:
+            self._flush()
+        if self._prev is _DOUBLE_NEWLINE:
+            # no more than one blank line
+            return
+        if tag in _DOUBLE_NEWLINE_TAGS:
+            self._chunks.append('\n' if self._prev is _NEWLINE else '\n\n')
+            self._prev = _DOUBLE_NEWLINE
+        elif tag in _NEWLINE_TAGS:
+            if self._prev is not _NEWLINE:
+                self._chunks.append('\n')
+            self._prev = _NEWLINE
+
+    def _flush(self) -> None:
+        raw = ''.join(self._pending)
+        self._pending.clear()
+        text = _WHITESPACE.sub(' ', raw.strip())
+        if not text:
+            return
+        prev = self._prev
+        if isinstance(prev, str) and (_TRAILING_WHITESPACE.search(prev) or (
+                not _PUNCTUATION_AFTER.search(text) and not _OPEN_BRACKET_BEFORE.search(prev))):
+            self._chunks.append(' ')
+        self._chunks.append(text)
+        self._prev = raw
+
+    def result(self) -> str:
+        if self._pending:
+            self._flush()
+        return ''.join(self._chunks).strip()
+
+
+def _or_empty(value: Optional[str]) -> str:
+    return '' if value is None else value
+
+
+# ---- microdata ----
+
+class _MicrodataExtractor(ABC):
+    """Extracts the top level schema.org/Recipe microdata items of a parsed
+    document, in the same form as extruct's microdata extractor.
+
+    The subclasses give access to the elements of their parser's tree.
+    """
+
+    def __init__(self, base_url: Optional[str] = None):
+        self.base_url = base_url
+
+    # -- the elements of the tree --
+
+    @abstractmethod
+    def _itemscopes(self, tree: Any) -> Iterator[Any]:
+        """The elements with an itemscope, in document order."""
+
+    @abstractmethod
+    def _get(self, node: Any, name: str) -> Optional[str]:
+        """The value of an attribute, '' for an attribute without one, or None."""
+
+    @abstractmethod
+    def _tag(self, node: Any) -> str:
+        """The tag name."""
+
+    @abstractmethod
+    def _children(self, node: Any) -> Iterator[Any]:
+        """The child elements."""
+
+    @abstractmethod
+    def _has_itemscope_ancestor(self, node: Any) -> bool:
+        """Is the element inside another element with an itemscope."""
+
+    @abstractmethod
+    def _text_content(self, node: Any) -> str:
+        """The text of the element and its descendants."""
+
+    # -- the items --
+
+    def extract_items(self, tree: Any) -> List[Dict]:
+        items = []
+        for node in self._itemscopes(tree):
+            types = _or_empty(self._get(node, 'itemtype')).split()
+            if len(types) != 1 or types[0] not in _RECIPE_TYPES:
+                continue
+            # an item that is the value of a property isn't at the top level
+            if self._get(node, 'itemprop') is not None and self._has_itemscope_ancestor(node):
+                continue
+            items.append(self._item(node))
+        return items
+
+    def _item(self, node: Any) -> Dict[str, Any]:
+        item: Dict[str, Any] = {}
+        types = _or_empty(self._get(node, 'itemtype')).split()
+        if types:
+            item['type'] = types[0] if len(types) == 1 else types
+            itemid = self._get(node, 'itemid')
+            if itemid:
+                item['id'] = itemid.strip()
+
+        properties: Dict[str, List[Any]] = defaultdict(list)
+        for prop in self._properties(node):
+            value = self._value(prop)
+            for name in _or_empty(self._get(prop, 'itemprop')).split():
+                properties[name].append(value)
+
+        if properties:
+            item['properties'] = {name: values[0] if len(values) == 1 else values
+                                  for name, values in properties.items()}
+        else:
+            # an item without properties, its value is the element's
+            item['value'] = self._value(node, force=True)
+        return item
+
+    def _properties(self, node: Any) -> Iterator[Any]:
+        """The elements with an itemprop of the item, which aren't in a
+        nested item, in document order."""
+        for child in self._children(node):
+            if self._get(child, 'itemprop') is not None:
+                yield child
+            if self._get(child, 'itemscope') is None:
+                yield from self._properties(child)
+
+    def _value(self, node: Any, force: bool = False) -> Any:
+        """The value of a property, see https://www.w3.org/TR/microdata/#values"""
+        if not force and self._get(node, 'itemscope') is not None:
+            return self._item(node)
+
+        tag = self._tag(node)
+        if tag == 'meta':
+            return _or_empty(self._get(node, 'content'))
+
+        attribute = _URL_ATTRIBUTES.get(tag)
+        if attribute is not None:
+            return urljoin(self.base_url, _or_empty(self._get(node, attribute)).strip(_HTML5_WHITESPACE))  # type: ignore
+
+        if tag in ('data', 'meter'):
+            return _or_empty(self._get(node, 'value'))
+        if tag == 'time':
+            return _or_empty(self._get(node, 'datetime'))
+
+        # not in the W3C specification, but used in schema.org's examples
+        content = self._get(node, 'content')
+        if content:
+            return content
+
+        # https://schema.org/docs/actions.html#part-4
+        itemprop = self._get(node, 'itemprop')
+        if itemprop and itemprop.endswith(('-input', '-output')):
+            result: Dict[str, Any] = {}
+            if self._get(node, 'required') is not None:
+                result['valueRequired'] = True
+            name = self._get(node, 'name')
+            if name:
+                result['valueName'] = name
+            return result
+
+        return self._text_content(node)
+
+
+class _LxmlMicrodataExtractor(_MicrodataExtractor):
+
+    def _itemscopes(self, tree: Any) -> Iterator[Any]:
+        return iter(tree.xpath('descendant-or-self::*[@itemscope]'))
+
+    def _get(self, node: Any, name: str) -> Optional[str]:
+        return node.get(name)
+
+    def _tag(self, node: Any) -> str:
+        return node.tag
+
+    def _children(self, node: Any) -> Iterator[Any]:
+        # (skipping comments and processing instructions)
+        return (child for child in node if isinstance(child.tag, str))
+
+    def _has_itemscope_ancestor(self, node: Any) -> bool:
+        return any(ancestor.get('itemscope') is not None for ancestor in node.iterancestors())
+
+    def _text_content(self, node: Any) -> str:
+        if node.tag in _SKIPPED_TAGS:
+            return ''
+        content = _TextContent()
+        self._walk_text(node, content)
+        return content.result()
+
+    def _walk_text(self, node: Any, content: _TextContent) -> None:
+        content.tag(node.tag)
+        content.text(node.text)
+        for child in node:
+            if isinstance(child.tag, str) and child.tag not in _SKIPPED_TAGS:
+                self._walk_text(child, content)
+                content.text(child.tail)
+            else:
+                # a comment, processing instruction or skipped element, only its tail is text
+                content.text(child.tail)
+        content.tag(node.tag)
+
+
+def _is_element(node: Any) -> bool:
+    """Is the selectolax node an element?  The tags of text, comment and
+    document nodes start with a '-', processing instructions have none."""
+    tag = node.tag
+    return tag is not None and not tag.startswith('-')
+
+
+class _SelectolaxMicrodataExtractor(_MicrodataExtractor):
+
+    def _itemscopes(self, tree: Any) -> Iterator[Any]:
+        return iter(tree.css('[itemscope]'))
+
+    def _get(self, node: Any, name: str) -> Optional[str]:
+        attributes = node.attributes
+        if name not in attributes:
+            return None
+        return _or_empty(attributes[name])
+
+    def _tag(self, node: Any) -> str:
+        return node.tag
+
+    def _children(self, node: Any) -> Iterator[Any]:
+        # (skipping comments and processing instructions)
+        return (child for child in node.iter(include_text=False) if _is_element(child))
+
+    def _has_itemscope_ancestor(self, node: Any) -> bool:
+        ancestor = node.parent
+        while ancestor is not None:
+            if _is_element(ancestor) and 'itemscope' in ancestor.attributes:
+                return True
+            ancestor = ancestor.parent
+        return False
+
+    def _text_content(self, node: Any) -> str:
+        if node.tag in _SKIPPED_TAGS:
+            return ''
+        content = _TextContent()
+        self._walk_text(node, content)
+        return content.result()
+
+    def _walk_text(self, node: Any, content: _TextContent) -> None:
+        content.tag(node.tag)
+        child = node.child
+        while child is not None:
+            if child.tag == '-text':
+                content.text(child.text_content)
+            elif _is_element(child) and child.tag not in _SKIPPED_TAGS:
+                self._walk_text(child, content)
+            child = child.next
+        content.tag(node.tag)
+
+
+# ---- the parsers ----
+
+class _HtmlParser(ABC):
+    """The interface of an HTML parser."""
+
+    # can a tree parsed by lxml be given, see loads()
+    reads_lxml_tree = True
+
+    @abstractmethod
+    def parse(self, html: Union[str, 'BytesLike'], encoding: Optional[str] = None) -> Any:
+        """Parse a str, or binary HTML in encoding, into a tree."""
+
+    @abstractmethod
+    def json_ld(self, tree: Any, loads: JsonLoads) -> List[Dict]:
+        """The items of the JSON-LD blocks, decoding the JSON with loads."""
+
+    @abstractmethod
+    def microdata(self, tree: Any, base_url: Optional[str] = None) -> List[Dict]:
+        """The microdata items, at least the top level Recipe items."""
+
+
+class _ExtructParser(_HtmlParser):
+
+    def parse(self, html: Union[str, 'BytesLike'], encoding: Optional[str] = None) -> Any:
+        if isinstance(html, str):
+            from extruct.utils import parse_html
+            return parse_html(html, encoding='UTF-8')
+        return _parse_html_bytes(html, encoding)  # type: ignore
+
+    def json_ld(self, tree: Any, loads: JsonLoads) -> List[Dict]:
+        items: List[Dict] = []
+        for node in tree.xpath(_JSON_LD_XPATH):
+            # (orjson only reads exactly str, not lxml's subclass of it)
+            script = str(node.xpath('string()'))
+            try:
+                data = loads_json_ld(script, loads)
+            except ValueError:
+                # extruct has its own ways with broken JSON, or raises the error
+                from extruct.jsonld import JsonLdExtractor
+                items.extend(JsonLdExtractor().extract_items(node))
+                continue
+            _add_json_ld(items, data)
+        return items
+
+    def microdata(self, tree: Any, base_url: Optional[str] = None) -> List[Dict]:
+        from extruct.w3cmicrodata import MicrodataExtractor
+        return MicrodataExtractor().extract_items(tree, base_url)
+
+
+class _LxmlParser(_HtmlParser):
+
+    def parse(self, html: Union[str, 'BytesLike'], encoding: Optional[str] = None) -> Any:
+        return _parse_html_lxml(html, encoding)
+
+    def json_ld(self, tree: Any, loads: JsonLoads) -> List[Dict]:
+        items: List[Dict] = []
+        for node in tree.xpath(_JSON_LD_XPATH):
+            # JSON that can't be decoded raises ValueError, as extruct does
+            _add_json_ld(items, loads_json_ld(str(node.xpath('string()')), loads))
+        return items
+
+    def microdata(self, tree: Any, base_url: Optional[str] = None) -> List[Dict]:
+        return _LxmlMicrodataExtractor(base_url).extract_items(tree)
+
+
+class _SelectolaxParser(_HtmlParser):
+
+    reads_lxml_tree = False
+
+    def __init__(self) -> None:
+        from selectolax.lexbor import LexborHTMLParser
+        self._parser = LexborHTMLParser
+
+    def parse(self, html: Union[str, 'BytesLike'], encoding: Optional[str] = None) -> Any:
+        if not isinstance(html, str):
+            # lexbor reads UTF-8
+            html = bytes(html).decode(encoding or 'utf-8', 'replace')
+        return self._parser(html)
+
+    def json_ld(self, tree: Any, loads: JsonLoads) -> List[Dict]:
+        items: List[Dict] = []
+        for node in tree.css('script'):
+            # the same elements as _JSON_LD_XPATH, the type is compared exactly
+            if node.attributes.get('type') == 'application/ld+json':
+                _add_json_ld(items, loads_json_ld(node.text(deep=True), loads))
+        return items
+
+    def microdata(self, tree: Any, base_url: Optional[str] = None) -> List[Dict]:
+        return _SelectolaxMicrodataExtractor(base_url).extract_items(tree)
+
+
+_PARSERS: Dict[str, Callable[[], _HtmlParser]] = {
+    'extruct': _ExtructParser,
+    'lxml': _LxmlParser,
+    'selectolax': _SelectolaxParser,
+}
+
+
+@functools.lru_cache(maxsize=None)
+def html_parser_backend(html_parser: Optional[str] = None) -> _HtmlParser:
+    """The HTML parser named html_parser, 'extruct' when it is None.
+
+    Raises
+    ------
+    ValueError
+        html_parser isn't one of HTML_PARSERS.
+
+    ImportError
+        the library of html_parser isn't installed.
+    """
+    if html_parser is None:
+        html_parser = 'extruct'
+    if html_parser not in _PARSERS:
+        raise ValueError(f"html_parser must be one of {HTML_PARSERS} or None, not {html_parser!r}")
+    try:
+        return _PARSERS[html_parser]()
+    except ImportError:
+        raise ImportError(f"html_parser={html_parser!r} requires {html_parser}, install it with: "
+                          f"pip install {html_parser}")
@@ -1,553 +1,1227 @@
-#
-# Copyright 2019-2023 Micah Cochran
-#
-# Licensed under the Apache License, Version 2.0 (the "License");
-# you may not use this file except in compliance with the License.
-# You may obtain a copy of the License at
-#
-#    http://www.apache.org/licenses/LICENSE-2.0
-#
-# Unless required by applicable law or agreed to in writing, software
-# distributed under the License is distributed on an "AS IS" BASIS,
-# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
-# See the License for the specific language governing permissions and
-# limitations under the License.
-#
-
-# internal libraries
-from dataclasses import dataclass
-import datetime
-import html
-from pathlib import Path
-import sys
-# for mypy
-from typing import Any, Callable, Dict, IO, List, Optional, Tuple, Union
-
-# external libraries
-import extruct
-import isodate
-import requests
-
-
-_PACKAGE_PATH = Path(__file__).resolve().parent
-
-# read version from VERSION file
-__version__ = (_PACKAGE_PATH / 'VERSION').read_text().strip()
-
-
-# Follow RFC 7231 sec. 5.5.3
-USER_AGENT_STR = f'scrape-schema-recipe/{__version__} requests/{requests.__version__}'
-
-
-@dataclass
-class SSRTypeError(TypeError):
-    """Custom error that is raised when the input given is not of the correct type."""
-    var_name: str
-    object_type: type
-    expected_types: str
-    
-    def __str__(self):
-        s = f'{self.var_name} is of type "{self.object_type.__name__}", when expecting one of the following type(s): {self.expected_types}'
-
-        return s
-
-
-def scrape(
-    location: Union[str, IO[str]],
-    python_objects: Union[bool, List, Tuple] = False,
-    nonstandard_attrs: bool = False,
-    migrate_old_schema: bool = True,
-    user_agent_str: Optional[str] = None,
-) -> List[Dict[str, Any]]:
-    """
-    Parse data in https://schema.org/Recipe format into a list of dictionaries
-    representing the recipe data.
-
-    Parameters
-    ----------
-    location : string or file-like object
-        A url, filename, or text_string of HTML, or a file-like object.
-
-    python_objects : bool, list, tuple  (optional)
-        when True it translates certain data types into python objects
-          dates into datetime.date, datetimes into datetime.datetimes,
-          durations as dateime.timedelta.
-        when set to a list or tuple only converts types specified to
-          python objects:
-          when set to either [dateime.date] or [datetime.datetimes] either will
-            convert dates.
-          when set to [datetime.timedelta] durations will be converted
-        when False no conversion is performed
-        (defaults to False)
-
-    nonstandard_attrs : bool, optional
-        when True it adds nonstandard (for schema.org/Recipe) attributes to the
-        resulting dictionaries, that are outside the specification such as:
-            '_format' is either 'json-ld' or 'microdata' (how schema.org/Recipe was encoded into HTML)
-            '_source_url' is the source url, when 'url' has already been defined as another value
-        (defaults to False)
-
-    migrate_old_schema : bool, optional
-        when True it migrates the schema from older version to current version
-        (defaults to True)
-
-    user_agent_str : string, optional
-        overide the user_agent_string with this value.
-        (defaults to None)
-
-    Returns
-    -------
-    list
-        a list of dictionaries in the style of schema.org/Recipe JSON-LD
-        no results - an empty list will be returned
-    """
-
-    data = {}  # type: Dict[str, List[Dict]]
-
-    if not user_agent_str:
-        user_agent_str = USER_AGENT_STR
-
-    # make sure that one and only are defined
-    url = None
-    if isinstance(location, str):
-        # Is this a url?
-        if location.startswith(("http://", "https://")):
-            return scrape_url(location, python_objects=python_objects,
-                              nonstandard_attrs=nonstandard_attrs,
-                              user_agent_str=user_agent_str)
-
-        # Is this is is a very long string? Perhaps it has HTML content.
-        elif len(location) > 255:
-            data = extruct.extract(location)
-
-        # Maybe it is a filename?
-        else:
-            with open(location) as f:
-                data = extruct.extract(f.read())
-    elif hasattr(location, 'read'):
-        # Assume this is some kind of file-like object that can be read.
-        data = extruct.extract(location.read())
-    else:
-        raise SSRTypeError(var_name="location", 
-                           object_type=type(location), 
-                           expected_types = "string for a url, filename, or text_string of the HTML, or a file-like object")
-
-    scrapings = _convert_to_scrapings(data, nonstandard_attrs, url=url)
-
-    if migrate_old_schema is True:
-        scrapings = _migrate_old_schema(scrapings)
-
-    scrapings = [_unescape_content(s) for s in scrapings]
-
-    if python_objects is not False:
-        scrapings = _pythonize_objects(scrapings, python_objects)
-
-    return scrapings
-
-
-def load(
-    fp: Union[str, IO[str], Path],
-    python_objects: Union[bool, List, Tuple] = False,
-    nonstandard_attrs: bool = False,
-    migrate_old_schema: bool = True,
-) -> List[Dict[str, Any]]:
-    """load a filename or file object to scrape
-
-    Parameters
-    ----------
-    fp : string or file-like object
-        A file name or a file-like object.
-
-    python_objects : bool, list, tuple  (optional)
-        when True it translates certain data types into python objects
-          dates into datetime.date, datetimes into datetime.datetimes,
-          durations as dateime.timedelta.
-        when set to a list or tuple only converts types specified to
-          python objects:
-          when set to either [dateime.date] or [datetime.datetimes] either will
-            convert dates.
-          when set to [datetime.timedelta] durations will be converted
-        when False no conversion is performed
-        (defaults to False)
-
-    nonstandard_attrs : bool, optional
-        when True it adds nonstandard (for schema.org/Recipe) attributes to the
-        resulting dictionaries, that are outside the specification such as:
-            '_format' is either 'json-ld' or 'microdata' (how schema.org/Recipe was encoded into HTML)
-            '_source_url' is the source url, when 'url' has already been defined as another value
-        (defaults to False)
-
-    migrate_old_schema : bool, optional
-        when True it migrates the schema from older version to current version
-        (defaults to True)
-
-    Returns
-    -------
-    list
-        a list of dictionaries in the style of schema.org/Recipe JSON-LD
-        no results - an empty list will be returned
-
-    """
-
-    data = {}  # type: Dict[str, List[Dict]]
-
-    if isinstance(fp, str):
-        with open(fp) as f:
-            data = extruct.extract(f.read())
-    elif isinstance(fp, Path):
-        data = extruct.extract(fp.read_text())
-    elif hasattr(fp, 'read'):
-        # Assume this is some kind of file-like object that can be read.
-        data = extruct.extract(fp.read())
-    else:
-        raise SSRTypeError(var_name="fp", 
-                           object_type=type(fp), 
-                           expected_types="a filename, pathlib.Path object, or a file-like object")
-
-    scrapings = _convert_to_scrapings(data, nonstandard_attrs)
-
-    if migrate_old_schema is True:
-        scrapings = _migrate_old_schema(scrapings)
-
-    scrapings = [_unescape_content(s) for s in scrapings]
-
-    if python_objects is not False:
-        scrapings = _pythonize_objects(scrapings, python_objects)
-
-    return scrapings
-
-
-def loads(
-    string: str,
-    python_objects: Union[bool, List, Tuple] = False,
-    nonstandard_attrs: bool = False,
-    migrate_old_schema: bool = True,
-) -> List[Dict[str, Any]]:
-    """scrapes a string
-
-    Parameters
-    ----------
-    string : string
-        A text string of HTML.
-
-    python_objects : bool, list, tuple  (optional)
-        when True it translates certain data types into python objects
-          dates into datetime.date, datetimes into datetime.datetimes,
-          durations as dateime.timedelta.
-        when set to a list or tuple only converts types specified to
-          python objects:
-          when set to either [dateime.date] or [datetime.datetimes] either will
-            convert dates.
-          when set to [datetime.timedelta] durations will be converted
-        when False no conversion is performed
-        (defaults to False)
-
-    nonstandard_attrs : bool, optional
-        when True it adds nonstandard (for schema.org/Recipe) attributes to the
-        resulting dictionaries, that are outside the specification such as:
-            '_format' is either 'json-ld' or 'microdata' (how schema.org/Recipe was encoded into HTML)
-            '_source_url' is the source url, when 'url' has already been defined as another value
-        (defaults to False)
-
-    migrate_old_schema : bool, optional
-        when True it migrates the schema from older version to current version
-        (defaults to True)
-
-    Returns
-    -------
-    list
-        a list of dictionaries in the style of schema.org/Recipe JSON-LD
-        no results - an empty list will be returned
-
-    """
-
-    if not isinstance(string, str):
-        raise SSRTypeError(var_name="string", object_type=type(string), expected_types="string")
-
-
-    data = {}  # type: Dict[str, List[Dict]]
-    data = extruct.extract(string)
-    scrapings = _convert_to_scrapings(data, nonstandard_attrs)
-
-    if migrate_old_schema is True:
-        scrapings = _migrate_old_schema(scrapings)
-
-    scrapings = [_unescape_content(s) for s in scrapings]
-
-    if python_objects is not False:
-        scrapings = _pythonize_objects(scrapings, python_objects)
-
-    return scrapings
-
-
-def scrape_url(
-    url: str,
-    python_objects: Union[bool, List, Tuple] = False,
-    nonstandard_attrs: bool = False,
-    migrate_old_schema: bool = True,
-    user_agent_str: Optional[str] = None,
-) -> List[Dict[str, Any]]:
-    """scrape from a URL
-
-    Parameters
-    ----------
-    url : string
-        A url to download data from and scrape.
-
-    python_objects : bool, list, tuple  (optional)
-        when True it translates certain data types into python objects
-          dates into datetime.date, datetimes into datetime.datetimes,
-          durations as dateime.timedelta.
-        when set to a list or tuple only converts types specified to
-          python objects:
-          when set to either [dateime.date] or [datetime.datetimes] either will
-            convert dates.
-          when set to [datetime.timedelta] durations will be converted
-        when False no conversion is performed
-        (defaults to False)
-
-    nonstandard_attrs : bool, optional
-        when True it adds nonstandard (for schema.org/Recipe) attributes to the
-        resulting dictionaries, that are outside the specification such as:
-            '_format' is either 'json-ld' or 'microdata' (how schema.org/Recipe was encoded into HTML)
-            '_source_url' is the source url, when 'url' has already been defined as another value
-        (defaults to False)
-
-    migrate_old_schema : bool, optional
-        when True it migrates the schema from older version to current version
-        (defaults to True)
-
-    user_agent_str : string, optional
-        overide the user_agent_string with this value.
-        (defaults to None)
-
-    Returns
-    -------
-    list
-        a list of dictionaries in the style of schema.org/Recipe JSON-LD
-        no results - an empty list will be returned
-
-
-    """
-
-    if not isinstance(url, str):
-        raise SSRTypeError(var_name="url", object_type=type(url), expected_types="string")
-
-
-    data: Dict[str, List[Dict]] = {}
-    if not user_agent_str:
-        user_agent_str = USER_AGENT_STR
-
-    r = requests.get(url, headers={"User-Agent": user_agent_str}, timeout=5)
-    r.raise_for_status()
-    data = extruct.extract(r.text, r.url)
-    url = r.url
-
-    scrapings = _convert_to_scrapings(data, nonstandard_attrs, url=url)
-
-    if migrate_old_schema is True:
-        scrapings = _migrate_old_schema(scrapings)
-
-    scrapings = [_unescape_content(s) for s in scrapings]
-
-    if python_objects is not False:
-        scrapings = _pythonize_objects(scrapings, python_objects)
-
-    return scrapings
-
-
-def _convert_json_ld_recipe(
-    rec: Dict[str, Any], nonstandard_attrs: bool = False, url: Optional[str] = None
-) -> Dict[str, Any]:
-    """Helper function for _convert_to_scraping
-    for a json-ld record adding extra tags"""
-    # not sure if a copy is necessary?
-    d = rec.copy()
-    if nonstandard_attrs is True:
-        d['_format'] = 'json-ld'
-    # store the url
-    if url:
-        if d.get('url') and d.get('url') != url and nonstandard_attrs is True:
-            d['_source_url'] = url
-        else:
-            d['url'] = url
-    return d
-
-
-def _convert_to_scrapings(
-    data: Dict[str, List[Dict]],
-    nonstandard_attrs: bool = False,
-    url: Optional[str] = None,
-) -> List[Dict]:
-    """detects schema.org/Recipe content in the dictionary and extracts the content"""
-    out = []
-    if data['json-ld'] != []:
-        for rec in data['json-ld']:
-            # checks if '@type' is not None and 'Recipe' is contained in a list or 'Recipe' == 'Recipe' 
-            if rec.get("@type") and "Recipe" in rec.get("@type"):  # type: ignore
-                d = _convert_json_ld_recipe(rec, nonstandard_attrs, url)
-                out.append(d)
-
-            if rec.get('@context') == 'https://schema.org' and '@graph' in rec.keys():
-                # walk the graph
-                for subrec in rec['@graph']:
-                    if subrec['@type'] == 'Recipe':
-                        d = _convert_json_ld_recipe(subrec, nonstandard_attrs, url)
-                        out.append(d)
-
-    if data['microdata'] != []:
-        for rec in data['microdata']:
-            if rec['type'] in ('http://schema.org/Recipe',
-                               'https://schema.org/Recipe'):
-                d = rec['properties'].copy()
-                if nonstandard_attrs is True:
-                    d['_format'] = 'microdata'
-                # add @context and @type for conversion to the JSON-LD
-                # style format
-                if rec['type'][:6] == 'https:':
-                    d['@context'] = 'https://schema.org'
-                else:
-                    d['@context'] = 'http://schema.org'
-                d['@type'] = 'Recipe'
-
-                # store the url
-                if url:
-                    if d.get('url') and nonstandard_attrs is True:
-                        d['_source_url'] = url
-                    else:
-                        d['url'] = url
-
-                for key in d.keys():
-                    if isinstance(d[key], dict) and 'type' in d[key]:
-                        type_ = d[key].pop('type')
-                        d[key]['@type'] = type_.split('/')[3]
-
-                out.append(d)
-
-    return out
-
-
-# properties that will be passed into datetime objects
-DATETIME_PROPERTIES = frozenset(['dateCreated', 'dateModified',
-                                 'datePublished', 'expires'])
-DURATION_PROPERTIES = frozenset(['cookTime', 'performTime', 'prepTime',
-                                 'totalTime', 'timeRequired'])
-
-
-def _parse_determine_date_datetime(s: str) -> Union[datetime.datetime,
-                                                    datetime.date]:
-    """Parse function parses a date, if time is included it parses as a
-    datetime.
-    """
-    if sys.version_info >= (3, 7):
-        # Check if the date includes time.
-        if 'T' in s:
-            return datetime.datetime.fromisoformat(s)
-        else:
-            return datetime.date.fromisoformat(s)
-    else:
-        # Check if the date includes time.
-        if 'T' in s:
-            return isodate.parse_datetime(s)
-        else:
-            return isodate.parse_date(s)
-
-
-# Test if lists/tuples have contain matching items
-def _have_matching_items(
-    lst1: Union[bool, List, Tuple], lst2: Union[bool, List, Tuple]
-) -> bool:
-    if isinstance(lst1, bool):
-        return lst1
-
-    if isinstance(lst2, bool):
-        return lst2
-
-    s = set(lst1).intersection(lst2)
-    return len(s) > 0
-
-
-def _pythonize_objects(
-    scrapings: List[Dict[str, Any]], python_objects: Union[bool, List, Tuple]
-) -> List[Dict[str, Any]]:
-
-    if python_objects is False:
-        # this really should not be happening
-        return scrapings
-
-    # this should work, mypy gives error, this isn't bulletproof code
-    if python_objects is True or datetime.timedelta in python_objects:  # type: ignore
-        # convert ISO 8601 date times into timedelta
-        scrapings = _convert_properties_scrape(scrapings, DURATION_PROPERTIES,
-                                               isodate.parse_duration)
-
-    if python_objects is True or _have_matching_items((datetime.date, datetime.datetime), python_objects):
-        # convert ISO 8601 date times into datetimes.datetime objects
-        scrapings = _convert_properties_scrape(scrapings, DATETIME_PROPERTIES,
-                                               _parse_determine_date_datetime)
-
-    return scrapings
-
-
-def _convert_properties_scrape(
-    recipes: List[Dict[str, Any]],
-    properties: frozenset,
-    function: Callable[[str], Union[datetime.datetime, datetime.date]],
-) -> List[Dict[str, Any]]:
-    for i in range(len(recipes)):
-        key_set = set(recipes[i].keys())
-        for p in key_set.intersection(properties):
-            try:
-                recipes[i][p] = function(recipes[i][p])
-            except (isodate.ISO8601Error, ValueError, TypeError):
-                if recipes[i][p] is None:  # TypeError
-                    recipes[i].pop(p)
-                # otherwise, it's a parse error, just leave the value as is
-
-    return recipes
-
-
-def _migrate_old_schema(recipes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    """Migrate old schema.org/Recipe version to current schema version."""
-    for i in range(len(recipes)):
-        # rename 'ingredients' to 'recipeIngredient'
-        if 'ingredients' in recipes[i]:
-            recipes[i]['recipeIngredient'] = recipes[i].pop('ingredients')
-
-    return recipes
-
-
-def _unescape_content(recipe: Dict[str, Any]) -> Dict[str, Any]:
-    """Replace escape codes in HTML to the actual character from text content"""
-
-    new_rec: Dict[str, Any] = {}
-
-    def html_unescape_string(v: Any) -> Any:
-        if isinstance(v, str):
-            return html.unescape(v)
-        return v
-
-    # this loops through most of the content an runs the html.unescape function on values
-    for key, value in recipe.items():
-        if isinstance(value, str):
-            new_rec[key] = html.unescape(value)
-        elif isinstance(value, dict):
-            new_rec[key] = {k: html_unescape_string(v) for k, v in value.items() if v}
-        elif isinstance(value, list):
-
-            # value is empty, skip the key
-            if value == [] or value is None or value == "":
-                pass
-            # a list of dictionaries
-            elif len(value) > 0 and isinstance(value[0], dict):
-                new_rec[key] = [
-                    {k: html.unescape(v) for k, v in d_row.items() if v}
-                    for d_row in value
-                ]
-
-            elif len(value) > 0 and isinstance(value[0], str):
-                new_rec[key] = [html.unescape(item) for item in value]
-            else:
-                raise TypeError(f"on value {value}")
-        
-    return new_rec
+#
+# Copyright 2019-2023 Micah Cochran
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# internal libraries
+import codecs
+from collections.abc import Mapping
+from dataclasses import dataclass
+import datetime
+import html
+import mmap
+from pathlib import Path
+import re
+import time
+# for mypy
+from typing import Any, Callable, cast, Dict, IO, Iterator, List, Optional, Tuple, Union
+
+# The external libraries, extruct, lxml, isodate and requests, are imported
+# when they are first needed, they take most of the time of importing this
+# package.
+
+from .cache import _options_key, HTTPCache, ResultCache
+from .encoding import decode_html, META_SNIFF_BYTES, sniff_encoding
+from .iso8601 import parse_date, parse_duration
+from .jsonld import json_loader, JsonLoads, loads_json_ld
+from .objects import to_objects
+from .parsers import html_parser_backend
+from .stats import _record, _start_call, CallStats
+
+
+_PACKAGE_PATH = Path(__file__).resolve().parent
+
+# read version from VERSION file
+__version__ = (_PACKAGE_PATH / 'VERSION').read_text().strip()
+
+
+# the types of binary HTML that loads_bytes() accepts
+BytesLike = Union[bytes, bytearray, memoryview, mmap.mmap]
+_BYTES_TYPES = (bytes, bytearray, memoryview, mmap.mmap)
+
+# The extruct syntaxes that are able to contain schema.org/Recipe data.  These
+# are the only ones read by _convert_to_scrapings().
+RECIPE_SYNTAXES = ('json-ld', 'microdata')
+
+# Cheap markers used to determine which syntaxes are worth extracting.  They
+# are case-insensitive, but a pattern with re.IGNORECASE is tried at every
+# position of the page, which is slow on large pages.  So each marker is two
+# patterns, its end, which starts with a literal character that the re module
+# searches for quickly, and its start, which is matched just before the end.
+_JSON_LD_MARKER = (re.compile(r'\+[Jj][Ss][Oo][Nn]'),
+                   re.compile(r'application/ld\Z', re.IGNORECASE))
+_MICRODATA_RECIPE_MARKER = (
+    re.compile(r'://[Ss][Cc][Hh][Ee][Mm][Aa]\.[Oo][Rr][Gg]/[Rr][Ee][Cc][Ii][Pp][Ee]'),
+    re.compile(r'itemtype\s*=\s*["\']?\s*https?\Z', re.IGNORECASE))
+# how far before its end the start of a marker is matched (which limits the
+# whitespace around the '=' of an itemtype)
+_MARKER_LOOKBEHIND = 256
+
+# Tokenizes the <script> elements of a document without building a DOM.
+# Comments are matched as well so that commented out scripts are skipped.
+# (the tag names are spelled out rather than using re.IGNORECASE, this keeps
+# the literal '<' prefix, which the re module can search for quickly)
+# (a '>' in a quoted attribute value doesn't end the tag)
+_SCRIPT_OR_COMMENT_START = re.compile(
+    r'<(?:!--|[Ss][Cc][Rr][Ii][Pp][Tt]\b((?:[^>"\']|"[^"]*"|\'[^\']*\')*)>)')
+_SCRIPT_END = re.compile(r'</[Ss][Cc][Rr][Ii][Pp][Tt]\s*>')
+# an attribute of a tag, its name and its value, quoted or not
+_ATTRIBUTE = re.compile(r'([^\s/>=]+)(?:\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+)))?')
+_COMMENT_END = re.compile('-->')
+
+
+def _bytes_pattern(pattern: 're.Pattern[str]') -> 're.Pattern[bytes]':
+    return re.compile(pattern.pattern.encode(), pattern.flags & re.IGNORECASE)
+
+
+# the same, for binary HTML and for scanning bytes as they are downloaded
+_JSON_LD_MARKER_BYTES = tuple(_bytes_pattern(p) for p in _JSON_LD_MARKER)
+_MICRODATA_RECIPE_MARKER_BYTES = tuple(_bytes_pattern(p) for p in _MICRODATA_RECIPE_MARKER)
+_SCRIPT_OR_COMMENT_START_BYTES = _bytes_pattern(_SCRIPT_OR_COMMENT_START)
+_SCRIPT_END_BYTES = _bytes_pattern(_SCRIPT_END)
+_COMMENT_END_BYTES = _bytes_pattern(_COMMENT_END)
+
+
+@dataclass
+class SSRTypeError(TypeError):
+    """Custom error that is raised when the input given is not of the correct type."""
+    var_name: str
+    object_type: type
+    expected_types: str
+    
+    def __str__(self):
+        s = f'{self.var_name} is of type "{self.object_type.__name__}", when expecting one of the following type(s): {self.expected_types}'
+
+        return s
+
+
+def scrape(
+    location: Union[str, IO[str], IO[bytes], BytesLike],
+    python_objects: Union[bool, str, List, Tuple] = False,
+    nonstandard_attrs: bool = False,
+    migrate_old_schema: bool = True,
+    user_agent_str: Optional[str] = None,
+    syntaxes: Optional[List[str]] = None,
+    result_cache: Optional[ResultCache] = None,
+    as_objects: bool = False,
+    json_backend: Optional[str] = None,
+    html_parser: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Parse data in https://schema.org/Recipe format into a list of dictionaries
+    representing the recipe data.
+
+    Parameters
+    ----------
+    location : string, file-like object, or bytes-like object
+        A url, filename, or text_string of HTML, a file-like object, or
+        binary HTML (bytes, bytearray, memoryview or mmap.mmap, see
+        loads_bytes()).
+
+    python_objects : bool, list, tuple  (optional)
+        when True it translates certain data types into python objects
+          dates into datetime.date, datetimes into datetime.datetimes,
+          durations as dateime.timedelta.
+        when set to a list or tuple only converts types specified to
+          python objects:
+          when set to either [dateime.date] or [datetime.datetimes] either will
+            convert dates.
+          when set to [datetime.timedelta] durations will be converted
+        when 'lazy' the recipes are LazyRecipe mappings, which convert dates
+          and durations the same as True, when they are first read.
+        when False no conversion is performed
+        (defaults to False)
+
+    nonstandard_attrs : bool, optional
+        when True it adds nonstandard (for schema.org/Recipe) attributes to the
+        resulting dictionaries, that are outside the specification such as:
+            '_format' is either 'json-ld' or 'microdata' (how schema.org/Recipe was encoded into HTML)
+            '_source_url' is the source url, when 'url' has already been defined as another value
+        (defaults to False)
+
+    migrate_old_schema : bool, optional
+        when True it migrates the schema from older version to current version
+        (defaults to True)
+
+    user_agent_str : string, optional
+        overide the user_agent_string with this value.
+        (defaults to None)
+
+    syntaxes : list, optional
+        the syntaxes to extract, any of 'json-ld' and 'microdata'.
+        when None the HTML is checked for signs of schema.org/Recipe data and
+        only the syntaxes that could contain a recipe are extracted.
+        (defaults to None)
+
+    result_cache : ResultCache, optional
+        a cache of results keyed by a hash of the HTML and these options, such
+        as MemoryResultCache or SQLiteResultCache.  Pages seen before are not
+        extracted again.
+        (defaults to None)
+
+    as_objects : bool, optional
+        when True the recipes are Recipe objects instead of dictionaries,
+        which use less memory, see Recipe.  Nested HowToStep and
+        NutritionInformation dictionaries are converted as well.
+        (defaults to False)
+
+    json_backend : string, optional
+        the library that decodes the JSON of JSON-LD blocks, one of 'orjson',
+        'simdjson' or 'json'.  When None the fastest one that is installed is
+        used.  JSON that it can't decode is cleaned up (trailing commas,
+        comments, control characters) and decoded with the json module.
+        (defaults to None)
+
+    html_parser : string, optional
+        the parser of HTML that has to be parsed, one of 'extruct', 'lxml'
+        or 'selectolax' (which has to be installed).  'lxml' and 'selectolax'
+        extract only the microdata recipes, without extruct, which is faster.
+        'lxml' gives the same recipes as 'extruct', 'selectolax' parses broken
+        HTML as browsers do, which can differ.  When None 'extruct' is used.
+        (defaults to None)
+
+    Returns
+    -------
+    list
+        a list of dictionaries in the style of schema.org/Recipe JSON-LD
+        no results - an empty list will be returned
+    """
+
+    # make sure that one and only are defined
+    url = None
+    if isinstance(location, str):
+        # Is this a url?
+        if location.startswith(("http://", "https://")):
+            return scrape_url(location, python_objects=python_objects,
+                              nonstandard_attrs=nonstandard_attrs,
+                              migrate_old_schema=migrate_old_schema,
+                              user_agent_str=user_agent_str,
+                              syntaxes=syntaxes,
+                              result_cache=result_cache,
+                              as_objects=as_objects,
+                              json_backend=json_backend,
+                              html_parser=html_parser)
+
+        # Is this is is a very long string? Perhaps it has HTML content.
+        elif len(location) > 255:
+            html = location  # type: Union[str, BytesLike]
+
+        # Maybe it is a filename?
+        else:
+            with open(location, 'rb') as f:
+                html = f.read()
+    elif isinstance(location, _BYTES_TYPES):
+        html = location
+    elif hasattr(location, 'read'):
+        # Assume this is some kind of file-like object that can be read.
+        html = location.read()
+    else:
+        raise SSRTypeError(var_name="location", 
+                           object_type=type(location), 
+                           expected_types = "string for a url, filename, or text_string of the HTML, a file-like object, or bytes")
+
+    return _scrape_html(html, python_objects, nonstandard_attrs,
+                        migrate_old_schema, syntaxes, url=url,
+                        result_cache=result_cache, as_objects=as_objects,
+                        json_backend=json_backend, html_parser=html_parser)
+
+
+def load(
+    fp: Union[str, IO[str], IO[bytes], Path, mmap.mmap, None],
+    python_objects: Union[bool, str, List, Tuple] = False,
+    nonstandard_attrs: bool = False,
+    migrate_old_schema: bool = True,
+    syntaxes: Optional[List[str]] = None,
+    tree: Optional[Any] = None,
+    result_cache: Optional[ResultCache] = None,
+    as_objects: bool = False,
+    json_backend: Optional[str] = None,
+    html_parser: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """load a filename or file object to scrape
+
+    Parameters
+    ----------
+    fp : string, file-like object, or mmap.mmap
+        A file name, a file-like object opened in text or binary mode, or a
+        memory-mapped file.  Files are read in binary mode and the encoding
+        is determined from the HTML, see loads_bytes().
+
+    python_objects : bool, list, tuple  (optional)
+        when True it translates certain data types into python objects
+          dates into datetime.date, datetimes into datetime.datetimes,
+          durations as dateime.timedelta.
+        when set to a list or tuple only converts types specified to
+          python objects:
+          when set to either [dateime.date] or [datetime.datetimes] either will
+            convert dates.
+          when set to [datetime.timedelta] durations will be converted
+        when 'lazy' the recipes are LazyRecipe mappings, which convert dates
+          and durations the same as True, when they are first read.
+        when False no conversion is performed
+        (defaults to False)
+
+    nonstandard_attrs : bool, optional
+        when True it adds nonstandard (for schema.org/Recipe) attributes to the
+        resulting dictionaries, that are outside the specification such as:
+            '_format' is either 'json-ld' or 'microdata' (how schema.org/Recipe was encoded into HTML)
+            '_source_url' is the source url, when 'url' has already been defined as another value
+        (defaults to False)
+
+    migrate_old_schema : bool, optional
+        when True it migrates the schema from older version to current version
+        (defaults to True)
+
+    syntaxes : list, optional
+        the syntaxes to extract, any of 'json-ld' and 'microdata'.
+        when None the HTML is checked for signs of schema.org/Recipe data and
+        only the syntaxes that could contain a recipe are extracted.
+        (defaults to None)
+
+    tree : lxml.html.HtmlElement, optional
+        an already parsed lxml tree of the HTML, which is used instead of
+        parsing the HTML again.  When given, fp is not read and may be None.
+        (defaults to None)
+
+    result_cache : ResultCache, optional
+        a cache of results keyed by a hash of the HTML and these options, such
+        as MemoryResultCache or SQLiteResultCache.  Pages seen before are not
+        extracted again.
+        (defaults to None)
+
+    as_objects : bool, optional
+        when True the recipes are Recipe objects instead of dictionaries,
+        which use less memory, see Recipe.  Nested HowToStep and
+        NutritionInformation dictionaries are converted as well.
+        (defaults to False)
+
+    json_backend : string, optional
+        the library that decodes the JSON of JSON-LD blocks, one of 'orjson',
+        'simdjson' or 'json'.  When None the fastest one that is installed is
+        used.  JSON that it can't decode is cleaned up (trailing commas,
+        comments, control characters) and decoded with the json module.
+        (defaults to None)
+
+    html_parser : string, optional
+        the parser of HTML that has to be parsed, one of 'extruct', 'lxml'
+        or 'selectolax' (which has to be installed).  'lxml' and 'selectolax'
+        extract only the microdata recipes, without extruct, which is faster.
+        'lxml' gives the same recipes as 'extruct', 'selectolax' parses broken
+        HTML as browsers do, which can differ.  When None 'extruct' is used.
+        (defaults to None)
+
+    Returns
+    -------
+    list
+        a list of dictionaries in the style of schema.org/Recipe JSON-LD
+        no results - an empty list will be returned
+
+    """
+
+    html = None  # type: Union[str, BytesLike, None]
+    if tree is not None:
+        # the HTML has already been parsed, there is no need to read it
+        pass
+    elif isinstance(fp, str):
+        with open(fp, 'rb') as f:
+            html = f.read()
+    elif isinstance(fp, Path):
+        html = fp.read_bytes()
+    elif isinstance(fp, mmap.mmap):
+        # parsed from the memory map, without reading it
+        html = fp
+    elif fp is not None and hasattr(fp, 'read'):
+        # Assume this is some kind of file-like object that can be read.
+        html = fp.read()
+    else:
+        raise SSRTypeError(var_name="fp", 
+                           object_type=type(fp), 
+                           expected_types="a filename, pathlib.Path object, or a file-like object")
+
+    return _scrape_html(html, python_objects, nonstandard_attrs,
+                        migrate_old_schema, syntaxes, tree=tree,
+                        result_cache=result_cache, as_objects=as_objects,
+                        json_backend=json_backend, html_parser=html_parser)
+
+
+def loads(
+    string: Optional[str],
+    python_objects: Union[bool, str, List, Tuple] = False,
+    nonstandard_attrs: bool = False,
+    migrate_old_schema: bool = True,
+    syntaxes: Optional[List[str]] = None,
+    tree: Optional[Any] = None,
+    result_cache: Optional[ResultCache] = None,
+    as_objects: bool = False,
+    json_backend: Optional[str] = None,
+    html_parser: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """scrapes a string
+
+    Parameters
+    ----------
+    string : string
+        A text string of HTML.
+
+    python_objects : bool, list, tuple  (optional)
+        when True it translates certain data types into python objects
+          dates into datetime.date, datetimes into datetime.datetimes,
+          durations as dateime.timedelta.
+        when set to a list or tuple only converts types specified to
+          python objects:
+          when set to either [dateime.date] or [datetime.datetimes] either will
+            convert dates.
+          when set to [datetime.timedelta] durations will be converted
+        when 'lazy' the recipes are LazyRecipe mappings, which convert dates
+          and durations the same as True, when they are first read.
+        when False no conversion is performed
+        (defaults to False)
+
+    nonstandard_attrs : bool, optional
+        when True it adds nonstandard (for schema.org/Recipe) attributes to the
+        resulting dictionaries, that are outside the specification such as:
+            '_format' is either 'json-ld' or 'microdata' (how schema.org/Recipe was encoded into HTML)
+            '_source_url' is the source url, when 'url' has already been defined as another value
+        (defaults to False)
+
+    migrate_old_schema : bool, optional
+        when True it migrates the schema from older version to current version
+        (defaults to True)
+
+    syntaxes : list, optional
+        the syntaxes to extract, any of 'json-ld' and 'microdata'.
+        when None the HTML is checked for signs of schema.org/Recipe data and
+        only the syntaxes that could contain a recipe are extracted.
+        (defaults to None)
+
+    tree : lxml.html.HtmlElement, optional
+        an already parsed lxml tree of the HTML, which is used instead of
+        parsing the HTML again.  When given, string is not used and may be None.
+        (defaults to None)
+
+    result_cache : ResultCache, optional
+        a cache of results keyed by a hash of the HTML and these options, such
+        as MemoryResultCache or SQLiteResultCache.  Pages seen before are not
+        extracted again.
+        (defaults to None)
+
+    as_objects : bool, optional
+        when True the recipes are Recipe objects instead of dictionaries,
+        which use less memory, see Recipe.  Nested HowToStep and
+        NutritionInformation dictionaries are converted as well.
+        (defaults to False)
+
+    json_backend : string, optional
+        the library that decodes the JSON of JSON-LD blocks, one of 'orjson',
+        'simdjson' or 'json'.  When None the fastest one that is installed is
+        used.  JSON that it can't decode is cleaned up (trailing commas,
+        comments, control characters) and decoded with the json module.
+        (defaults to None)
+
+    html_parser : string, optional
+        the parser of HTML that has to be parsed, one of 'extruct', 'lxml'
+        or 'selectolax' (which has to be installed).  'lxml' and 'selectolax'
+        extract only the microdata recipes, without extruct, which is faster.
+        'lxml' gives the same recipes as 'extruct', 'selectolax' parses broken
+        HTML as browsers do, which can differ.  When None 'extruct' is used.
+        (defaults to None)
+
+    Returns
+    -------
+    list
+        a list of dictionaries in the style of schema.org/Recipe JSON-LD
+        no results - an empty list will be returned
+
+    """
+
+    if tree is not None:
+        # the HTML has already been parsed, the string is not needed
+        string = None
+    elif not isinstance(string, str):
+        raise SSRTypeError(var_name="string", object_type=type(string), expected_types="string")
+
+    return _scrape_html(string, python_objects, nonstandard_attrs,
+                        migrate_old_schema, syntaxes, tree=tree,
+                        result_cache=result_cache, as_objects=as_objects,
+                        json_backend=json_backend, html_parser=html_parser)
+
+
+def loads_bytes(
+    data: BytesLike,
+    python_objects: Union[bool, str, List, Tuple] = False,
+    nonstandard_attrs: bool = False,
+    migrate_old_schema: bool = True,
+    syntaxes: Optional[List[str]] = None,
+    result_cache: Optional[ResultCache] = None,
+    encoding: Optional[str] = None,
+    as_objects: bool = False,
+    json_backend: Optional[str] = None,
+    html_parser: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """scrapes binary HTML
+
+    The HTML is given to the parser as bytes, without decoding it to a str,
+    which saves a copy of the page.  A bytearray, memoryview or mmap.mmap is
+    read by the parser a chunk at a time, so it is never copied as a whole.
+
+    Parameters
+    ----------
+    data : bytes, bytearray, memoryview or mmap.mmap
+        The HTML.
+
+    python_objects, nonstandard_attrs, migrate_old_schema, syntaxes, result_cache
+        see loads()
+
+    encoding : string, optional
+        the encoding of the HTML.  When None it is determined from the byte
+        order mark or a <meta> charset, otherwise UTF-8 is tried and then the
+        encoding is detected.
+        (defaults to None)
+
+    as_objects, json_backend, html_parser
+        see loads()
+
+    Returns
+    -------
+    list
+        a list of dictionaries in the style of schema.org/Recipe JSON-LD
+        no results - an empty list will be returned
+
+    """
+
+    if not isinstance(data, _BYTES_TYPES):
+        raise SSRTypeError(var_name="data", object_type=type(data),
+                           expected_types="bytes, bytearray, memoryview, or mmap.mmap")
+
+    return _scrape_html(data, python_objects, nonstandard_attrs,
+                        migrate_old_schema, syntaxes, result_cache=result_cache,
+                        encoding=encoding, as_objects=as_objects,
+                        json_backend=json_backend, html_parser=html_parser)
+
+
+def scrape_url(
+    url: str,
+    python_objects: Union[bool, str, List, Tuple] = False,
+    nonstandard_attrs: bool = False,
+    migrate_old_schema: bool = True,
+    user_agent_str: Optional[str] = None,
+    syntaxes: Optional[List[str]] = None,
+    cache: Optional[HTTPCache] = None,
+    result_cache: Optional[ResultCache] = None,
+    stream: bool = False,
+    max_bytes: Optional[int] = None,
+    as_objects: bool = False,
+    json_backend: Optional[str] = None,
+    html_parser: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """scrape from a URL
+
+    Parameters
+    ----------
+    url : string
+        A url to download data from and scrape.
+
+    python_objects : bool, list, tuple  (optional)
+        when True it translates certain data types into python objects
+          dates into datetime.date, datetimes into datetime.datetimes,
+          durations as dateime.timedelta.
+        when set to a list or tuple only converts types specified to
+          python objects:
+          when set to either [dateime.date] or [datetime.datetimes] either will
+            convert dates.
+          when set to [datetime.timedelta] durations will be converted
+        when 'lazy' the recipes are LazyRecipe mappings, which convert dates
+          and durations the same as True, when they are first read.
+        when False no conversion is performed
+        (defaults to False)
+
+    nonstandard_attrs : bool, optional
+        when True it adds nonstandard (for schema.org/Recipe) attributes to the
+        resulting dictionaries, that are outside the specification such as:
+            '_format' is either 'json-ld' or 'microdata' (how schema.org/Recipe was encoded into HTML)
+            '_source_url' is the source url, when 'url' has already been defined as another value
+        (defaults to False)
+
+    migrate_old_schema : bool, optional
+        when True it migrates the schema from older version to current version
+        (defaults to True)
+
+    user_agent_str : string, optional
+        overide the user_agent_string with this value.
+        (defaults to None)
+
+    syntaxes : list, optional
+        the syntaxes to extract, any of 'json-ld' and 'microdata'.
+        when None the HTML is checked for signs of schema.org/Recipe data and
+        only the syntaxes that could contain a recipe are extracted.
+        (defaults to None)
+
+    cache : HTTPCache, optional
+        cache the response on disk and make a conditional request when the
+        url is in the cache, see HTTPCache.
+        (defaults to None)
+
+    result_cache : ResultCache, optional
+        a cache of results keyed by a hash of the HTML and these options, such
+        as MemoryResultCache or SQLiteResultCache.  Pages seen before are not
+        extracted again.
+        (defaults to None)
+
+    as_objects : bool, optional
+        when True the recipes are Recipe objects instead of dictionaries,
+        which use less memory, see Recipe.  Nested HowToStep and
+        NutritionInformation dictionaries are converted as well.
+        (defaults to False)
+
+    stream : bool, optional
+        when True the page is read in chunks, and the download stops as soon
+        as a complete JSON-LD block with a recipe has been read.  Recipes in
+        JSON-LD blocks or microdata further down the page are not found.
+        Not used when syntaxes includes 'microdata'.
+        (defaults to False)
+
+    max_bytes : int, optional
+        the most bytes of the page to download, the rest of a larger page is
+        not read and the recipes are scraped from the part that was.
+        (defaults to None, no limit)
+
+    json_backend : string, optional
+        the library that decodes the JSON of JSON-LD blocks, one of 'orjson',
+        'simdjson' or 'json'.  When None the fastest one that is installed is
+        used.  JSON that it can't decode is cleaned up (trailing commas,
+        comments, control characters) and decoded with the json module.
+        (defaults to None)
+
+    html_parser : string, optional
+        the parser of HTML that has to be parsed, one of 'extruct', 'lxml'
+        or 'selectolax' (which has to be installed).  'lxml' and 'selectolax'
+        extract only the microdata recipes, without extruct, which is faster.
+        'lxml' gives the same recipes as 'extruct', 'selectolax' parses broken
+        HTML as browsers do, which can differ.  When None 'extruct' is used.
+        (defaults to None)
+
+    Returns
+    -------
+    list
+        a list of dictionaries in the style of schema.org/Recipe JSON-LD
+        no results - an empty list will be returned
+
+
+    """
+
+    if not isinstance(url, str):
+        raise SSRTypeError(var_name="url", object_type=type(url), expected_types="string")
+
+    # imported here because the client module imports this module
+    from .client import ScrapeClient
+
+    with ScrapeClient(user_agent_str, timeout=5, retries=0, cache=cache,
+                      result_cache=result_cache, json_backend=json_backend,
+                      html_parser=html_parser) as client:
+        return client.scrape_url(url, python_objects, nonstandard_attrs,
+                                 migrate_old_schema, syntaxes,
+                                 stream=stream, max_bytes=max_bytes,
+                                 as_objects=as_objects)
+
+
+def _plan_syntaxes(html: Union[str, BytesLike]) -> List[str]:
+    """Determine which syntaxes could hold schema.org/Recipe data by cheaply
+    sniffing the HTML for JSON-LD script tags and Recipe microdata itemtypes.
+    """
+    if isinstance(html, str):
+        markers = (_JSON_LD_MARKER, _MICRODATA_RECIPE_MARKER)
+    else:
+        markers = (_JSON_LD_MARKER_BYTES, _MICRODATA_RECIPE_MARKER_BYTES)  # type: ignore
+    json_ld_marker, microdata_marker = cast(Tuple[Any, ...], markers)
+
+    syntaxes = []
+    if _search_marker(html, json_ld_marker):
+        syntaxes.append('json-ld')
+    if _search_marker(html, microdata_marker):
+        syntaxes.append('microdata')
+    return syntaxes
+
+
+def _search_marker(html: Union[str, BytesLike], marker: Tuple[Any, Any]) -> bool:
+    """Is the marker, the patterns of its end and its start, in the HTML?"""
+    end_re, start_re = marker
+    for m in end_re.finditer(html):
+        end = m.start()
+        if start_re.search(html, max(0, end - _MARKER_LOOKBEHIND), end):
+            return True
+    return False
+
+
+def _is_json_ld_script(attrs: Union[str, bytes]) -> bool:
+    """Are the attributes of a <script> tag those of a JSON-LD block?  The
+    type is compared exactly as the HTML parsers' XPath does, only the name
+    of the attribute is case-insensitive."""
+    if isinstance(attrs, bytes):
+        # (the type is ASCII, so this works for any ASCII compatible encoding)
+        attrs = attrs.decode('latin-1')
+    if 'ld+json' not in attrs and '&' not in attrs:
+        return False
+    for m in _ATTRIBUTE.finditer(attrs):
+        if m.group(1).lower() == 'type':
+            # the first of repeated attributes is the one that is kept
+            value = next((v for v in m.group(2, 3, 4) if v is not None), '')
+            return html.unescape(value) == 'application/ld+json'
+    return False
+
+
+def _iter_json_ld_scripts(html: Union[str, BytesLike]) -> Iterator[Union[str, bytes]]:
+    """Yields the text of each JSON-LD <script> element in the HTML, which is
+    bytes when the HTML is binary."""
+    if isinstance(html, str):
+        patterns = (_SCRIPT_OR_COMMENT_START, _SCRIPT_END, _COMMENT_END)
+    else:
+        patterns = (_SCRIPT_OR_COMMENT_START_BYTES, _SCRIPT_END_BYTES, _COMMENT_END_BYTES)  # type: ignore
+    # (Any as mypy can't tell that the patterns match the type of html)
+    start_re, end_re, comment_end_re = cast(Tuple[Any, ...], patterns)
+
+    pos = 0
+    while True:
+        m = start_re.search(html, pos)
+        if m is None:
+            return
+
+        attrs = m.group(1)
+        if attrs is None:
+            # skip over the comment
+            comment_end = comment_end_re.search(html, m.end())
+            if comment_end is None:
+                return
+            pos = comment_end.end()
+            continue
+
+        end = end_re.search(html, m.end())
+        if end is None:
+            return
+        if _is_json_ld_script(attrs if isinstance(attrs, (str, bytes)) else bytes(attrs)):
+            script = html[m.end():end.start()]
+            # slices of a memoryview are memoryviews
+            yield script if isinstance(script, (str, bytes)) else bytes(script)
+        pos = end.end()
+
+
+def _fast_json_ld(
+    html: Union[str, BytesLike], encoding: Optional[str] = None, loads: Optional[JsonLoads] = None
+) -> Optional[List[Dict]]:
+    """Parse the JSON-LD blocks directly from the HTML text, without building
+    a DOM for the document.  encoding is the encoding of binary HTML, the
+    JSON backends read UTF-8 themselves.  loads is from json_loader().
+
+    Returns the items in the same form as extruct's JSON-LD extractor, or None
+    when a block could not be decoded, so that the HTML is parsed and
+    extruct (which is more lenient with broken JSON) can be used instead.
+    """
+    if loads is None:
+        loads = json_loader()
+    decode = encoding is not None and encoding != 'utf-8'
+    items: List[Dict] = []
+    for script in _iter_json_ld_scripts(html):
+        try:
+            if decode:
+                script = script.decode(encoding)  # type: ignore
+            data = loads_json_ld(script, loads)
+        except ValueError:
+            return None
+
+        if isinstance(data, list):
+            items.extend(item for item in data if item)
+        elif isinstance(data, dict) and data:
+            items.append(data)
+
+    return items
+
+
+class _JsonLdRecipeScanner:
+    """Scans HTML as it is downloaded to find when a complete JSON-LD block
+    that holds a recipe has been read.
+
+    scan() is called with the body each time it has grown, scanning resumes
+    where it left off, so each byte is only scanned about once.
+    """
+
+    def __init__(self) -> None:
+        self._pos = 0
+        # the comment or script that has been opened but not closed,
+        # (is a JSON-LD script, or None for a comment, where its content starts)
+        self._open: Optional[Tuple[Optional[bool], int]] = None
+
+    def scan(self, body: bytearray) -> bool:
+        """Returns True once a JSON-LD block with a recipe is in the body."""
+        while True:
+            if self._open is None:
+                m = _SCRIPT_OR_COMMENT_START_BYTES.search(body, self._pos)
+                if m is None:
+                    # a tag may be split between chunks, resume at its start
+                    i = body.rfind(b'<', self._pos)
+                    self._pos = len(body) if i == -1 else i
+                    return False
+                attrs = m.group(1)
+                is_json_ld = None if attrs is None else _is_json_ld_script(bytes(attrs))
+                self._open = (is_json_ld, m.end())
+                self._pos = m.end()
+
+            is_json_ld, start = self._open
+            if is_json_ld is None:
+                end = body.find(b'-->', self._pos)
+                if end == -1:
+                    self._pos = max(start, len(body) - 2)
+                    return False
+                self._pos = end + 3
+            else:
+                m = _SCRIPT_END_BYTES.search(body, self._pos)
+                if m is None:
+                    i = body.rfind(b'<', start)
+                    self._pos = len(body) if i == -1 else i
+                    return False
+                self._pos = m.end()
+                if is_json_ld and _has_recipe(bytes(body[start:m.start()])):
+                    return True
+            self._open = None
+
+
+def _has_recipe(script: bytes) -> bool:
+    """Does the text of a JSON-LD script hold a recipe?"""
+    try:
+        data = loads_json_ld(script, json_loader())
+    except ValueError:
+        return False
+    if not isinstance(data, list):
+        data = [data]
+    try:
+        return bool(_convert_to_scrapings({'json-ld': [d for d in data if isinstance(d, dict)]}))
+    except (AttributeError, KeyError, TypeError):
+        return False
+
+
+def _extract(
+    html: Union[str, BytesLike, None],
+    base_url: Optional[str] = None,
+    syntaxes: Optional[List[str]] = None,
+    tree: Optional[Any] = None,
+    encoding: Optional[str] = None,
+    call: Optional[CallStats] = None,
+    json_backend: Optional[str] = None,
+    html_parser: Optional[str] = None,
+) -> Dict[str, List[Dict]]:
+    """Run the extractors of html_parser on the HTML, only running the
+    syntaxes that are needed.  The HTML is parsed once and the tree is shared
+    by the extractors, tree can be given when the HTML has already been
+    parsed by lxml.  Binary HTML must be in encoding, see _prepare_bytes().
+    The times are recorded in call, when given.  The JSON-LD is decoded with
+    json_backend."""
+    loads = json_loader(json_backend)
+    parser = html_parser_backend(html_parser)
+    if syntaxes is None:
+        if tree is not None or html is None:
+            syntaxes = list(RECIPE_SYNTAXES)
+        else:
+            syntaxes = _plan_syntaxes(html)
+    elif not set(syntaxes).issubset(RECIPE_SYNTAXES):
+        raise ValueError(f'syntaxes must be a list with any of these values: {RECIPE_SYNTAXES}')
+
+    # When JSON-LD is the only syntax that could contain a recipe, or the
+    # only one asked for, the script blocks are parsed directly, skipping the
+    # HTML parser.
+    if list(syntaxes) == ['json-ld'] and tree is None and html is not None:
+        start = time.perf_counter()
+        json_ld = _fast_json_ld(html, encoding, loads)
+        if json_ld is not None:
+            if call is not None:
+                call.extract_seconds['json-ld'] = time.perf_counter() - start
+            return {'json-ld': json_ld}
+
+    if not syntaxes:
+        # nothing that could be a recipe, skip parsing the HTML
+        return {}
+
+    start = time.perf_counter()
+    if tree is None:
+        tree = parser.parse(html, encoding)  # type: ignore
+        if call is not None:
+            call.extract_seconds['parse'] = time.perf_counter() - start
+    elif not parser.reads_lxml_tree:
+        raise ValueError(f'tree is parsed by lxml, it can not be used with html_parser={html_parser!r}')
+
+    data = {}  # type: Dict[str, List[Dict]]
+    if 'json-ld' in syntaxes:
+        start = time.perf_counter()
+        data['json-ld'] = parser.json_ld(tree, loads)
+        if call is not None:
+            call.extract_seconds['json-ld'] = time.perf_counter() - start
+    if 'microdata' in syntaxes:
+        start = time.perf_counter()
+        data['microdata'] = parser.microdata(tree, base_url)
+        if call is not None:
+            call.extract_seconds['microdata'] = time.perf_counter() - start
+
+    return data
+
+
+def _prepare_bytes(
+    html: BytesLike, encoding: Optional[str] = None
+) -> Tuple[Union[str, BytesLike], Optional[str]]:
+    """Determine the encoding of binary HTML, returns the HTML and its encoding.
+
+    Binary HTML is parsed as is when its encoding is declared (or given) and
+    is compatible with ASCII, otherwise it is decoded to a str with
+    decode_html(), and the encoding returned is None.
+    """
+    if encoding is None:
+        encoding = sniff_encoding(bytes(html[:META_SNIFF_BYTES]))
+    if encoding is not None:
+        try:
+            encoding = codecs.lookup(encoding).name
+        except LookupError:
+            encoding = None
+    if encoding == 'utf-8-sig':
+        # libxml2 skips the byte order mark itself
+        encoding = 'utf-8'
+
+    if encoding is None or '<>'.encode(encoding) != b'<>':
+        # undeclared, or an encoding such as UTF-16 that the markers can't be found in
+        return decode_html(bytes(html), encoding and f'charset={encoding}')[0], None
+    return html, encoding
+
+
+def _scrape_html(
+    html: Union[str, BytesLike, None],
+    python_objects: Union[bool, str, List, Tuple] = False,
+    nonstandard_attrs: bool = False,
+    migrate_old_schema: bool = True,
+    syntaxes: Optional[List[str]] = None,
+    url: Optional[str] = None,
+    tree: Optional[Any] = None,
+    result_cache: Optional[ResultCache] = None,
+    encoding: Optional[str] = None,
+    as_objects: bool = False,
+    json_backend: Optional[str] = None,
+    html_parser: Optional[str] = None,
+    call: Optional[CallStats] = None,
+) -> List[Dict[str, Any]]:
+    """Extract the recipes from the HTML and post-process them, this is the
+    common code for the public functions.  The HTML is either a str, or binary
+    in encoding (which is sniffed from the HTML when None).
+
+    call is given by callers that record the call themselves (to add the
+    fetch), otherwise the call is recorded here when a Stats is active."""
+    if call is None:
+        call = _start_call(url)
+        if call is not None:
+            return _record(call, _scrape_html, html, python_objects, nonstandard_attrs,
+                           migrate_old_schema, syntaxes, url, tree, result_cache,
+                           encoding, as_objects, json_backend, html_parser, call)
+
+    key = None
+    if result_cache is not None and html is not None:
+        options_key = _options_key(python_objects, nonstandard_attrs,
+                                   migrate_old_schema, syntaxes, json_backend, html_parser)
+        if encoding is not None:
+            options_key += f' encoding={encoding}'
+        key = result_cache.make_key(html, options_key, url)
+        cached = result_cache.get(key)
+        if cached is not None:
+            if call is not None:
+                call.cached = True
+                call.recipes = len(cached)
+            return to_objects(cached) if as_objects else cached  # type: ignore
+
+    if html is not None and not isinstance(html, str):
+        html, encoding = _prepare_bytes(html, encoding)
+
+    data = _extract(html, url, syntaxes, tree, encoding, call, json_backend, html_parser)
+    start = time.perf_counter()
+    scrapings = _convert_to_scrapings(data, nonstandard_attrs, url=url)
+    scrapings = _normalize_recipes(scrapings, python_objects, migrate_old_schema)
+
+    if key is not None:
+        result_cache.set(key, scrapings)  # type: ignore
+
+    # converted after caching, the cache keeps dictionaries for either
+    if as_objects:
+        scrapings = to_objects(scrapings)  # type: ignore
+
+    if call is not None:
+        call.postprocess_seconds = time.perf_counter() - start
+        call.recipes = len(scrapings)
+    return scrapings
+
+
+def _convert_json_ld_recipe(
+    rec: Dict[str, Any], nonstandard_attrs: bool = False, url: Optional[str] = None
+) -> Dict[str, Any]:
+    """Helper function for _convert_to_scraping
+    for a json-ld record adding extra tags"""
+    # the extracted data is only used here, so it is changed in place, the
+    # recipe is copied by _normalize_recipes()
+    d = rec
+    if nonstandard_attrs is True:
+        d['_format'] = 'json-ld'
+    # store the url
+    if url:
+        if d.get('url') and d.get('url') != url and nonstandard_attrs is True:
+            d['_source_url'] = url
+        else:
+            d['url'] = url
+    return d
+
+
+def _convert_to_scrapings(
+    data: Dict[str, List[Dict]],
+    nonstandard_attrs: bool = False,
+    url: Optional[str] = None,
+) -> List[Dict]:
+    """detects schema.org/Recipe content in the dictionary and extracts the content"""
+    out = []
+    if data.get('json-ld'):
+        for rec in data['json-ld']:
+            # checks if '@type' is not None and 'Recipe' is contained in a list or 'Recipe' == 'Recipe' 
+            if rec.get("@type") and "Recipe" in rec.get("@type"):  # type: ignore
+                d = _convert_json_ld_recipe(rec, nonstandard_attrs, url)
+                out.append(d)
+
+            if rec.get('@context') == 'https://schema.org' and '@graph' in rec.keys():
+                # walk the graph
+                for subrec in rec['@graph']:
+                    if subrec['@type'] == 'Recipe':
+                        d = _convert_json_ld_recipe(subrec, nonstandard_attrs, url)
+                        out.append(d)
+
+    if data.get('microdata'):
+        for rec in data['microdata']:
+            if rec['type'] in ('http://schema.org/Recipe',
+                               'https://schema.org/Recipe'):
+                d = rec['properties']
+                if nonstandard_attrs is True:
+                    d['_format'] = 'microdata'
+                # add @context and @type for conversion to the JSON-LD
+                # style format
+                if rec['type'][:6] == 'https:':
+                    d['@context'] = 'https://schema.org'
+                else:
+                    d['@context'] = 'http://schema.org'
+                d['@type'] = 'Recipe'
+
+                # store the url
+                if url:
+                    if d.get('url') and nonstandard_attrs is True:
+                        d['_source_url'] = url
+                    else:
+                        d['url'] = url
+
+                for key in d.keys():
+                    if isinstance(d[key], dict) and 'type' in d[key]:
+                        type_ = d[key].pop('type')
+                        d[key]['@type'] = type_.split('/')[3]
+
+                out.append(d)
+
+    return out
+
+
+# properties that will be passed into datetime objects
+DATETIME_PROPERTIES = frozenset(['dateCreated', 'dateModified',
+                                 'datePublished', 'expires'])
+DURATION_PROPERTIES = frozenset(['cookTime', 'performTime', 'prepTime',
+                                 'totalTime', 'timeRequired'])
+
+
+# Test if lists/tuples have contain matching items
+def _have_matching_items(
+    lst1: Union[bool, str, List, Tuple], lst2: Union[bool, str, List, Tuple]
+) -> bool:
+    if isinstance(lst1, bool):
+        return lst1
+
+    if isinstance(lst2, bool):
+        return lst2
+
+    s = set(lst1).intersection(lst2)
+    return len(s) > 0
+
+
+class LazyRecipe(Mapping):
+    """A recipe that converts its dates and durations into python objects
+    when they are first read, these are returned by python_objects='lazy'.
+
+    It is a read-only mapping that is equal to the dictionary that
+    python_objects=True returns.  dict(recipe) converts all of the properties
+    into a dictionary, which is needed for json.dumps().
+    """
+
+    __slots__ = ('_data', '_pending')
+
+    def __init__(self, recipe: Dict[str, Any]):
+        self._data = recipe
+        # the properties that haven't been converted yet, and the function to convert them
+        self._pending: Dict[str, Callable[[str], Any]] = {}
+        for properties, function in ((DURATION_PROPERTIES, parse_duration),
+                                     (DATETIME_PROPERTIES, parse_date)):
+            for p in properties.intersection(recipe):
+                if recipe[p] is None:
+                    # same as _convert_properties_scrape()
+                    recipe.pop(p)
+                else:
+                    self._pending[p] = function
+
+    def __getitem__(self, key: str) -> Any:
+        value = self._data[key]
+        function = self._pending.get(key)
+        if function is not None:
+            try:
+                value = function(value)
+            except (ValueError, TypeError):
+                # it's a parse error, just leave the value as is
+                pass
+            self._data[key] = value
+            self._pending.pop(key, None)
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._data)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({dict(self)!r})'
+
+
+def _converters(python_objects: Union[bool, str, List, Tuple]) -> Dict[str, Callable[[str], Any]]:
+    """The functions that convert the properties into python objects for
+    python_objects, by property."""
+    if isinstance(python_objects, str):
+        if python_objects != 'lazy':
+            raise ValueError(f"python_objects must be True, False, 'lazy', a list or "
+                             f"a tuple, not {python_objects!r}")
+        # LazyRecipe converts them
+        return {}
+
+    converters: Dict[str, Callable[[str], Any]] = {}
+    if python_objects is False:
+        return converters
+
+    # this should work, mypy gives error, this isn't bulletproof code
+    if python_objects is True or datetime.timedelta in python_objects:  # type: ignore
+        # convert ISO 8601 date times into timedelta
+        converters.update(dict.fromkeys(DURATION_PROPERTIES, parse_duration))
+
+    if python_objects is True or _have_matching_items((datetime.date, datetime.datetime), python_objects):
+        # convert ISO 8601 date times into datetimes.datetime objects
+        converters.update(dict.fromkeys(DATETIME_PROPERTIES, parse_date))
+
+    return converters
+
+
+def _normalize_recipes(
+    scrapings: List[Dict[str, Any]],
+    python_objects: Union[bool, str, List, Tuple] = False,
+    migrate_old_schema: bool = True,
+) -> List[Dict[str, Any]]:
+    """Post-process the recipes in one pass over each: migrate the old schema,
+    replace HTML escape codes with the characters in the text content and
+    drop empty values (at any depth), and convert the dates and durations
+    into python objects for python_objects.
+
+    Properties that are empty lists, or are not strings, dictionaries or
+    lists, are left out."""
+    converters = _converters(python_objects)
+    migrate = migrate_old_schema is True
+
+    out: List[Any] = []
+    for recipe in scrapings:
+        new_rec: Dict[str, Any] = {}
+        rename = migrate and 'ingredients' in recipe
+        for key, value in recipe.items():
+            if rename:
+                # rename 'ingredients' to 'recipeIngredient'
+                if key == 'recipeIngredient':
+                    continue
+                if key == 'ingredients':
+                    key = 'recipeIngredient'
+
+            t = type(value)
+            if t is str:
+                if '&' in value:
+                    value = html.unescape(value)
+                function = converters.get(key)
+                if function is not None:
+                    try:
+                        value = function(value)
+                    except (ValueError, TypeError):
+                        # it's a parse error, just leave the value as is
+                        pass
+            elif t is dict:
+                value = _normalize_dict(value)
+            elif t is list:
+                # value is empty, skip the key
+                if not value:
+                    continue
+                value = _normalize_list(value)
+            else:
+                continue
+            new_rec[key] = value
+
+        out.append(LazyRecipe(new_rec) if python_objects == 'lazy' else new_rec)
+    return out
+
+
+# The two functions below are the hot loop of the post-processing, so the
+# strings are handled inline instead of by a call for each value.
+
+def _normalize_dict(d: Dict[str, Any]) -> Dict[str, Any]:
+    """A copy of the dictionary with the strings unescaped at any depth and
+    the empty values dropped."""
+    new_d = {}
+    for k, v in d.items():
+        if not v:
+            continue
+        t = type(v)
+        if t is str:
+            # html.unescape() only changes strings with an '&'
+            if '&' in v:
+                v = html.unescape(v)
+        elif t is dict:
+            v = _normalize_dict(v)
+        elif t is list:
+            v = _normalize_list(v)
+        new_d[k] = v
+    return new_d
+
+
+def _normalize_list(values: List[Any]) -> List[Any]:
+    """A copy of the list with the strings unescaped at any depth."""
+    new_values = []
+    for v in values:
+        t = type(v)
+        if t is str:
+            if '&' in v:
+                v = html.unescape(v)
+        elif t is dict:
+            v = _normalize_dict(v)
+        elif t is list:
+            v = _normalize_list(v)
+        new_values.append(v)
+    return new_values
+
+
+def __getattr__(name: str) -> Any:
+    # USER_AGENT_STR moved to the client module, which imports requests
+    if name == 'USER_AGENT_STR':
+        from .client import USER_AGENT_STR
+        return USER_AGENT_STR
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,218 @@
+#
+# Copyright 2023 Micah Cochran
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Timing statistics of the scraping functions.
+
+Calls made inside ``with stats:`` are recorded by that Stats object, in the
+same thread or asyncio task (and the worker threads of scrape_many()).  When
+no Stats is active, the cost is looking up a context variable for each call.
+"""
+
+# internal libraries
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+import functools
+import threading
+# for mypy
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+# the Stats that calls are recorded by, None when they aren't recorded
+_collector: ContextVar[Optional['Stats']] = ContextVar('scrape_schema_recipe_stats', default=None)
+
+T = TypeVar('T')
+
+# in seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+@dataclass
+class CallStats:
+    """The statistics of one call, one page."""
+    url: Optional[str] = None
+    # the time to download the page, and its size
+    fetch_seconds: float = 0.0
+    bytes_downloaded: int = 0
+    # the time of parsing the HTML ('parse'), and of each syntax's extractor
+    extract_seconds: Dict[str, float] = field(default_factory=dict)
+    # the time from the extracted data to the returned recipes
+    postprocess_seconds: float = 0.0
+    recipes: int = 0
+    # the recipes came from the result cache or HTTP cache
+    cached: bool = False
+    # the name of the exception that the call raised
+    error: Optional[str] = None
+    _stats: Optional['Stats'] = field(default=None, repr=False, compare=False)
+
+
+class Histogram:
+    """A Prometheus style histogram, the count of values in each bucket."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        # the last count is for values above the last bucket
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Stats:
+    """Collects the statistics of the calls made inside ``with stats:``.
+
+    The fetch time, bytes downloaded, the time of the extractor for each
+    syntax, the post-processing time and the number of recipes are recorded
+    for each call of the scraping functions.  Totals are kept as counters and
+    times as histograms, see prometheus_text().
+
+    Parameters
+    ----------
+    callback : callable, optional
+        called with the CallStats of each call when it is finished, from the
+        thread that made the call.
+        (defaults to None)
+
+    buckets : sequence of float, optional
+        the upper bounds in seconds of the histograms' buckets.
+
+    Calls in worker processes, load_many() and run_in_executor() with a
+    ProcessPoolExecutor, are not recorded.
+    """
+
+    def __init__(
+        self,
+        callback: Optional[Callable[[CallStats], Any]] = None,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        self.callback = callback
+        self.buckets = tuple(buckets)
+        self.calls = 0
+        self.errors = 0
+        self.cached = 0
+        self.recipes = 0
+        self.bytes_downloaded = 0
+        self.fetch_seconds = Histogram(self.buckets)
+        self.extract_seconds: Dict[str, Histogram] = {}
+        self.postprocess_seconds = Histogram(self.buckets)
+        self._lock = threading.Lock()
+        self._tokens: List[Any] = []
+
+    def __enter__(self) -> 'Stats':
+        self._tokens.append(_collector.set(self))
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        _collector.reset(self._tokens.pop())
+
+    def record(self, call: CallStats) -> None:
+        """Add the statistics of a call."""
+        with self._lock:
+            self.calls += 1
+            self.errors += call.error is not None
+            self.cached += call.cached
+            self.recipes += call.recipes
+            self.bytes_downloaded += call.bytes_downloaded
+            if call.bytes_downloaded or call.fetch_seconds:
+                self.fetch_seconds.observe(call.fetch_seconds)
+            for name, seconds in call.extract_seconds.items():
+                if name not in self.extract_seconds:
+                    self.extract_seconds[name] = Histogram(self.buckets)
+                self.extract_seconds[name].observe(seconds)
+            if call.error is None and not call.cached:
+                self.postprocess_seconds.observe(call.postprocess_seconds)
+        if self.callback is not None:
+            self.callback(call)
+
+    def prometheus_text(self, namespace: str = 'scrape_schema_recipe') -> str:
+        """The statistics in the Prometheus text exposition format."""
+        lines: List[str] = []
+
+        def counter(name: str, help: str, value: float) -> None:
+            lines.append(f'# HELP {namespace}_{name} {help}')
+            lines.append(f'# TYPE {namespace}_{name} counter')
+            lines.append(f'{namespace}_{name} {value}')
+
+        def histogram(name: str, help: str, series: List[Tuple[str, Histogram]]) -> None:
+            lines.append(f'# HELP {namespace}_{name} {help}')
+            lines.append(f'# TYPE {namespace}_{name} histogram')
+            for labels, h in series:
+                cumulative = 0
+                for bound, count in zip(h.buckets + (float('inf'),), h.counts):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'{namespace}_{name}_bucket{{{labels}le="{le}"}} {cumulative}')
+                suffix = f'{{{labels.rstrip(",")}}}' if labels else ''
+                lines.append(f'{namespace}_{name}_sum{suffix} {h.sum}')
+                lines.append(f'{namespace}_{name}_count{suffix} {h.count}')
+
+        with self._lock:
+            counter('calls_total', 'Pages scraped.', self.calls)
+            counter('errors_total', 'Pages that raised an exception.', self.errors)
+            counter('cached_total', 'Pages answered from a cache.', self.cached)
+            counter('recipes_total', 'Recipes returned.', self.recipes)
+            counter('downloaded_bytes_total', 'Bytes of pages downloaded.', self.bytes_downloaded)
+            histogram('fetch_seconds', 'Time downloading a page.', [('', self.fetch_seconds)])
+            histogram('extract_seconds', 'Time parsing a page and running the extractor of each syntax.',
+                      [(f'stage="{name}",', h) for name, h in sorted(self.extract_seconds.items())])
+            histogram('postprocess_seconds', 'Time converting the extracted data into recipes.',
+                      [('', self.postprocess_seconds)])
+        return '\n'.join(lines) + '\n'
+
+
+def _start_call(url: Optional[str] = None) -> Optional[CallStats]:
+    """The record for a call when a Stats is active, otherwise None.  Give it
+    to _finish_call() when the call is done."""
+    stats = _collector.get()
+    if stats is None:
+        return None
+    return CallStats(url=url, _stats=stats)
+
+
+def _finish_call(call: CallStats) -> None:
+    call._stats.record(call)  # type: ignore
+
+
+def _record(call: CallStats, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run fn, recording the name of an exception it raises in call, then
+    finish the call."""
+    try:
+        return fn(*args, **kwargs)
+    except Exception as e:
+        call.error = type(e).__name__
+        raise
+    finally:
+        _finish_call(call)
+
+
+def _bind(fn: Callable) -> Callable:
+    """fn, run with the active Stats of the caller, for worker threads that
+    don't inherit the caller's context."""
+    stats = _collector.get()
+    if stats is None:
+        return fn
+
+    @functools.wraps(fn)
+    def bound(*args: Any, **kwargs: Any) -> Any:
+        token = _collector.set(stats)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _collector.reset(token)
+    return bound
@@ -0,0 +1,443 @@
+#
+# Copyright 2023 Micah Cochran
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Extract the recipes from web archives, WARC files such as Common Crawl's.
+
+The records are read one at a time from the file, which may be gzip
+compressed, so the memory used doesn't grow with the size of the archive.
+Only HTML responses are read past their HTTP headers, and only those with a
+sign of a recipe (see _plan_syntaxes()) are extracted.
+"""
+
+# internal libraries
+from concurrent.futures.process import BrokenProcessPool
+import gzip
+import io
+import multiprocessing
+import multiprocessing.connection
+import os
+from pathlib import Path
+import zlib
+# for mypy
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from .batch import _picklable, ScrapeResult
+from .encoding import sniff_encoding
+from .scrape import _plan_syntaxes, _scrape_html
+
+# the most bytes of a page that are read, the rest of a larger page is skipped
+DEFAULT_MAX_BYTES = 8 * 1024 * 1024
+
+# the most bytes of the HTTP headers of a response
+_MAX_HEADER_BYTES = 64 * 1024
+
+# the size of the reads when skipping the rest of a record
+_CHUNK_SIZE = 64 * 1024
+
+# the content types of HTML pages, a response without one is checked for markers
+_HTML_TYPES = ('text/html', 'application/xhtml+xml')
+
+
+def iter_warc(
+    path_or_stream: Union[str, Path, BinaryIO],
+    python_objects: Union[bool, str, List, Tuple] = False,
+    nonstandard_attrs: bool = False,
+    migrate_old_schema: bool = True,
+    syntaxes: Optional[List[str]] = None,
+    as_objects: bool = False,
+    json_backend: Optional[str] = None,
+    html_parser: Optional[str] = None,
+    max_bytes: Optional[int] = DEFAULT_MAX_BYTES,
+) -> Iterator[Tuple[str, ScrapeResult]]:
+    """Extract the recipes from the pages in a WARC file.
+
+    Parameters
+    ----------
+    path_or_stream : string, pathlib.Path or binary file-like object
+        The WARC file, which is gzip compressed (as .warc.gz files are) or
+        not.  A stream is read from its current position, it doesn't need
+        to be seekable, such as sys.stdin.buffer.
+
+    python_objects, nonstandard_attrs, migrate_old_schema, syntaxes,
+    as_objects, json_backend, html_parser
+        see load()
+
+    max_bytes : int, optional
+        the most bytes of a page that are read, the rest of a larger page is
+        skipped and the recipes are extracted from the part that was read.
+        This bounds the memory used.
+        (defaults to DEFAULT_MAX_BYTES, 8 MiB, None for no limit)
+
+    Yields
+    -------
+    tuple
+        (target_uri, result) for each page with recipes, where the result is
+        the list of recipes, with the target URI as their 'url' when the page
+        doesn't give one, or the exception that was raised extracting them.
+        Pages without recipes, and records of other types, are not yielded.
+
+    Raises
+    ------
+    ValueError
+        the file is not a WARC file, or a record is malformed.
+    """
+    options = {'python_objects': python_objects,
+               'nonstandard_attrs': nonstandard_attrs,
+               'migrate_old_schema': migrate_old_schema,
+               'syntaxes': syntaxes,
+               'as_objects': as_objects,
+               'json_backend': json_backend,
+               'html_parser': html_parser}
+
+    if isinstance(path_or_stream, (str, Path)):
+        with open(path_or_stream, 'rb') as f:
+            yield from _iter_records(f, options, max_bytes)
+    elif hasattr(path_or_stream, 'read'):
+        yield from _iter_records(path_or_stream, options, max_bytes)
+    else:
+        from .scrape import SSRTypeError
+        raise SSRTypeError(var_name="path_or_stream", object_type=type(path_or_stream),
+                           expected_types="a filename, pathlib.Path object, or a binary file-like object")
+
+
+def _open_records(stream: BinaryIO) -> BinaryIO:
+    """The stream of records, decompressed when it is gzip compressed.  (each
+    record of a .warc.gz file is a gzip member, which GzipFile reads on)"""
+    if not hasattr(stream, 'peek'):
+        stream = io.BufferedReader(stream)  # type: ignore
+    if stream.peek(2)[:2] == b'\x1f\x8b':  # type: ignore
+        return gzip.GzipFile(fileobj=stream)  # type: ignore
+    return stream
+
+
+def _iter_records(
+    stream: BinaryIO, options: Dict[str, Any], max_bytes: Optional[int]
+) -> Iterator[Tuple[str, ScrapeResult]]:
+    f = _open_records(stream)
+    while True:
+        headers = _read_warc_headers(f)
+        if headers is None:
+            return
+        try:
+            length = int(headers.get('content-length', ''))
+        except ValueError:
+            raise ValueError(f"WARC record without a valid Content-Length: {headers.get('warc-record-id')}")
+
+        reader = _Block(f, length)
+        page = _read_page(reader, headers, max_bytes)
+        # the rest of the record, and the blank lines that end it
+        reader.skip()
+
+        if page is None:
+            continue
+        uri, body, content_type = page
+        try:
+            recipes = _scrape_html(body, url=uri, encoding=sniff_encoding(body, content_type), **options)
+        except Exception as e:
+            yield uri, e
+            continue
+        if recipes:
+            yield uri, recipes
+
+
+def _read_warc_headers(f: BinaryIO) -> Optional[Dict[str, str]]:
+    """The headers of the next record, with lowercase names, or None at the end."""
+    line = f.readline()
+    # the blank lines that end the previous record
+    while line in (b'\r\n', b'\n'):
+        line = f.readline()
+    if not line:
+        return None
+    if not line.startswith(b'WARC/'):
+        raise ValueError(f'not a WARC record: {line[:40]!r}')
+
+    headers = _read_headers(f, _MAX_HEADER_BYTES)
+    if headers is None:
+        raise ValueError('a WARC record ends in its headers')
+    return headers
+
+
+def _read_headers(f: Any, limit: int) -> Optional[Dict[str, str]]:
+    """The headers up to a blank line, with lowercase names, or None when
+    the headers end or are longer than limit."""
+    headers: Dict[str, str] = {}
+    name = None
+    size = 0
+    while True:
+        line = f.readline(limit - size + 1)
+        size += len(line)
+        if not line or size > limit:
+            return None
+        if line in (b'\r\n', b'\n'):
+            return headers
+        text = line.decode('latin-1').rstrip('\r\n')
+        if text[:1] in (' ', '\t') and name is not None:
+            # a continuation of the previous header
+            headers[name] += ' ' + text.strip()
+        elif ':' in text:
+            name, value = text.split(':', 1)
+            name = name.strip().lower()
+            headers[name] = value.strip()
+
+
+class _Block:
+    """Reads the block of a record, which is length bytes long."""
+
+    def __init__(self, f: BinaryIO, length: int):
+        self._f = f
+        self.remaining = length
+
+    def readline(self, size: int = -1) -> bytes:
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        line = self._f.readline(size)
+        self.remaining -= len(line)
+        return line
+
+    def read(self, size: int = -1) -> bytes:
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self._f.read(size)
+        if len(data) < size:
+            raise ValueError('the WARC file ends in a record')
+        self.remaining -= len(data)
+        return data
+
+    def skip(self) -> None:
+        while self.remaining:
+            self.read(_CHUNK_SIZE)
+
+
+def _read_page(
+    block: _Block, headers: Dict[str, str], max_bytes: Optional[int]
+) -> Optional[Tuple[str, bytes, Optional[str]]]:
+    """The target URI, the body and the content type of an HTML page with a
+    sign of a recipe, or None for other records, without reading past the
+    HTTP headers of responses that aren't HTML."""
+    record_type = headers.get('warc-type')
+    record_content_type = headers.get('content-type', '').lower()
+    uri = headers.get('warc-target-uri', '').strip('<>')
+
+    if record_type == 'response' and record_content_type.startswith('application/http'):
+        status_line = block.readline(_MAX_HEADER_BYTES)
+        parts = status_line.split(None, 2)
+        if len(parts) < 2 or not parts[0].startswith(b'HTTP/') or not parts[1].startswith(b'2'):
+            return None
+        http_headers = _read_headers(block, _MAX_HEADER_BYTES)
+        if http_headers is None:
+            return None
+        content_type = http_headers.get('content-type')
+        if content_type is not None and not content_type.lower().startswith(_HTML_TYPES):
+            return None
+        body = _read_body(block, http_headers, max_bytes)
+    elif record_type in ('response', 'resource') and record_content_type.startswith(_HTML_TYPES):
+        # the page without HTTP headers, as wget writes local files
+        content_type = headers.get('content-type')
+        body = block.read(block.remaining if max_bytes is None else min(block.remaining, max_bytes))
+    else:
+        return None
+
+    if not _has_recipe_marker(body):
+        return None
+    return uri, body, content_type
+
+
+def _read_body(block: _Block, http_headers: Dict[str, str], max_bytes: Optional[int]) -> bytes:
+    """The body of an HTTP response, decoded when it was sent chunked or
+    compressed.  Common Crawl stores bodies decoded, and renames the headers
+    to X-Crawler-Transfer-Encoding and X-Crawler-Content-Encoding, which are
+    ignored.  The body is kept as it is when it can't be decoded."""
+    limit = block.remaining if max_bytes is None else min(block.remaining, max_bytes)
+    body = block.read(limit)
+
+    if 'chunked' in http_headers.get('transfer-encoding', '').lower():
+        body = _dechunk(body)
+
+    content_encoding = http_headers.get('content-encoding', '').lower().strip()
+    if content_encoding in ('gzip', 'x-gzip', 'deflate'):
+        # (wbits 47 reads gzip and zlib headers, -15 raw deflate)
+        for wbits in (47, -15):
+            decompressor = zlib.decompressobj(wbits)
+            try:
+                return decompressor.decompress(body, max_bytes or 0)
+            except zlib.error:
+                continue
+    return body
+
+
+def _dechunk(body: bytes) -> bytes:
+    """The body of a response sent with chunked transfer encoding, the chunks
+    that were read."""
+    chunks: List[bytes] = []
+    pos = 0
+    while pos < len(body):
+        end = body.find(b'\n', pos)
+        if end == -1:
+            break
+        try:
+            size = int(body[pos:end].split(b';', 1)[0].strip(), 16)
+        except ValueError:
+            # not chunked after all
+            return body if not chunks else b''.join(chunks)
+        if size == 0:
+            break
+        chunks.append(body[end + 1:end + 1 + size])
+        # the chunk and its CRLF
+        pos = end + 1 + size + 2
+    return b''.join(chunks)
+
+
+def _has_recipe_marker(body: bytes) -> bool:
+    """Could the page hold a recipe?  Recipes in JSON-LD have the type
+    'Recipe', which is case-sensitive."""
+    syntaxes = _plan_syntaxes(body)
+    return 'microdata' in syntaxes or ('json-ld' in syntaxes and b'Recipe' in body)
+
+
+def iter_warc_files(
+    paths: Union[str, Path, Iterable[Union[str, Path]]],
+    python_objects: Union[bool, str, List, Tuple] = False,
+    nonstandard_attrs: bool = False,
+    migrate_old_schema: bool = True,
+    syntaxes: Optional[List[str]] = None,
+    as_objects: bool = False,
+    json_backend: Optional[str] = None,
+    html_parser: Optional[str] = None,
+    max_bytes: Optional[int] = DEFAULT_MAX_BYTES,
+    processes: Optional[int] = None,
+    pattern: str = '*.warc*',
+) -> Iterator[Tuple[str, ScrapeResult]]:
+    """Extract the recipes from many WARC files with iter_warc(), the files
+    are spread across worker processes.
+
+    Parameters
+    ----------
+    paths : directory name, or iterable of file names or pathlib.Path objects
+        The WARC files.  When this is a directory, the files in it that match
+        pattern are read.
+
+    python_objects, nonstandard_attrs, migrate_old_schema, syntaxes,
+    as_objects, json_backend, html_parser, max_bytes
+        see iter_warc()
+
+    processes : int, optional
+        the number of worker processes, each reads one file at a time.
+        (defaults to None, which is the number of CPUs)
+
+    pattern : str, optional
+        the glob pattern for files, when paths is a directory.
+        (defaults to '*.warc*')
+
+    Yields
+    -------
+    tuple
+        (target_uri, result) as iter_warc() does, as the pages are done, in
+        no particular order.  When a file can't be read, the result is the
+        exception and its path is given instead of a target URI.  When the
+        worker process reading a file dies, the result for the file's path is
+        a BrokenProcessPool exception, and the other files are read by a new
+        worker process.
+    """
+    if isinstance(paths, (str, Path)):
+        if not Path(paths).is_dir():
+            raise NotADirectoryError(f'{paths} is not a directory, give an iterable of files')
+        paths = sorted(Path(paths).glob(pattern))
+    files = [str(path) for path in paths]
+
+    if processes is None:
+        processes = os.cpu_count() or 1
+    if processes < 1:
+        raise ValueError("processes must be at least 1")
+    processes = min(processes, len(files))
+    if processes == 0:
+        return
+
+    options = {'python_objects': python_objects,
+               'nonstandard_attrs': nonstandard_attrs,
+               'migrate_old_schema': migrate_old_schema,
+               'syntaxes': syntaxes,
+               'as_objects': as_objects,
+               'json_backend': json_backend,
+               'html_parser': html_parser,
+               'max_bytes': max_bytes}
+
+    todo = iter(files)
+    # the pipe to each worker, with the worker and the file it's reading
+    workers: Dict[Any, Tuple[Any, Optional[str]]] = {}
+
+    def start_worker() -> None:
+        conn, worker_conn = multiprocessing.Pipe()
+        worker = multiprocessing.Process(target=_warc_worker, args=(worker_conn, options), daemon=True)
+        worker.start()
+        worker_conn.close()
+        workers[conn] = (worker, None)
+        send_file(conn)
+
+    def send_file(conn: Any) -> None:
+        # None tells the worker to exit
+        path = next(todo, None)
+        workers[conn] = (workers[conn][0], path)
+        conn.send(path)
+
+    try:
+        for _ in range(processes):
+            start_worker()
+        while workers:
+            ready: List[Any] = multiprocessing.connection.wait(list(workers))
+            for conn in ready:
+                worker, path = workers[conn]
+                try:
+                    message = conn.recv()
+                except EOFError:
+                    # the worker exited, after it was told to, or it died
+                    del workers[conn]
+                    conn.close()
+                    worker.join()
+                    if path is not None:
+                        yield path, BrokenProcessPool(
+                            f'the worker process reading {path} died, with exit code {worker.exitcode}')
+                        # another worker reads the rest of the files
+                        start_worker()
+                    continue
+                if message is None:
+                    # the worker is done with the file
+                    send_file(conn)
+                else:
+                    yield message
+    finally:
+        for conn, (worker, _) in workers.items():
+            if worker.is_alive():
+                worker.terminate()
+            worker.join()
+            conn.close()
+
+
+def _warc_worker(conn: Any, options: Dict[str, Any]) -> None:
+    """Runs in a worker process for iter_warc_files().  It's sent a path, and
+    sends the (uri, result) of each page of the file and then None, until
+    it's sent None.  The results are sent as they are found, which waits
+    while the pipe is full, so they don't pile up."""
+    while True:
+        path = conn.recv()
+        if path is None:
+            break
+        try:
+            for uri, result in iter_warc(path, **options):
+                conn.send((uri, _picklable(result) if isinstance(result, Exception) else result))
+        except Exception as e:
+            conn.send((path, _picklable(e)))
+        conn.send(None)
+    conn.close()
@@ -0,0 +1,821 @@
+#!/usr/bin/env python3
+
+#
+# Copyright 2023 Micah Cochran
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# These tests run against a local HTTP server that serves test_data/.
+
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+import datetime
+import functools
+import gzip
+import io
+import json
+import pickle
+from pathlib import Path
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+import requests
+
+from scrape_schema_recipe import crawl_site, CrawlState, HTTPCache, load, scrape_many, scrape_url
+from scrape_schema_recipe import MemoryResultCache, ScrapeClient, SSRTypeError
+from scrape_schema_recipe import scrape_many_async, scrape_url_async, Stats
+from scrape_schema_recipe.aio import aiohttp
+from scrape_schema_recipe.cli import _write_results, main
+from scrape_schema_recipe.encoding import decode_html, sniff_encoding
+from test_scrape import make_warc
+
+DATA_PATH = "scrape_schema_recipe/test_data"
+TEST_PAGES = sorted(p.name for p in Path(DATA_PATH).glob("*.html"))
+# larger than the socket buffers, so a client that stops reading is noticed
+PADDING = 64 * 1024 * 1024
+
+
+class DataHandler(SimpleHTTPRequestHandler):
+    # HTTP/1.1 so that connections are kept alive
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append((self.client_address, self.path, dict(self.headers)))
+            server.active += 1
+            server.max_active = max(server.active, server.max_active)
+        try:
+            time.sleep(server.delay)
+            self.respond()
+        finally:
+            with server.lock:
+                server.active -= 1
+
+    def send_response(self, code, message=None):
+        self.server.statuses.append(code)
+        super().send_response(code, message)
+
+    def respond(self):
+        # /etag/<file> serves the file with an ETag
+        if self.path.startswith("/etag/"):
+            etag = '"v1"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            body = (Path(DATA_PATH) / self.path[len("/etag/"):]).read_bytes()
+            self.send_response(200)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        # /padded/<file> serves the file followed by PADDING bytes of whitespace
+        if self.path.startswith("/padded/"):
+            body = (Path(DATA_PATH) / self.path[len("/padded/"):]).read_bytes()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body) + PADDING))
+            self.end_headers()
+            try:
+                self.wfile.write(body)
+                self.server.sent += len(body)
+                chunk = b" " * 65536
+                for _ in range(PADDING // len(chunk)):
+                    self.wfile.write(chunk)
+                    self.server.sent += len(chunk)
+            except (BrokenPipeError, ConnectionResetError):
+                # the client stopped reading
+                self.close_connection = True
+            return
+
+        # /robots.txt serves server.robots, when it is set
+        if self.path == "/robots.txt" and self.server.robots is not None:
+            self.send_body(self.server.robots.encode(), "text/plain")
+            return
+
+        # /sitemap.xml is a sitemap index of /sitemap-pages.xml.gz, the
+        # gzip compressed sitemap of the pages in server.lastmods
+        if self.path == "/sitemap.xml":
+            self.send_body(
+                b'<?xml version="1.0" encoding="UTF-8"?>\n'
+                b'<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                b'<sitemap><loc>/sitemap-pages.xml.gz</loc></sitemap></sitemapindex>', "application/xml")
+            return
+        if self.path == "/sitemap-pages.xml.gz":
+            urls = "".join(f"<url><loc>/{name}</loc><lastmod>{lastmod}</lastmod></url>"
+                           for name, lastmod in self.server.lastmods.items())
+            sitemap = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+                       f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>')
+            self.send_body(gzip.compress(sitemap.encode()), "application/gzip")
+            return
+
+        # /slow/<file> serves the file after a second
+        if self.path.startswith("/slow/"):
+            time.sleep(1)
+            self.path = self.path[len("/slow"):]
+
+        # /status/<code> responds with that status code
+        if self.path.startswith("/status/"):
+            code = int(self.path.split("/")[2])
+            self.send_response(code)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        super().do_GET()
+
+    def send_body(self, body, content_type):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class LocalServerTestCase(unittest.TestCase):
+    """Starts an HTTP server serving test_data for the test case."""
+
+    @classmethod
+    def setUpClass(cls):
+        handler = functools.partial(DataHandler, directory=DATA_PATH)
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        cls.server.requests = []
+        cls.server.statuses = []
+        cls.server.lock = threading.Lock()
+        cls.server.active = 0
+        cls.server.max_active = 0
+        cls.server.delay = 0
+        cls.server.sent = 0
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_port}"
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        # the requests that an earlier test stopped waiting for finish first
+        while self.server.active:
+            time.sleep(0.01)
+        self.server.requests.clear()
+        self.server.statuses.clear()
+        self.server.max_active = 0
+        self.server.delay = 0
+        self.server.sent = 0
+        self.server.robots = None
+        self.server.lastmods = {name: "2023-01-01" for name in TEST_PAGES}
+
+
+class TestScrapeClient(LocalServerTestCase):
+    def test_scrape_url(self):
+        with ScrapeClient() as client:
+            recipes = client.scrape_url(f"{self.base_url}/bevvy-irish-coffee-2018.html")
+
+        assert recipes[0]["name"] == "Irish Coffee"
+        assert recipes[0]["url"] == f"{self.base_url}/bevvy-irish-coffee-2018.html"
+
+    def test_same_as_load(self):
+        with ScrapeClient() as client:
+            recipes = client.scrape(f"{self.base_url}/google-recipe-example.html")
+
+        expected = load(f"{DATA_PATH}/google-recipe-example.html")
+        expected[0]["url"] = f"{self.base_url}/google-recipe-example.html"
+        assert recipes == expected
+
+    def test_json_backend_for_files(self):
+        path = f"{DATA_PATH}/google-recipe-example.html"
+        with ScrapeClient(json_backend="json") as client:
+            assert client.scrape(path) == load(path)
+        with ScrapeClient(json_backend="yaml") as client, self.assertRaises(ValueError):
+            client.scrape(path)
+
+    def test_html_parser_for_files(self):
+        path = f"{DATA_PATH}/foodista-british-treacle-tart.html"
+        with ScrapeClient(html_parser="lxml") as client:
+            assert client.scrape(path) == load(path)
+        with ScrapeClient(html_parser="nonexistent") as client, self.assertRaises(ValueError):
+            client.scrape(path)
+
+    def test_no_charset(self):
+        # the page has non-ASCII characters, and is served without a charset
+        url = f"{self.base_url}/etag/sally-coconut-cake.html"
+        with ScrapeClient() as client:
+            recipes = client.scrape_url(url)
+
+        expected = load(f"{DATA_PATH}/sally-coconut-cake.html")
+        expected[0]["url"] = url
+        assert recipes == expected
+
+    def test_connection_reuse(self):
+        with ScrapeClient() as client:
+            for name in ("bevvy-irish-coffee-2018.html", "google-recipe-example.html",
+                         "sally-coconut-cake.html"):
+                client.scrape_url(f"{self.base_url}/{name}")
+
+        client_addresses = set(address for address, _, _ in self.server.requests)
+        assert len(self.server.requests) == 3
+        assert len(client_addresses) == 1
+
+    def test_headers(self):
+        with ScrapeClient(user_agent_str="test-agent", headers={"X-Test": "1"}) as client:
+            client.scrape_url(f"{self.base_url}/google-recipe-example.html")
+
+        _, _, headers = self.server.requests[0]
+        assert headers["User-Agent"] == "test-agent"
+        assert headers["X-Test"] == "1"
+
+    def test_retries(self):
+        with ScrapeClient(retries=2, backoff_factor=0) as client:
+            with self.assertRaises(requests.HTTPError):
+                client.scrape_url(f"{self.base_url}/status/503")
+
+        # the first try and 2 retries
+        assert len(self.server.requests) == 3
+
+    def test_bad_type(self):
+        with ScrapeClient() as client:
+            with self.assertRaises(SSRTypeError):
+                client.scrape_url(0xC0FFEE)
+
+
+class TestEncoding(unittest.TestCase):
+    def test_bom(self):
+        assert sniff_encoding(b"\xef\xbb\xbf<html>", "text/html; charset=iso-8859-1") == "utf-8-sig"
+        assert decode_html("<html>é".encode("utf-16"))[0] == "<html>é"
+
+    def test_header(self):
+        html = '<meta charset="utf-8"><p>é</p>'.encode("cp1252")
+        assert sniff_encoding(html, "text/html; charset=windows-1252") == "cp1252"
+        assert sniff_encoding(html, 'text/html; charset="not-a-charset"') == "utf-8"
+
+    def test_meta(self):
+        assert sniff_encoding(b'<head><meta charset="ISO-8859-1">') == "iso8859-1"
+        assert sniff_encoding(b'<meta http-equiv="Content-Type" '
+                              b'content="text/html; charset=Shift_JIS">') == "shift_jis"
+        assert sniff_encoding(b'<meta charset="utf-16">') == "utf-8"
+        # only the start of the page is looked at
+        assert sniff_encoding(b" " * 5000 + b'<meta charset="ISO-8859-1">') is None
+
+    def test_fallback(self):
+        assert decode_html("<p>é</p>".encode("utf-8")) == ("<p>é</p>", "utf-8")
+
+        # not UTF-8 and nothing declared, so the encoding is detected
+        text = "<p>Crème brûlée, a café favourite, is déjà vu.</p>" * 10
+        decoded, encoding = decode_html(text.encode("cp1252"))
+        assert encoding != "utf-8"
+        assert decoded.startswith("<p>Cr") and "\ufffd" not in decoded
+
+
+class TestStream(LocalServerTestCase):
+    def test_stream(self):
+        url = f"{self.base_url}/padded/google-recipe-example.html"
+        recipes = scrape_url(url, stream=True)
+
+        expected = load(f"{DATA_PATH}/google-recipe-example.html")
+        expected[0]["url"] = url
+        assert recipes == expected
+        assert self.server.sent < PADDING
+
+    def test_same_as_whole_page(self):
+        with ScrapeClient() as client:
+            for name in TEST_PAGES:
+                url = f"{self.base_url}/{name}"
+                assert (client.scrape_url(url, stream=True, python_objects=True)
+                        == client.scrape_url(url, python_objects=True)), name
+
+    def test_microdata_is_read_to_the_end(self):
+        url = f"{self.base_url}/foodista-british-treacle-tart.html"
+        with ScrapeClient() as client:
+            assert client.scrape_url(url, stream=True) == client.scrape_url(url)
+            assert len(client.scrape_url(url, stream=True, syntaxes=["microdata"])) == 1
+
+    def test_max_bytes(self):
+        with ScrapeClient() as client:
+            url = f"{self.base_url}/padded/google-recipe-example.html"
+            assert len(client.scrape_url(url, max_bytes=100_000)) == 1
+            # the recipe is near the end of the page
+            assert client.scrape_url(url, max_bytes=1000) == []
+
+    def test_not_cached_when_partial(self):
+        with tempfile.TemporaryDirectory() as tmp_dir, HTTPCache(tmp_dir) as cache:
+            with ScrapeClient(cache=cache) as client:
+                client.scrape_url(f"{self.base_url}/sally-coconut-cake.html", max_bytes=50_000)
+                assert len(cache) == 0
+                client.scrape_url(f"{self.base_url}/sally-coconut-cake.html")
+                assert len(cache) == 1
+
+    @unittest.skipIf(aiohttp is None, "aiohttp is not installed")
+    def test_async(self):
+        url = f"{self.base_url}/padded/google-recipe-example.html"
+        recipes = asyncio.run(scrape_url_async(url, stream=True))
+
+        assert recipes[0]["name"] == "Party Coffee Cake"
+        assert self.server.sent < PADDING
+
+
+class TestScrapeMany(LocalServerTestCase):
+    def test_ordered(self):
+        urls = [f"{self.base_url}/{name}" for name in TEST_PAGES]
+        results = list(scrape_many(urls, ordered=True, max_workers=4))
+
+        assert [url for url, _ in results] == urls
+        for name, (url, recipes) in zip(TEST_PAGES, results):
+            assert len(recipes) == len(load(f"{DATA_PATH}/{name}")), name
+            assert recipes[0]["url"] == url
+
+    def test_unordered(self):
+        urls = [f"{self.base_url}/{name}" for name in TEST_PAGES]
+        results = dict(scrape_many(urls, max_workers=4))
+        assert set(results) == set(urls)
+
+    def test_errors(self):
+        urls = [f"{self.base_url}/google-recipe-example.html",
+                f"{self.base_url}/does-not-exist.html",
+                0xBAD]
+        results = list(scrape_many(urls, ordered=True))
+
+        assert results[0][1][0]["name"] == "Party Coffee Cake"
+        assert isinstance(results[1][1], requests.HTTPError)
+        assert isinstance(results[2][1], SSRTypeError)
+
+    def test_ordered_is_bounded(self):
+        """A slow first url doesn't let the results after it pile up."""
+        urls = ([f"{self.base_url}/slow/google-recipe-example.html"]
+                + [f"{self.base_url}/status/200/{i}" for i in range(200)])
+        results = scrape_many(urls, ordered=True, max_workers=2)
+
+        assert next(results)[0] == urls[0]
+        # max_workers * 16 fetched, the slow one among them
+        assert len(self.server.requests) <= 32
+        assert [url for url, _ in results] == urls[1:]
+
+    def test_ordered_is_bounded_across_hosts(self):
+        """Another host's urls don't take the room that the earliest url needs."""
+        other_base_url = self.base_url.replace("127.0.0.1", "localhost")
+        urls = ([f"{self.base_url}/status/200/0",
+                 f"{other_base_url}/slow/google-recipe-example.html",
+                 f"{other_base_url}/status/200/1"]
+                + [f"{self.base_url}/status/200/{i}" for i in range(3, 300)])
+        results = list(scrape_many(urls, ordered=True, max_workers=4, per_host_limit=1))
+
+        assert [url for url, _ in results] == urls
+
+    def test_per_host_limit(self):
+        self.server.delay = 0.05
+        urls = [f"{self.base_url}/{name}" for name in TEST_PAGES]
+        results = list(scrape_many(urls, max_workers=8, per_host_limit=2))
+
+        assert len(results) == len(urls)
+        assert self.server.max_active <= 2
+
+    def test_hosts_are_not_starved(self):
+        # 127.0.0.1 and localhost are separate hosts with the same server
+        self.server.delay = 0.05
+        other_base_url = self.base_url.replace("127.0.0.1", "localhost")
+        urls = ([f"{self.base_url}/{name}" for name in TEST_PAGES]
+                + [f"{other_base_url}/{name}" for name in TEST_PAGES])
+        list(scrape_many(urls, max_workers=4, per_host_limit=1))
+
+        assert self.server.max_active == 2
+
+
+@unittest.skipIf(aiohttp is None, "aiohttp is not installed")
+class TestAsync(LocalServerTestCase):
+    def test_scrape_url_async(self):
+        url = f"{self.base_url}/google-recipe-example.html"
+        recipes = asyncio.run(scrape_url_async(url, python_objects=True))
+
+        expected = load(f"{DATA_PATH}/google-recipe-example.html", python_objects=True)
+        expected[0]["url"] = url
+        assert recipes == expected
+
+    def test_bad_type(self):
+        with self.assertRaises(SSRTypeError):
+            asyncio.run(scrape_url_async(0xC0FFEE))
+
+    def test_json_backend(self):
+        url = f"{self.base_url}/google-recipe-example.html"
+        recipes = asyncio.run(scrape_url_async(url, json_backend="json"))
+        assert recipes == asyncio.run(scrape_url_async(url))
+        with self.assertRaises(ValueError):
+            asyncio.run(scrape_url_async(url, json_backend="yaml"))
+
+        async def collect():
+            return [r async for r in scrape_many_async([url], json_backend="yaml")]
+
+        assert isinstance(asyncio.run(collect())[0][1], ValueError)
+
+    def test_html_parser(self):
+        url = f"{self.base_url}/foodista-british-treacle-tart.html"
+        recipes = asyncio.run(scrape_url_async(url, html_parser="lxml"))
+        assert recipes == asyncio.run(scrape_url_async(url))
+        with self.assertRaises(ValueError):
+            asyncio.run(scrape_url_async(url, html_parser="nonexistent"))
+
+    def test_result_cache(self):
+        urls = [f"{self.base_url}/google-recipe-example.html"] * 2
+        cache = MemoryResultCache()
+
+        async def collect():
+            return [r async for r in scrape_many_async(urls, python_objects=True, concurrency=1,
+                                                       result_cache=cache)]
+
+        (_, first), (_, second) = asyncio.run(collect())
+        assert first == second
+        assert cache.cache_info().hits == 1
+
+        with ProcessPoolExecutor(1) as executor, self.assertRaises(ValueError):
+            asyncio.run(scrape_url_async(urls[0], executor=executor, result_cache=cache))
+
+    def test_scrape_many_async(self):
+        urls = [f"{self.base_url}/{name}" for name in TEST_PAGES]
+        urls.append(f"{self.base_url}/does-not-exist.html")
+
+        async def collect():
+            return [r async for r in scrape_many_async(urls, ordered=True, concurrency=4)]
+
+        results = asyncio.run(collect())
+        assert [url for url, _ in results] == urls
+        for name, (url, recipes) in zip(TEST_PAGES, results):
+            assert len(recipes) == len(load(f"{DATA_PATH}/{name}")), name
+        assert isinstance(results[-1][1], aiohttp.ClientResponseError)
+
+    def test_ordered_is_bounded(self):
+        urls = ([f"{self.base_url}/slow/google-recipe-example.html"]
+                + [f"{self.base_url}/status/200/{i}" for i in range(200)])
+
+        async def first():
+            results = scrape_many_async(urls, ordered=True, concurrency=4)
+            url, _ = await results.__anext__()
+            requested = len(self.server.requests)
+            await results.aclose()
+            return url, requested
+
+        url, requested = asyncio.run(first())
+        assert url == urls[0]
+        assert requested <= 4
+
+    def test_close_finishes_tasks(self):
+        urls = ([f"{self.base_url}/google-recipe-example.html"]
+                + [f"{self.base_url}/slow/google-recipe-example.html"] * 3)
+
+        async def close_early():
+            async with aiohttp.ClientSession() as session:
+                results = scrape_many_async(urls, concurrency=4, session=session)
+                await results.__anext__()
+                await results.aclose()
+                return [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+
+        assert asyncio.run(close_early()) == []
+
+    def test_concurrency(self):
+        self.server.delay = 0.05
+        urls = [f"{self.base_url}/{name}" for name in TEST_PAGES]
+
+        async def collect():
+            return [r async for r in scrape_many_async(urls, concurrency=3)]
+
+        assert len(asyncio.run(collect())) == len(urls)
+        assert self.server.max_active <= 3
+
+
+class TestHTTPCache(LocalServerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache = HTTPCache(self.tmp_dir.name)
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmp_dir.cleanup()
+
+    def test_last_modified(self):
+        url = f"{self.base_url}/google-recipe-example.html"
+        with ScrapeClient(cache=self.cache) as client:
+            first = client.scrape_url(url, python_objects=True)
+            second = client.scrape_url(url, python_objects=True)
+
+        assert self.server.statuses == [200, 304]
+        assert "If-Modified-Since" in self.server.requests[1][2]
+        assert first == second
+
+    def test_etag(self):
+        url = f"{self.base_url}/etag/google-recipe-example.html"
+        first = scrape_url(url, cache=self.cache)
+        second = scrape_url(url, cache=self.cache)
+
+        assert self.server.statuses == [200, 304]
+        assert self.server.requests[1][2]["If-None-Match"] == '"v1"'
+        assert first == second
+
+    def test_other_options_use_cached_body(self):
+        url = f"{self.base_url}/google-recipe-example.html"
+        with ScrapeClient(cache=self.cache) as client:
+            strings = client.scrape_url(url)
+            objects = client.scrape_url(url, python_objects=True)
+            objects_again = client.scrape_url(url, python_objects=True)
+
+        assert self.server.statuses == [200, 304, 304]
+        assert strings[0]["datePublished"] == "2018-03-10"
+        assert objects[0]["datePublished"] == datetime.date(2018, 3, 10)
+        assert objects == objects_again
+
+    def test_result_is_not_unpickled(self):
+        url = f"{self.base_url}/google-recipe-example.html"
+        expected = scrape_url(url, cache=self.cache)
+        # a cache of an older version, or one that someone else wrote to
+        with self.cache._db:
+            self.cache._db.execute("UPDATE responses SET result = ?",
+                                   (pickle.dumps([{"name": "From a pickle"}]),))
+
+        assert scrape_url(url, cache=self.cache) == expected
+        assert self.server.statuses == [200, 304]
+
+    def test_not_cachable(self):
+        with ScrapeClient(cache=self.cache) as client:
+            with self.assertRaises(requests.HTTPError):
+                client.scrape_url(f"{self.base_url}/status/404")
+        assert len(self.cache) == 0
+
+    def test_max_size(self):
+        # room for one of the pages and its result, but not both pages
+        self.cache.max_size = (Path(DATA_PATH) / "sally-coconut-cake.html").stat().st_size + 100_000
+        with ScrapeClient(cache=self.cache) as client:
+            client.scrape_url(f"{self.base_url}/sally-coconut-cake.html")
+            client.scrape_url(f"{self.base_url}/bevvy-irish-coffee-2019.html")
+
+        # the least recently used was evicted
+        assert len(self.cache) == 1
+        assert self.cache.get(f"{self.base_url}/sally-coconut-cake.html") is None
+
+    def test_max_age(self):
+        self.cache.max_age = 0
+        url = f"{self.base_url}/google-recipe-example.html"
+        with ScrapeClient(cache=self.cache) as client:
+            client.scrape_url(url)
+            time.sleep(0.01)
+            client.scrape_url(url)
+
+        assert self.server.statuses == [200, 200]
+
+    def test_scrape_many(self):
+        urls = [f"{self.base_url}/{name}" for name in TEST_PAGES]
+        first = dict(scrape_many(urls, cache=self.cache))
+        second = dict(scrape_many(urls, cache=self.cache))
+
+        assert first == second
+        assert self.server.statuses.count(304) == len(urls)
+
+    @unittest.skipIf(aiohttp is None, "aiohttp is not installed")
+    def test_async(self):
+        url = f"{self.base_url}/etag/google-recipe-example.html"
+        first = asyncio.run(scrape_url_async(url, cache=self.cache))
+        second = asyncio.run(scrape_url_async(url, cache=self.cache))
+
+        assert self.server.statuses == [200, 304]
+        assert first == second
+
+    @unittest.skipIf(aiohttp is None, "aiohttp is not installed")
+    def test_async_off_the_event_loop(self):
+        threads = set()
+
+        class ThreadCache(HTTPCache):
+            def get(self, url):
+                threads.add(threading.get_ident())
+                return super().get(url)
+
+            def put(self, entry, recipes):
+                threads.add(threading.get_ident())
+                return super().put(entry, recipes)
+
+        url = f"{self.base_url}/google-recipe-example.html"
+        with ThreadCache(self.tmp_dir.name) as cache:
+            asyncio.run(scrape_url_async(url, cache=cache))
+        assert threads and threading.get_ident() not in threads
+
+
+class TestStats(LocalServerTestCase):
+    def test_scrape_url(self):
+        with Stats() as stats:
+            scrape_url(f"{self.base_url}/google-recipe-example.html")
+        size = (Path(DATA_PATH) / "google-recipe-example.html").stat().st_size
+        assert stats.bytes_downloaded == size
+        assert stats.fetch_seconds.count == 1
+        assert stats.fetch_seconds.sum > 0
+        assert stats.calls == 1 and stats.recipes == 1
+
+    def test_scrape_many(self):
+        urls = [f"{self.base_url}/{name}" for name in TEST_PAGES]
+        urls.append(f"{self.base_url}/status/404")
+        with Stats() as stats:
+            list(scrape_many(urls, max_workers=4))
+        assert stats.calls == len(urls)
+        assert stats.errors == 1
+        # the 404 raised before its fetch was recorded
+        assert stats.fetch_seconds.count == len(urls) - 1
+
+    @unittest.skipIf(aiohttp is None, "aiohttp is not installed")
+    def test_async(self):
+        calls = []
+
+        async def main():
+            with Stats(callback=calls.append):
+                return await scrape_url_async(f"{self.base_url}/google-recipe-example.html")
+
+        asyncio.run(main())
+        assert len(calls) == 1
+        assert calls[0].bytes_downloaded > 0
+        assert list(calls[0].extract_seconds) == ["json-ld"]
+
+
+class TestCrawl(LocalServerTestCase):
+    def crawl(self, **kwargs):
+        return dict(crawl_site(self.base_url, delay=0, **kwargs))
+
+    def paths(self):
+        return [path for _, path, _ in self.server.requests]
+
+    def test_crawl(self):
+        results = self.crawl()
+
+        assert sorted(results) == [f"{self.base_url}/{name}" for name in TEST_PAGES]
+        for url, recipes in results.items():
+            expected = load(f"{DATA_PATH}/{url.rsplit('/', 1)[1]}")
+            assert [r["name"] for r in recipes] == [r["name"] for r in expected], url
+        assert self.paths()[:3] == ["/robots.txt", "/sitemap.xml", "/sitemap-pages.xml.gz"]
+
+    def test_robots(self):
+        self.server.robots = (f"User-agent: *\nDisallow: /sally-coconut-cake.html\n"
+                              f"Sitemap: {self.base_url}/sitemap-pages.xml.gz\n")
+        results = self.crawl()
+
+        assert len(results) == len(TEST_PAGES) - 1
+        assert f"{self.base_url}/sally-coconut-cake.html" not in results
+        assert "/sally-coconut-cake.html" not in self.paths()
+        assert "/sitemap.xml" not in self.paths()
+
+    def test_delay(self):
+        self.server.lastmods = {name: "2023-01-01" for name in TEST_PAGES[:3]}
+        start = time.perf_counter()
+        results = dict(crawl_site(self.base_url, delay=0.1, max_workers=3))
+
+        # the two sitemaps and the pages are 0.1s apart
+        assert len(results) == 3
+        assert time.perf_counter() - start >= 0.4
+        assert self.server.max_active == 1
+
+    def test_crawl_delay(self):
+        # (RobotFileParser only reads whole seconds)
+        self.server.robots = "User-agent: *\nCrawl-delay: 1\n"
+        self.server.lastmods = {TEST_PAGES[0]: "2023-01-01"}
+        start = time.perf_counter()
+        results = self.crawl(sitemaps=[f"{self.base_url}/sitemap-pages.xml.gz"])
+
+        assert len(results) == 1
+        assert time.perf_counter() - start >= 1
+
+    def test_lastmod(self):
+        with tempfile.TemporaryDirectory() as tmpdir, CrawlState(Path(tmpdir) / "state.sqlite3") as state:
+            assert len(self.crawl(state=state)) == len(TEST_PAGES)
+            assert len(state) == len(TEST_PAGES)
+
+            # nothing changed
+            self.server.requests.clear()
+            assert self.crawl(state=state) == {}
+            assert self.paths() == ["/robots.txt", "/sitemap.xml", "/sitemap-pages.xml.gz"]
+
+            self.server.lastmods[TEST_PAGES[0]] = "2023-02-01"
+            assert list(self.crawl(state=state)) == [f"{self.base_url}/{TEST_PAGES[0]}"]
+            assert state.get(f"{self.base_url}/{TEST_PAGES[0]}") == "2023-02-01"
+
+    def test_errors(self):
+        self.server.lastmods = {"does-not-exist.html": "2023-01-01"}
+        results = self.crawl(sitemaps=[f"{self.base_url}/sitemap.xml", f"{self.base_url}/missing.xml"])
+
+        assert isinstance(results[f"{self.base_url}/does-not-exist.html"], requests.HTTPError)
+        assert isinstance(results[f"{self.base_url}/missing.xml"], requests.HTTPError)
+
+    def test_command_line(self):
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            state = str(Path(tmpdir) / "state.sqlite3")
+            args = ["crawl", self.base_url, "--delay", "0", "--state", state]
+            assert main(args, io.StringIO(), stdout, stderr) == 0
+            assert main(args, io.StringIO(), stdout, stderr) == 0
+
+        recipes = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        assert len(recipes) == sum(len(load(f"{DATA_PATH}/{name}")) for name in TEST_PAGES)
+        assert f"{len(TEST_PAGES)} pages" in stderr.getvalue()
+        assert "0 pages, 0 recipes, 0 errors" in stderr.getvalue()
+
+
+class TestCommandLine(LocalServerTestCase):
+    def run_main(self, args, stdin=""):
+        stdout, stderr = io.StringIO(), io.StringIO()
+        status = main(args + ["--processes", "1"], io.StringIO(stdin), stdout, stderr)
+        return status, [json.loads(line) for line in stdout.getvalue().splitlines()], stderr.getvalue()
+
+    def test_directory_and_files(self):
+        status, recipes, stderr = self.run_main([DATA_PATH, "does-not-exist.html"])
+        assert status == 1
+        assert len(recipes) == sum(len(load(f"{DATA_PATH}/{name}")) for name in TEST_PAGES)
+        assert "does-not-exist.html: FileNotFoundError" in stderr
+        assert f"{len(TEST_PAGES) + 1} pages, {len(recipes)} recipes, 1 errors" in stderr
+
+    def test_stdin(self):
+        lines = [f"{self.base_url}/bevvy-irish-coffee-2019.html",
+                 f"{self.base_url}/sally-coconut-cake.html",
+                 "",
+                 f"{DATA_PATH}/google-recipe-example.html"]
+        status, recipes, _ = self.run_main([], "\n".join(lines) + "\n")
+        assert status == 0
+        assert sorted(r["name"] for r in recipes) == ["Coconut Cake", "Irish Coffee", "Party Coffee Cake"]
+
+    def test_options(self):
+        status, recipes, _ = self.run_main(
+            [f"{self.base_url}/google-recipe-example.html", "--python-objects",
+             "--nonstandard-attrs"])
+        assert status == 0
+        assert recipes[0]["cookTime"] == "PT30M"
+        assert recipes[0]["datePublished"] == "2018-03-10"
+        assert recipes[0]["_format"] == "json-ld"
+
+    def test_month_and_year_durations(self):
+        # isodate parses durations with months or years to isodate.Duration
+        html = ('<script type="application/ld+json">{"@context": "https://schema.org", "@type": "Recipe", '
+                '"name": "Sourdough Starter", "totalTime": "P1M", "prepTime": "P1Y2DT3H"}</script>')
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "starter.html"
+            path.write_text(html)
+            status, recipes, stderr = self.run_main([str(path), "--python-objects"])
+        assert status == 0
+        assert recipes[0]["totalTime"] == "P1M"
+        assert recipes[0]["prepTime"] == "P1Y2DT3H"
+
+    def test_unserializable_recipe(self):
+        results = [("a.html", [{"name": "A", "value": object()}, {"name": "B"}]),
+                   ("b.html", [{"name": "C"}])]
+        stdout, stderr = io.StringIO(), io.StringIO()
+        assert _write_results(results, stdout, stderr) == 1
+        assert [json.loads(line)["name"] for line in stdout.getvalue().splitlines()] == ["B", "C"]
+        assert "error: a.html: TypeError: Object of type object is not JSON serializable" in stderr.getvalue()
+        assert "2 pages, 2 recipes, 1 errors" in stderr.getvalue()
+
+    def test_warc(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            paths = []
+            for name in ["google-recipe-example.html", "sally-coconut-cake.html"]:
+                paths.append(str(Path(tmpdir) / f"{name}.warc.gz"))
+                Path(paths[-1]).write_bytes(make_warc([name]))
+            status, recipes, stderr = self.run_main(["warc", *paths, "--nonstandard-attrs"])
+        assert status == 0
+        assert [r["name"] for r in recipes] == ["Party Coffee Cake", "Coconut Cake"]
+        assert recipes[0]["_format"] == "json-ld"
+        assert "2 pages, 2 recipes, 0 errors" in stderr
+
+    def test_cache_dir(self):
+        url = f"{self.base_url}/etag/google-recipe-example.html"
+        with tempfile.TemporaryDirectory() as cache_dir:
+            first = self.run_main([url, "--cache-dir", cache_dir])
+            second = self.run_main([url, "--cache-dir", cache_dir])
+        assert first[1] == second[1]
+        assert self.server.statuses == [200, 304]
+
+    def test_module(self):
+        result = subprocess.run(
+            [sys.executable, "-m", "scrape_schema_recipe", f"{DATA_PATH}/google-recipe-example.html"],
+            capture_output=True, text=True, check=True)
+        assert json.loads(result.stdout)["name"] == "Party Coffee Cake"
+        assert "1 pages, 1 recipes, 0 errors" in result.stderr
+
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -17,14 +17,35 @@
 #
 
 
+from concurrent.futures.process import BrokenProcessPool
 import datetime
+import extruct
+import gzip
+import io
 import isodate
+import lxml.html
+import mmap
+import multiprocessing
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
 import unittest
+import unittest.mock
 from pathlib import Path
 from typing import List
 
-from scrape_schema_recipe import load, loads, scrape, scrape_url, SSRTypeError
+from scrape_schema_recipe import iter_warc, iter_warc_files, load, load_many, loads, loads_bytes, scrape, scrape_url, SSRTypeError
+from scrape_schema_recipe import LazyRecipe, MemoryResultCache, ResultCache, SQLiteResultCache
+from scrape_schema_recipe import HowToStep, NutritionInformation, Recipe
+from scrape_schema_recipe import CallStats, Stats
 from scrape_schema_recipe import example_output, __version__
+from scrape_schema_recipe.iso8601 import _parse_duration, parse_date, parse_duration
+from scrape_schema_recipe.jsonld import json_loader, JSON_BACKENDS
+from scrape_schema_recipe.parsers import _HtmlParser, _MicrodataExtractor, html_parser_backend, HTML_PARSERS
+from scrape_schema_recipe.scrape import _fast_json_ld, _plan_syntaxes, _scrape_html
+from scrape_schema_recipe import warc
 
 DISABLE_NETWORK_TESTS = False
 DATA_PATH = "scrape_schema_recipe/test_data"
@@ -261,6 +282,48 @@ class TestDateTime(unittest.TestCase):
         assert self.datetime_test == expected
 
 
+class TestISO8601(unittest.TestCase):
+    """The durations are parsed the same as isodate.parse_duration()."""
+
+    # from isodate's tests, and strings seen on recipe sites
+    DURATIONS = [
+        "P18Y9M4DT11H9M8S", "P2W", "P3Y6M4DT12H30M5S", "P23DT23H", "P4Y", "P1M", "PT1M",
+        "P0.5Y", "P0,5Y", "PT36H", "P1DT12H", "+P11D", "-P2W", "-P2.2W", "P1DT2H3M4S",
+        "P1DT2H3M", "P1DT2H", "PT2H", "PT2.3H", "PT2H3M4S", "PT3M4S", "PT22S", "PT22.22S",
+        "-P2Y", "-P3Y6M4DT12H30M5S", "-P1DT2H3M4S", "P0018-09-04T11:09:08", "PT15M",
+        "PT1H30M", "PT90M", "P1D", "P1W2D", "PT0S", "P0D", "PT", "P1DT", "PT000015M",
+        "PT1234567890M", "PT15M\n",
+        # not durations
+        "", "P", "T15M", "15 min", "PT15M ", " PT15M", "pt15m", "PT1.5", "PT15M30",
+        "PT١٥M", "P1H", "PT1D",
+    ]
+
+    @staticmethod
+    def parsed(function, s):
+        try:
+            result = function(s)
+        except Exception as e:
+            return type(e)
+        return type(result), result
+
+    def test_same_as_isodate(self):
+        for s in self.DURATIONS:
+            with self.subTest(s=s):
+                assert self.parsed(parse_duration, s) == self.parsed(isodate.parse_duration, s)
+
+    def test_not_a_string(self):
+        for function in (parse_duration, parse_date):
+            with self.assertRaises(TypeError):
+                function(["PT15M"])
+
+    def test_memoized(self):
+        _parse_duration.cache_clear()
+        load(f"{DATA_PATH}/crumb-lemon-tea-cakes-2018.html", python_objects=True)
+        load(f"{DATA_PATH}/crumb-lemon-tea-cakes-2018.html", python_objects=True)
+        info = _parse_duration.cache_info()
+        assert info.hits >= info.misses > 0
+
+
 # test loads()
 class TestLoads(unittest.TestCase):
     def test_loads(self):
@@ -371,6 +434,16 @@ class TestExampleOutput(unittest.TestCase):
         name = example_output("tea-cake")[0]["name"]
         assert name == "Meyer Lemon Poppyseed Tea Cakes"
 
+    def test_submodule_import(self):
+        # importing the submodule of the same name doesn't replace the function,
+        # in a new interpreter so that neither is imported yet
+        code = ("import scrape_schema_recipe.example_output\n"
+                "import scrape_schema_recipe as ssr\n"
+                "print(ssr.example_output('tea-cake')[0]['name'])")
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                                check=True).stdout
+        assert output.strip() == "Meyer Lemon Poppyseed Tea Cakes"
+
 
 class TestVersion(unittest.TestCase):
     def test_version_not_null(self):
@@ -407,6 +480,140 @@ class TestPythonObjects(unittest.TestCase):
         assert self.dates["datePublished"] == self.true["datePublished"]
 
 
+class TestLazyPythonObjects(unittest.TestCase):
+    def test_same_as_python_objects(self):
+        for path in sorted(Path(DATA_PATH).glob("*.html")):
+            lazy = load(path, python_objects="lazy")
+            eager = load(path, python_objects=True)
+            assert all(isinstance(r, LazyRecipe) for r in lazy)
+            assert lazy == eager, path.name
+            assert [dict(r) for r in lazy] == eager, path.name
+
+    def test_converted_on_access(self):
+        recipe = example_output("google", python_objects="lazy")[0]
+        assert recipe["name"] == "Party Coffee Cake"
+        assert recipe._data["cookTime"] == "PT30M"
+
+        assert recipe["cookTime"] == datetime.timedelta(minutes=30)
+        assert recipe["datePublished"] == datetime.date(2018, 3, 10)
+        # the conversion is kept
+        assert recipe["cookTime"] is recipe["cookTime"]
+
+    def test_values_that_do_not_parse(self):
+        recipe = LazyRecipe({"name": "x", "cookTime": None, "prepTime": "10 minutes"})
+        assert "cookTime" not in recipe
+        assert recipe["prepTime"] == "10 minutes"
+        assert len(recipe) == 2
+
+    def test_read_only(self):
+        recipe = example_output("google", python_objects="lazy")[0]
+        with self.assertRaises(TypeError):
+            recipe["name"] = "changed"
+
+    def test_pickle(self):
+        recipe = example_output("google", python_objects="lazy")[0]
+        assert pickle.loads(pickle.dumps(recipe)) == recipe
+
+    def test_bad_value(self):
+        with self.assertRaises(ValueError):
+            load(f"{DATA_PATH}/google-recipe-example.html", python_objects="yes")
+
+
+class TestObjects(unittest.TestCase):
+    def test_same_as_dictionaries(self):
+        for path in sorted(Path(DATA_PATH).glob("*.html")):
+            for python_objects in (False, True):
+                objects = load(path, python_objects=python_objects,
+                               nonstandard_attrs=True, as_objects=True)
+                dicts = load(path, python_objects=python_objects,
+                             nonstandard_attrs=True)
+                assert all(isinstance(r, Recipe) for r in objects)
+                assert [r.to_dict() for r in objects] == dicts, path.name
+                assert [Recipe.from_dict(r) for r in dicts] == objects, path.name
+
+    def test_attributes(self):
+        recipe = load(f"{DATA_PATH}/google-recipe-example.html",
+                      python_objects=True, as_objects=True)[0]
+        assert recipe.name == "Party Coffee Cake"
+        assert recipe.type == "Recipe"
+        assert recipe.get("@type") == "Recipe"
+        assert recipe.cookTime == datetime.timedelta(minutes=30)
+        assert isinstance(recipe.recipeInstructions[0], HowToStep)
+        assert isinstance(recipe.nutrition, NutritionInformation)
+        assert recipe.nutrition.calories == "270 calories"
+        # unset properties
+        assert recipe.suitableForDiet is None
+        assert recipe.get("suitableForDiet", "default") == "default"
+        with self.assertRaises(AttributeError):
+            recipe.notAProperty
+
+    def test_extra_properties(self):
+        d = {"@type": "Recipe", "name": "x", "cookingMethod": "baking"}
+        recipe = Recipe.from_dict(d)
+        assert recipe.get("cookingMethod") == "baking"
+        assert recipe.to_dict() == d
+
+    def test_interned(self):
+        recipes = load(f"{DATA_PATH}/allrecipes-moscow-mule-2021.html", as_objects=True)
+        recipes += load(f"{DATA_PATH}/allrecipes-moscow-mule-2023.html", as_objects=True)
+        assert recipes[0].context is recipes[1].context
+        steps = recipes[0].recipeInstructions + recipes[1].recipeInstructions
+        assert all(step.type is steps[0].type for step in steps)
+
+    def test_pickle(self):
+        recipes = example_output("google", as_objects=True)
+        assert pickle.loads(pickle.dumps(recipes)) == recipes
+
+    def test_result_cache(self):
+        cache = MemoryResultCache()
+        path = f"{DATA_PATH}/google-recipe-example.html"
+        dicts = load(path, result_cache=cache)
+        objects = load(path, result_cache=cache, as_objects=True)
+        assert cache.cache_info().hits == 1
+        assert [r.to_dict() for r in objects] == dicts
+
+
+class TestStats(unittest.TestCase):
+    def test_record(self):
+        calls = []
+        with Stats(callback=calls.append) as stats:
+            load(f"{DATA_PATH}/google-recipe-example.html")
+            load(f"{DATA_PATH}/foodista-british-treacle-tart.html")
+        # not recorded outside of the with block
+        load(f"{DATA_PATH}/google-recipe-example.html")
+
+        assert stats.calls == 2
+        assert stats.recipes == 2
+        assert all(isinstance(call, CallStats) for call in calls)
+        # the JSON-LD fast path, then lxml and the microdata extractor
+        assert list(calls[0].extract_seconds) == ["json-ld"]
+        assert list(calls[1].extract_seconds) == ["parse", "microdata"]
+        assert calls[1].postprocess_seconds > 0
+        assert calls[1].bytes_downloaded == 0
+        assert stats.fetch_seconds.count == 0
+        assert stats.postprocess_seconds.count == 2
+
+    def test_errors_and_cache(self):
+        cache = MemoryResultCache()
+        with Stats() as stats:
+            for _ in range(2):
+                load(f"{DATA_PATH}/google-recipe-example.html", result_cache=cache)
+            with self.assertRaises(ValueError):
+                load(f"{DATA_PATH}/google-recipe-example.html", syntaxes=["rdfa"])
+        assert (stats.calls, stats.cached, stats.errors) == (3, 1, 1)
+
+    def test_prometheus_text(self):
+        with Stats() as stats:
+            load(f"{DATA_PATH}/google-recipe-example.html")
+        text = stats.prometheus_text()
+        assert "# TYPE scrape_schema_recipe_calls_total counter\n" in text
+        assert "scrape_schema_recipe_recipes_total 1\n" in text
+        assert '# TYPE scrape_schema_recipe_extract_seconds histogram\n' in text
+        assert 'scrape_schema_recipe_extract_seconds_bucket{stage="json-ld",le="+Inf"} 1\n' in text
+        assert 'scrape_schema_recipe_extract_seconds_count{stage="json-ld"} 1\n' in text
+        assert "scrape_schema_recipe_postprocess_seconds_count 1\n" in text
+
+
 class TestGraph(unittest.TestCase):
     # tests @graph, also test Path
     def test_graph(self):
@@ -457,6 +664,19 @@ class TestEscaping(unittest.TestCase):
         assert "&amp;" not in recipe["recipeIngredient"][0]
         assert "&" in recipe["recipeIngredient"][0]
 
+    def test_nested(self):
+        html = """<script type="application/ld+json">
+        {"@type": "Recipe", "name": "Mac &amp; Cheese", "ingredients": ["1 cup milk &amp; cream"],
+         "review": [{"@type": "Review", "author": {"name": "Tom &amp; Jerry", "image": null},
+                     "keywords": ["quick &amp; easy"]}]}</script>"""
+        recipe = loads(html)[0]
+        assert recipe["name"] == "Mac & Cheese"
+        assert recipe["recipeIngredient"] == ["1 cup milk & cream"]
+        assert "ingredients" not in recipe
+        # nested deeper than one level, and empty values are dropped
+        assert recipe["review"][0]["author"] == {"name": "Tom & Jerry"}
+        assert recipe["review"][0]["keywords"] == ["quick & easy"]
+
 
 class TestTypeList(unittest.TestCase):
     """Test that @type can be a list."""
@@ -473,5 +693,672 @@ class TestTypeList(unittest.TestCase):
         assert self.recipe["name"] == "Simple Moscow Mule"
 
 
+class TestSyntaxes(unittest.TestCase):
+    """Test that only the syntaxes that can hold a recipe are extracted."""
+
+    def test_plan_json_ld(self):
+        with open(f"{DATA_PATH}/bevvy-irish-coffee-2019.html") as fp:
+            assert _plan_syntaxes(fp.read()) == ["json-ld"]
+
+    def test_plan_microdata(self):
+        with open(f"{DATA_PATH}/foodista-british-treacle-tart.html") as fp:
+            assert "microdata" in _plan_syntaxes(fp.read())
+
+    def test_plan_any_case(self):
+        assert _plan_syntaxes('<script type="Application/LD+JSON"></script>') == ["json-ld"]
+        html = "<div ITEMTYPE = 'HTTPS://SCHEMA.ORG/RECIPE'></div>"
+        assert _plan_syntaxes(html) == ["microdata"]
+        assert _plan_syntaxes(html.encode()) == ["microdata"]
+        assert _plan_syntaxes("<a href='https://schema.org/Recipe'>itemtype</a>") == []
+
+    def test_plan_nothing(self):
+        html = "<html><body><p>no recipes here</p></body></html>"
+        assert _plan_syntaxes(html) == []
+        assert loads(html) == []
+
+    def test_syntaxes_override(self):
+        s = f"{DATA_PATH}/foodista-british-treacle-tart.html"
+        assert load(s, syntaxes=["json-ld"]) == []
+        assert load(s, syntaxes=["microdata"]) == load(s)
+
+
+class TestFastJsonLd(unittest.TestCase):
+    """Test JSON-LD parsed without building a DOM matches extruct's output."""
+
+    def test_same_as_extruct(self):
+        for path in sorted(Path(DATA_PATH).glob("*.html")):
+            html = path.read_text()
+            expected = extruct.extract(html, syntaxes=["json-ld"])["json-ld"]
+            assert _fast_json_ld(html) == expected, path.name
+
+    def test_commented_out_script(self):
+        html = ('<html><head><!-- <script type="application/ld+json">'
+                '{"@type": "Recipe", "name": "Old"}</script> -->'
+                '<script type="application/ld+json">'
+                '{"@type": "Recipe", "name": "New"}</script></head></html>')
+        assert _fast_json_ld(html) == [{"@type": "Recipe", "name": "New"}]
+        assert [r["name"] for r in loads(html)] == ["New"]
+
+    def test_malformed(self):
+        html = ('<html><head><script type="application/ld+json">'
+                '// comment\n{"@type": "Recipe", "name": "Cake"}'
+                "</script></head></html>")
+        assert _fast_json_ld(html) == [{"@type": "Recipe", "name": "Cake"}]
+        assert loads(html)[0]["name"] == "Cake"
+
+    def test_type_is_exact(self):
+        """The script tags are matched as the HTML parsers' XPath does, whichever
+        path extracts the JSON-LD."""
+        recipe = '{"@context": "https://schema.org", "@type": "Recipe", "name": "Cake"}'
+        microdata = ('<div itemscope itemtype="https://schema.org/Recipe">'
+                     '<span itemprop="name">Tart</span></div>')
+        tags = {'<script type="Application/ld+json">': [],
+                '<script type=" application/ld+json">': [],
+                '<script type="text/javascript" type="application/ld+json">': [],
+                '<script data-x="a>b" type="application/ld+json">': ["Cake"],
+                '<script TYPE=application/ld+json async>': ["Cake"],
+                "<script type = 'application/ld+json'>": ["Cake"]}
+        for tag, expected in tags.items():
+            html = f"<html><head>{tag}{recipe}</script></head><body></body></html>"
+            with_microdata = html.replace("<body>", "<body>" + microdata)
+            assert [r["name"] for r in loads(html)] == expected, tag
+            assert [r["name"] for r in loads(html, syntaxes=["json-ld"])] == expected, tag
+            assert [r["name"] for r in loads(html, syntaxes=["json-ld", "microdata"])] == expected, tag
+            assert [r["name"] for r in loads(with_microdata)] == expected + ["Tart"], tag
+            assert [r["name"] for r in loads_bytes(html.encode())] == expected, tag
+
+    def test_json_ld_syntax_skips_parsing(self):
+        html = Path(f"{DATA_PATH}/foodista-british-treacle-tart.html").read_text()
+        with Stats() as stats:
+            loads(html, syntaxes=["json-ld"])
+        assert "parse" not in stats.extract_seconds
+
+    def test_undecodable_falls_back(self):
+        html = ('<html><head><script type="application/ld+json">'
+                '{"@type": "Recipe", "name": "Cake"'
+                "</script></head></html>")
+        assert _fast_json_ld(html) is None
+
+
+class TestJsonBackends(unittest.TestCase):
+    """Test that every JSON backend gives the same recipes, and decodes broken JSON-LD."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.backends = []
+        for backend in JSON_BACKENDS:
+            try:
+                json_loader(backend)
+            except ImportError:
+                continue
+            cls.backends.append(backend)
+
+    @staticmethod
+    def page(script: str, microdata: bool = False) -> str:
+        html = f'<html><head><script type="application/ld+json">{script}</script></head><body>'
+        if microdata:
+            html += '<div itemscope itemtype="http://schema.org/Recipe"><span itemprop="name">Pie</span></div>'
+        return html + "</body></html>"
+
+    def test_same_recipes(self):
+        for path in sorted(Path(DATA_PATH).glob("*.html")):
+            expected = load(str(path), json_backend="json")
+            for backend in self.backends:
+                with self.subTest(path=path.name, backend=backend):
+                    assert load(str(path), json_backend=backend) == expected
+                    assert loads(path.read_text(), json_backend=backend) == expected
+
+    def test_lenient(self):
+        scripts = {
+            "trailing commas": '{"@type": "Recipe", "name": "Cake", "recipeIngredient": ["egg", "milk",],}',
+            "html comment": '<!-- {"@type": "Recipe", "name": "Cake"} -->',
+            "cdata": '//<![CDATA[\n{"@type": "Recipe", "name": "Cake"}\n//]]>',
+            "comments": '/* recipe */ {"@type": "Recipe", // the type\n "name": "Cake"}',
+            "control characters": '{"@type": "Recipe",\x0c"name": "Cake\ttin"}',
+        }
+        for name, script in scripts.items():
+            for backend in self.backends:
+                for microdata in (False, True):
+                    with self.subTest(name, backend=backend, microdata=microdata):
+                        recipes = loads(self.page(script, microdata), json_backend=backend)
+                        assert recipes[0]["name"].startswith("Cake")
+
+    def test_lenient_keeps_strings(self):
+        script = '{"@type": "Recipe", "name": "a, } // <!-- /* */", "url": "https://example.com/",}'
+        for backend in self.backends:
+            assert loads(self.page(script), json_backend=backend)[0]["name"] == "a, } // <!-- /* */"
+
+    def test_long_integers(self):
+        script = '{"@type": "Recipe", "name": "Cake", "offers": {"sku": 123456789012345678901234567890}}'
+        for backend in self.backends:
+            recipe = loads(self.page(script), json_backend=backend)[0]
+            assert recipe["offers"]["sku"] == 123456789012345678901234567890
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            loads(self.page('{"@type": "Recipe"}'), json_backend="yaml")
+
+
+class TestHtmlParsers(unittest.TestCase):
+    """Test that every HTML parser that is installed gives the recipes that
+    the tests above expect, when the HTML is parsed."""
+
+    # the syntaxes are given to skip the JSON-LD fast path
+    SYNTAXES = ["json-ld", "microdata"]
+
+    @classmethod
+    def setUpClass(cls):
+        cls.parsers = []
+        for html_parser in HTML_PARSERS:
+            try:
+                html_parser_backend(html_parser)
+            except ImportError:
+                continue
+            cls.parsers.append(html_parser)
+
+    def test_same_recipes(self):
+        for path in sorted(Path(DATA_PATH).glob("*.html")):
+            html = path.read_text()
+            for python_objects in (False, True):
+                expected = loads(html, python_objects, syntaxes=self.SYNTAXES, html_parser="extruct")
+                for html_parser in self.parsers:
+                    with self.subTest(path=path.name, html_parser=html_parser, python_objects=python_objects):
+                        assert loads(html, python_objects, syntaxes=self.SYNTAXES,
+                                     html_parser=html_parser) == expected
+                        assert load(str(path), python_objects, syntaxes=self.SYNTAXES,
+                                    html_parser=html_parser) == expected
+                        assert loads(html, python_objects, html_parser=html_parser) == loads(html, python_objects)
+
+    def test_microdata(self):
+        for html_parser in self.parsers:
+            with self.subTest(html_parser=html_parser):
+                recipe = load(f"{DATA_PATH}/foodista-british-treacle-tart.html", html_parser=html_parser)[0]
+                assert recipe["name"] == "British Treacle Tart"
+                assert recipe["recipeYield"] == "1 servings"
+
+                recipe = load(f"{DATA_PATH}/sweetestkitchen-truffles.html", python_objects=True,
+                              html_parser=html_parser)[0]
+                assert recipe["name"] == "Rum & Tonka Bean Dark Chocolate Truffles"
+                assert recipe["prepTime"] + recipe["cookTime"] == recipe["totalTime"]
+
+    def test_json_ld(self):
+        expected_str = ("Add Irish whiskey, brown sugar syrup, and hot coffee to an Irish coffee mug."
+                        "\nTop with whipped cream.")
+        for html_parser in self.parsers:
+            with self.subTest(html_parser=html_parser):
+                recipe = load(f"{DATA_PATH}/bevvy-irish-coffee-2018.html", syntaxes=self.SYNTAXES,
+                              html_parser=html_parser)[0]
+                assert recipe["recipeInstructions"] == expected_str
+
+    def test_text_content(self):
+        html = ('<div itemscope itemtype="https://schema.org/Recipe">'
+                '<p itemprop="description">Mix<!-- well -->ed <b>well</b>, then <script>x()</script>'
+                'bake (hot)<br>serve<ul><li>warm</li></ul></p>'
+                '<a itemprop="url" href=" /pie "></a></div>')
+        expected = loads(html, nonstandard_attrs=True, syntaxes=self.SYNTAXES, html_parser="extruct")
+        for html_parser in self.parsers:
+            with self.subTest(html_parser=html_parser):
+                assert loads(html, nonstandard_attrs=True, syntaxes=self.SYNTAXES,
+                             html_parser=html_parser) == expected
+
+    def test_nested_recipe(self):
+        # a recipe that is a property of another item isn't at the top level
+        html = ('<div itemscope itemtype="https://schema.org/WebPage"><div itemprop="mainEntity" '
+                'itemscope itemtype="https://schema.org/Recipe"><span itemprop="name">Pie</span></div></div>')
+        for html_parser in self.parsers:
+            assert loads(html, html_parser=html_parser) == []
+
+    def test_bytes(self):
+        path = Path(f"{DATA_PATH}/sweetestkitchen-truffles.html")
+        expected = load(str(path))
+        for html_parser in self.parsers:
+            with self.subTest(html_parser=html_parser):
+                assert loads_bytes(path.read_bytes(), syntaxes=self.SYNTAXES, html_parser=html_parser) == expected
+
+    def test_unknown_parser(self):
+        with self.assertRaises(ValueError):
+            load(f"{DATA_PATH}/foodista-british-treacle-tart.html", html_parser="html5lib")
+
+    def test_tree(self):
+        path = f"{DATA_PATH}/foodista-british-treacle-tart.html"
+        with open(path) as fp:
+            tree = lxml.html.fromstring(fp.read())
+
+        assert loads(None, tree=tree, html_parser="lxml") == load(path)
+        if "selectolax" in self.parsers:
+            with self.assertRaises(ValueError):
+                loads(None, tree=tree, html_parser="selectolax")
+
+    def test_incomplete_backend(self):
+        class NoMicrodata(_HtmlParser):
+            def parse(self, html, encoding=None):
+                return None
+
+            def json_ld(self, tree, loads):
+                return []
+
+        class NoText(_MicrodataExtractor):
+            def _itemscopes(self, tree):
+                return iter(())
+
+        with self.assertRaises(TypeError):
+            NoMicrodata()
+        with self.assertRaises(TypeError):
+            NoText()
+
+
+class TestTree(unittest.TestCase):
+    """Test passing in a tree of HTML that has already been parsed."""
+
+    def test_microdata(self):
+        path = f"{DATA_PATH}/foodista-british-treacle-tart.html"
+        with open(path) as fp:
+            tree = lxml.html.fromstring(fp.read())
+
+        assert loads(None, tree=tree) == load(path)
+        assert load(None, tree=tree) == load(path)
+
+    def test_json_ld_and_microdata(self):
+        path = f"{DATA_PATH}/sweetestkitchen-truffles.html"
+        with open(path) as fp:
+            tree = lxml.html.fromstring(fp.read())
+
+        assert loads(None, tree=tree, python_objects=True) == load(path, python_objects=True)
+
+    def test_bad_syntaxes(self):
+        with self.assertRaises(ValueError):
+            load(f"{DATA_PATH}/google-recipe-example.html", syntaxes=["rdfa"])
+
+
+class TestLoadMany(unittest.TestCase):
+    def test_directory(self):
+        results = list(load_many(DATA_PATH, processes=2, chunksize=3, ordered=True))
+        paths = sorted(Path(DATA_PATH).glob("*.html"))
+
+        assert [path for path, _ in results] == paths
+        for path, recipes in results:
+            assert recipes == load(path), path.name
+
+    def test_unordered(self):
+        paths = [str(p) for p in sorted(Path(DATA_PATH).glob("*.html"))]
+        results = dict(load_many(paths, processes=2, chunksize=1, python_objects=True))
+
+        assert set(results) == set(paths)
+        assert results[paths[0]] == load(paths[0], python_objects=True)
+
+    def test_ordered_is_bounded(self):
+        """A slow first file doesn't let the results after it pile up."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            slow = Path(tmpdir) / "slow.html"
+            page = Path(f"{DATA_PATH}/foodista-british-treacle-tart.html").read_text()
+            slow.write_text(page.replace("</body>", page[page.index("<body"):] * 200))
+            read = []
+
+            def paths():
+                yield slow
+                for i in range(40):
+                    read.append(i)
+                    yield f"{DATA_PATH}/google-recipe-example.html"
+
+            results = load_many(paths(), processes=2, chunksize=1, ordered=True)
+            assert next(results)[0] == slow
+            # 2 chunks for each process, the slow one among them
+            assert len(read) <= 3
+            assert len(list(results)) == 40
+
+    def test_errors(self):
+        results = list(load_many([f"{DATA_PATH}/does-not-exist.html",
+                                  f"{DATA_PATH}/google-recipe-example.html"],
+                                 processes=1, ordered=True))
+
+        assert isinstance(results[0][1], FileNotFoundError)
+        assert results[1][1][0]["name"] == "Party Coffee Cake"
+
+    def test_not_a_directory(self):
+        with self.assertRaises(NotADirectoryError):
+            list(load_many(f"{DATA_PATH}/google-recipe-example.html"))
+
+
+def warc_record(uri: str, block: bytes, record_type: str = "response",
+                content_type: str = "application/http; msgtype=response") -> bytes:
+    """A gzip compressed WARC record, a .warc.gz file is a series of them."""
+    headers = (f"WARC/1.0\r\nWARC-Type: {record_type}\r\nWARC-Target-URI: {uri}\r\n"
+               f"Content-Type: {content_type}\r\nContent-Length: {len(block)}\r\n\r\n")
+    return gzip.compress(headers.encode() + block + b"\r\n\r\n")
+
+
+def http_response(body: bytes, status: str = "200 OK", headers: str = "Content-Type: text/html") -> bytes:
+    return f"HTTP/1.1 {status}\r\n{headers}\r\n\r\n".encode() + body
+
+
+def make_warc(names: List[str]) -> bytes:
+    """A WARC file of the test_data pages, and of records that are skipped."""
+    warc = b""
+    for name in names:
+        uri = f"https://example.com/{name}"
+        warc += warc_record(uri, b"GET /" + name.encode() + b" HTTP/1.1\r\n\r\n", "request",
+                            "application/http; msgtype=request")
+        warc += warc_record(uri, http_response(Path(f"{DATA_PATH}/{name}").read_bytes()))
+    return warc
+
+
+class TestWarc(unittest.TestCase):
+    NAMES = ["allrecipes-moscow-mule-2023.html", "foodista-british-treacle-tart.html",
+             "google-recipe-example.html"]
+
+    def test_recipes(self):
+        page = Path(f"{DATA_PATH}/{self.NAMES[1]}").read_bytes()
+        chunked = b"".join(b"%x\r\n%s\r\n" % (len(page[i:i + 1000]), page[i:i + 1000])
+                           for i in range(0, len(page), 1000)) + b"0\r\n\r\n"
+        warc = make_warc(self.NAMES) + b"".join([
+            warc_record("https://example.com/style.css", http_response(b"body {}", headers="Content-Type: text/css")),
+            warc_record("https://example.com/missing.html", http_response(page, "404 Not Found")),
+            warc_record("https://example.com/no-recipe.html", http_response(b"<html><body>Recipe</body></html>")),
+            warc_record("<https://example.com/chunked.html>", http_response(
+                chunked, headers="Content-Type: text/html\r\nTransfer-Encoding: chunked")),
+            warc_record("https://example.com/gzip.html", http_response(
+                gzip.compress(page), headers="Content-Type: text/html\r\nContent-Encoding: gzip")),
+            warc_record("https://example.com/resource.html", page, "resource", "text/html"),
+        ])
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "pages.warc.gz"
+            path.write_bytes(warc)
+            results = list(iter_warc(path))
+
+        uris = [f"https://example.com/{name}" for name in self.NAMES] + [
+            "https://example.com/chunked.html", "https://example.com/gzip.html",
+            "https://example.com/resource.html"]
+        assert [uri for uri, _ in results] == uris
+        for uri, recipes in results:
+            html = Path(f"{DATA_PATH}/{uri.rsplit('/', 1)[1]}")
+            if not html.exists():
+                html = Path(f"{DATA_PATH}/{self.NAMES[1]}")
+            assert recipes == _scrape_html(html.read_bytes(), url=uri), uri
+            assert recipes[0]["url"] == uri
+
+    def test_stream(self):
+        """An uncompressed stream that can't seek or peek, as a pipe."""
+        warc = gzip.decompress(make_warc(self.NAMES[2:]))
+
+        class Pipe(io.RawIOBase):
+            def __init__(self, data):
+                self.data = io.BytesIO(data)
+
+            def readable(self):
+                return True
+
+            def readinto(self, b):
+                data = self.data.read(min(len(b), 100))
+                b[:len(data)] = data
+                return len(data)
+
+        results = list(iter_warc(Pipe(warc), python_objects=True))
+        uri = f"https://example.com/{self.NAMES[2]}"
+        page = Path(f"{DATA_PATH}/{self.NAMES[2]}").read_bytes()
+        assert results == [(uri, _scrape_html(page, python_objects=True, url=uri))]
+
+    def test_common_crawl_headers(self):
+        """Common Crawl stores the body decoded, and renames the encodings."""
+        page = Path(f"{DATA_PATH}/{self.NAMES[2]}").read_bytes()
+        uri = "https://example.com/common-crawl.html"
+        warc = warc_record(uri, http_response(page, headers=(
+            "Content-Type: text/html\r\nX-Crawler-Content-Encoding: gzip\r\n"
+            "X-Crawler-Transfer-Encoding: chunked")))
+        assert list(iter_warc(io.BytesIO(warc))) == [(uri, _scrape_html(page, url=uri))]
+
+    def test_undecodable_body(self):
+        """A body that isn't compressed as its header says is kept as it is."""
+        page = Path(f"{DATA_PATH}/{self.NAMES[2]}").read_bytes()
+        uri = "https://example.com/not-gzip.html"
+        warc = warc_record(uri, http_response(page, headers="Content-Type: text/html\r\nContent-Encoding: gzip"))
+        assert list(iter_warc(io.BytesIO(warc))) == [(uri, _scrape_html(page, url=uri))]
+
+    def test_max_bytes(self):
+        warc = make_warc(self.NAMES[2:])
+        assert list(iter_warc(io.BytesIO(warc), max_bytes=100)) == []
+        assert len(list(iter_warc(io.BytesIO(warc), max_bytes=None))) == 1
+
+    def test_not_a_warc(self):
+        with self.assertRaises(ValueError):
+            list(iter_warc(io.BytesIO(b"<html></html>")))
+        with self.assertRaises(SSRTypeError):
+            list(iter_warc(b"WARC/1.0"))
+
+    def test_files(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for i, name in enumerate(self.NAMES):
+                (Path(tmpdir) / f"{i}.warc.gz").write_bytes(make_warc([name]))
+            (Path(tmpdir) / "broken.warc.gz").write_bytes(b"broken")
+            results = dict(iter_warc_files(tmpdir, processes=2))
+
+        assert isinstance(results.pop(str(Path(tmpdir) / "broken.warc.gz")), ValueError)
+        assert sorted(results) == [f"https://example.com/{name}" for name in self.NAMES]
+
+    @unittest.skipUnless(multiprocessing.get_start_method() == "fork",
+                         "the workers need to inherit the patched iter_warc()")
+    def test_worker_dies(self):
+        iter_warc = warc.iter_warc
+
+        def crash(path, **options):
+            if path.endswith("crash.warc.gz"):
+                os._exit(1)
+            return iter_warc(path, **options)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for i, name in enumerate(self.NAMES):
+                (Path(tmpdir) / f"{i}.warc.gz").write_bytes(make_warc([name]))
+            (Path(tmpdir) / "crash.warc.gz").write_bytes(make_warc(self.NAMES[:1]))
+            with unittest.mock.patch.object(warc, "iter_warc", crash):
+                results = dict(iter_warc_files(tmpdir, processes=2))
+
+        assert isinstance(results.pop(str(Path(tmpdir) / "crash.warc.gz")), BrokenProcessPool)
+        assert sorted(results) == [f"https://example.com/{name}" for name in self.NAMES]
+
+
+class TestBytes(unittest.TestCase):
+    """Test binary HTML, and loading files in binary mode."""
+
+    def test_loads_bytes(self):
+        for name in ("sweetestkitchen-truffles.html", "foodista-british-treacle-tart.html",
+                     "sally-coconut-cake.html"):
+            path = Path(DATA_PATH) / name
+            expected = loads(path.read_text(encoding="utf-8"), python_objects=True)
+            data = path.read_bytes()
+            for html in (data, bytearray(data), memoryview(data)):
+                assert loads_bytes(html, python_objects=True) == expected, (name, type(html))
+            assert scrape(data, python_objects=True) == expected
+
+    def test_mmap(self):
+        path = f"{DATA_PATH}/sweetestkitchen-truffles.html"
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            assert load(m) == load(path)
+            assert loads_bytes(m) == load(path)
+
+    def test_binary_file_object(self):
+        path = f"{DATA_PATH}/google-recipe-example.html"
+        with open(path, "rb") as fp:
+            assert load(fp) == load(path)
+
+    def test_encodings(self):
+        with open(f"{DATA_PATH}/google-recipe-example.html", encoding="utf-8") as fp:
+            html = fp.read().replace("Party Coffee Cake", "Crème Brûlée")
+
+        # declared in the <meta> tag
+        cp1252_html = html.replace('charset="utf-8"', 'charset="windows-1252"').encode("cp1252")
+        assert loads_bytes(cp1252_html)[0]["name"] == "Crème Brûlée"
+        # given
+        no_meta_html = html.replace('<meta charset="utf-8">', "")
+        assert loads_bytes(no_meta_html.encode("cp1252"), encoding="cp1252")[0]["name"] == "Crème Brûlée"
+        # a byte order mark
+        assert loads_bytes(no_meta_html.encode("utf-16"))[0]["name"] == "Crème Brûlée"
+        # undeclared UTF-8
+        assert loads_bytes(no_meta_html.encode("utf-8"))[0]["name"] == "Crème Brûlée"
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / "cp1252.html"
+            path.write_bytes(cp1252_html)
+            assert load(path)[0]["name"] == "Crème Brûlée"
+            assert load(str(path))[0]["name"] == "Crème Brûlée"
+
+    def test_bad_type(self):
+        with self.assertRaises(SSRTypeError):
+            loads_bytes("<html></html>")
+
+
+class TestResultCache(unittest.TestCase):
+    def test_hits_and_misses(self):
+        cache = MemoryResultCache()
+        path = f"{DATA_PATH}/google-recipe-example.html"
+        first = load(path, result_cache=cache)
+        second = load(path, result_cache=cache)
+
+        assert first == second == load(path)
+        assert cache.cache_info() == (1, 1, 1024, 1)
+
+    def test_copies(self):
+        cache = MemoryResultCache()
+        path = f"{DATA_PATH}/google-recipe-example.html"
+        load(path, result_cache=cache)[0]["name"] = "changed"
+
+        assert load(path, result_cache=cache)[0]["name"] == "Party Coffee Cake"
+
+    def test_options_are_in_key(self):
+        cache = MemoryResultCache()
+        with open(f"{DATA_PATH}/google-recipe-example.html") as fp:
+            html = fp.read()
+        strings = loads(html, result_cache=cache)
+        objects = loads(html, python_objects=True, result_cache=cache)
+
+        assert strings[0]["datePublished"] == "2018-03-10"
+        assert objects[0]["datePublished"] == datetime.date(2018, 3, 10)
+        assert cache.cache_info().misses == 2
+
+    def test_backends_are_in_key(self):
+        cache = MemoryResultCache()
+        with open(f"{DATA_PATH}/foodista-british-treacle-tart.html") as fp:
+            html = fp.read()
+        loads(html, result_cache=cache, html_parser="lxml")
+        loads(html, result_cache=cache)
+        loads(html, result_cache=cache, html_parser="extruct")
+        loads(html, result_cache=cache, json_backend="json")
+
+        # None is the default 'extruct'
+        assert cache.cache_info().misses == 3
+        assert cache.cache_info().hits == 1
+
+    def test_lru(self):
+        cache = MemoryResultCache(maxsize=2)
+        for name in ("google-recipe-example.html", "sally-coconut-cake.html",
+                     "bevvy-irish-coffee-2018.html", "google-recipe-example.html"):
+            load(f"{DATA_PATH}/{name}", result_cache=cache)
+
+        assert cache.cache_info() == (0, 4, 2, 2)
+
+    def test_sqlite(self):
+        path = f"{DATA_PATH}/sweetestkitchen-truffles.html"
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = f"{tmp_dir}/results.sqlite3"
+            with SQLiteResultCache(filename) as cache:
+                first = scrape(path, python_objects=True, result_cache=cache)
+
+            # another instance shares the file
+            with SQLiteResultCache(filename) as cache:
+                second = scrape(path, python_objects=True, result_cache=cache)
+                assert cache.cache_info().hits == 1
+
+        assert first == second == load(path, python_objects=True)
+
+    def test_python_objects(self):
+        # a month and year duration is an isodate.Duration
+        html = ('<script type="application/ld+json">{"@type": "Recipe", "name": "Sourdough", '
+                '"totalTime": "P1M", "cookTime": "PT1H", "datePublished": "2020-01-02T03:04:05+02:00", '
+                '"dateModified": "2020-01-03"}</script>')
+        cache = MemoryResultCache()
+        for python_objects in (True, "lazy"):
+            first = loads(html, python_objects=python_objects, result_cache=cache)
+            second = loads(html, python_objects=python_objects, result_cache=cache)
+            assert first == second
+            assert type(first[0]) is type(second[0])
+            assert isinstance(second[0]["totalTime"], isodate.Duration)
+        assert cache.cache_info().hits == 2
+
+    def test_not_unpickled(self):
+        path = f"{DATA_PATH}/google-recipe-example.html"
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with SQLiteResultCache(f"{tmp_dir}/results.sqlite3") as cache:
+                load(path, result_cache=cache)
+                # a cache of an older version, or one that someone else wrote to
+                with cache._db:
+                    cache._db.execute("UPDATE results SET value = ?",
+                                      (pickle.dumps([{"name": "From a pickle"}]),))
+                assert load(path, result_cache=cache) == load(path)
+                assert cache.cache_info().hits == 0
+
+    def test_sqlite_maxsize(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with SQLiteResultCache(f"{tmp_dir}/results.sqlite3", maxsize=2) as cache:
+                for name in ("google-recipe-example.html", "sally-coconut-cake.html",
+                             "bevvy-irish-coffee-2018.html"):
+                    load(f"{DATA_PATH}/{name}", result_cache=cache)
+                assert len(cache) == 2
+
+    def test_incomplete_backend(self):
+        class NoLen(ResultCache):
+            def get_raw(self, key):
+                return None
+
+            def set_raw(self, key, value):
+                pass
+
+        with self.assertRaises(TypeError):
+            NoLen()
+
+
+class TestImportTime(unittest.TestCase):
+    """The slow dependencies are imported when they are first needed."""
+
+    # milliseconds, the package takes about 30ms and the dependencies about 300ms
+    IMPORT_TIME_BUDGET = 150
+    HEAVY_MODULES = ("aiohttp", "extruct", "isodate", "lxml", "requests")
+
+    @staticmethod
+    def imported_after(code: str) -> List[str]:
+        """The heavy modules in sys.modules after running the code in a new interpreter."""
+        check = f"{code}\nimport sys\nprint(' '.join(m for m in {TestImportTime.HEAVY_MODULES} if m in sys.modules))"
+        return subprocess.run([sys.executable, "-c", check], capture_output=True, text=True,
+                              check=True).stdout.split()
+
+    def test_import_time(self):
+        stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", "import scrape_schema_recipe"],
+                                capture_output=True, text=True, check=True).stderr
+        # the last line is the package, with the cumulative time in microseconds
+        cumulative = int(stderr.strip().splitlines()[-1].split("|")[1])
+        assert cumulative / 1000 < self.IMPORT_TIME_BUDGET
+
+    def test_import(self):
+        assert self.imported_after("import scrape_schema_recipe") == []
+
+    def test_json_ld_fast_path(self):
+        code = ("import scrape_schema_recipe as ssr\n"
+                f"ssr.load('{DATA_PATH}/crumb-lemon-tea-cakes-2018.html', python_objects=True)")
+        assert self.imported_after(code) == []
+
+    def test_microdata(self):
+        code = f"import scrape_schema_recipe as ssr\nssr.load('{DATA_PATH}/foodista-british-treacle-tart.html')"
+        imported = self.imported_after(code)
+        # extruct imports requests itself
+        assert "extruct" in imported and "lxml" in imported
+        assert "aiohttp" not in imported and "isodate" not in imported
+
+    def test_lxml_parser(self):
+        code = ("import scrape_schema_recipe as ssr\n"
+                f"ssr.load('{DATA_PATH}/foodista-british-treacle-tart.html', html_parser='lxml')")
+        assert self.imported_after(code) == ["lxml"]
+
+    def test_client(self):
+        code = "import scrape_schema_recipe as ssr\nssr.ScrapeClient"
+        assert self.imported_after(code) == ["requests"]
+
+
 if __name__ == "__main__":
     unittest.main()